@@ -0,0 +1,346 @@
+# coding=utf-8
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+from datetime import date, datetime, time
+from decimal import Decimal
+
+import zstandard
+from sqlalchemy import create_engine, delete, func, insert, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from .conf import DATABASE_URL
+from .models import ArchivedReceipt, Product, Receipt, ReceiptProduct
+from .partitions import PARTITION_KEYS, add_months, is_partitioned
+from .settings import ARCHIVE_SETTINGS, ArchiveSettings
+
+
+# Defined logger
+logger = logging.getLogger("easycheck.archive")
+
+# Defined receipt columns stored in the archive
+RECEIPT_FIELDS = (
+    Receipt.id,
+    Receipt.user_id,
+    Receipt.total,
+    Receipt.payment_type,
+    Receipt.payment_amount,
+    Receipt.rest,
+    Receipt.total_cents,
+    Receipt.payment_amount_cents,
+    Receipt.rest_cents,
+    Receipt.item_count,
+    Receipt.unit_count,
+    Receipt.created_at,
+)
+
+# Defined product line columns stored in the archive (selected from `receipt_product` outer joined with `product`)
+PRODUCT_FIELDS = (
+    ReceiptProduct.receipt_id,
+    func.coalesce(Product.title, ReceiptProduct.stored_title).label("title"),
+    ReceiptProduct.price,
+    ReceiptProduct.price_cents,
+    ReceiptProduct.quantity,
+    func.coalesce(ReceiptProduct.line_total, ReceiptProduct.price * ReceiptProduct.quantity).label("line_total"),
+    ReceiptProduct.line_total_cents,
+)
+
+# Defined names of monthly partitions (e.g. "receipt_y2026m10")
+PARTITION_NAME = re.compile(r"_y(\d{4})m(\d{2})$")
+
+
+def encode_value(value):
+    """
+    Writes Decimals & datetimes to JSON as strings (e.g. "19.99", "2026-10-19T12:00:00").
+    """
+
+    if isinstance(value, Decimal):
+        return str(value)
+
+    if isinstance(value, datetime):
+        return value.isoformat()
+
+    raise TypeError(f"Can't encode {type(value).__name__}")
+
+
+def get_cutoff(retention_months: int, today: date | None = None) -> datetime:
+    """
+    Returns the creation time before which receipts are archived: the start of the month
+    `retention_months` months ago (whole months are archived, so their partitions empty out).
+    """
+
+    today = today or datetime.utcnow().date()
+
+    return datetime.combine(add_months(today, -retention_months), time())
+
+
+class ReceiptArchive:
+    """
+    Cold-storage archive of old receipts.
+
+    Receipts (with their product lines) are moved out of the hot tables into segments on local disk:
+    files of zstd frames, each holding NDJSON of `frame_size` receipts. The `archived_receipt` table
+    is the index: it locates the frame of every archived receipt, so one receipt is served by reading
+    & decompressing one small frame.
+    """
+
+    def __init__(self, settings: ArchiveSettings = ARCHIVE_SETTINGS):
+        self.settings = settings
+        self.directory = settings.directory
+
+    def write_segment(self, records: list[dict]) -> tuple[str, list[tuple[int, int, int]]]:
+        """
+        Writes receipts to a new segment, durably (it's fsynced before it's referenced).
+
+        Args:
+            records (list[dict]): Receipts with their products, in order of IDs.
+
+        Returns:
+            tuple[str, list[tuple[int, int, int]]]: The segment name, and the frame offset & length of every receipt ID.
+        """
+
+        os.makedirs(self.directory, exist_ok=True)
+
+        segment = f"{records[0]['id']:012d}-{records[-1]['id']:012d}.ndjson.zst"
+        path = os.path.join(self.directory, segment)
+        compressor = zstandard.ZstdCompressor(level=self.settings.level)
+        locations = []
+        offset = 0
+
+        with open(path + ".tmp", "wb") as file:
+            for start in range(0, len(records), self.settings.frame_size):
+                frame_records = records[start:start + self.settings.frame_size]
+                frame = compressor.compress("\n".join(
+                    json.dumps(record, default=encode_value, separators=(",", ":"))
+                    for record in frame_records
+                ).encode())
+
+                file.write(frame)
+                locations += [(record["id"], offset, len(frame)) for record in frame_records]
+                offset += len(frame)
+
+            file.flush()
+            os.fsync(file.fileno())
+
+        # Complete segments only
+        os.replace(path + ".tmp", path)
+        directory = os.open(self.directory, os.O_RDONLY)
+
+        try:
+            os.fsync(directory)
+
+        finally:
+            os.close(directory)
+
+        return segment, locations
+
+    def read_frame(self, segment: str, offset: int, length: int) -> list[dict]:
+        """
+        Reads & decompresses one frame of a segment.
+        """
+
+        with open(os.path.join(self.directory, segment), "rb") as file:
+            file.seek(offset)
+            frame = file.read(length)
+
+        return [json.loads(line) for line in zstandard.ZstdDecompressor().decompress(frame).splitlines()]
+
+    def archive(self, connection: Connection, cutoff: datetime) -> int:
+        """
+        Moves receipts created before the cutoff to the archive, in batches of `batch_size` receipts.
+        Each batch is written to a segment, then indexed & deleted from the hot tables in one transaction,
+        so an interrupted run loses nothing and can be repeated.
+
+        Args:
+            connection (Connection): The connection (committed after each batch).
+            cutoff (datetime): Receipts created before it are archived (see `get_cutoff`).
+
+        Returns:
+            int: The number of archived receipts.
+        """
+
+        archived = 0
+
+        while True:
+            receipt_rows = connection.execute(
+                select(
+                    *RECEIPT_FIELDS
+                ).where(
+                    Receipt.created_at < cutoff
+                ).order_by(
+                    Receipt.id
+                ).limit(
+                    self.settings.batch_size
+                )
+            ).all()
+
+            if not receipt_rows:
+                # Done
+                break
+
+            records = {row.id: {**row._asdict(), "products": []} for row in receipt_rows}
+
+            # Lines of the batch, only in partitions of its months
+            created_range = ReceiptProduct.receipt_created_at.between(
+                min(row.created_at for row in receipt_rows),
+                max(row.created_at for row in receipt_rows),
+            )
+            product_rows = connection.execute(
+                select(
+                    *PRODUCT_FIELDS
+                ).outerjoin(
+                    Product,
+                    Product.id == ReceiptProduct.product_id,
+                ).where(
+                    ReceiptProduct.receipt_id.in_(records.keys()),
+                    created_range,
+                ).order_by(
+                    ReceiptProduct.id
+                )
+            )
+
+            for row in product_rows:
+                product = row._asdict()
+                records[product.pop("receipt_id")]["products"].append(product)
+
+            segment, locations = self.write_segment(list(records.values()))
+
+            connection.execute(insert(ArchivedReceipt), [
+                {
+                    "id": receipt_id,
+                    "user_id": records[receipt_id]["user_id"],
+                    "created_at": records[receipt_id]["created_at"],
+                    "segment": segment,
+                    "frame_offset": frame_offset,
+                    "frame_length": frame_length,
+                }
+                for receipt_id, frame_offset, frame_length in locations
+            ])
+            connection.execute(delete(ReceiptProduct).where(ReceiptProduct.receipt_id.in_(records.keys()), created_range))
+            connection.execute(delete(Receipt).where(Receipt.id.in_(records.keys())))
+            connection.commit()
+
+            archived += len(records)
+            logger.info("Archived %d receipts to %s", len(records), segment)
+
+        return archived
+
+    def drop_empty_partitions(self, connection: Connection, cutoff: datetime) -> list[str]:
+        """
+        Drops monthly partitions entirely before the cutoff once they are archived (empty),
+        so their files are freed at once instead of waiting for vacuum.
+
+        Returns:
+            list[str]: Names of the dropped partitions.
+        """
+
+        dropped = []
+
+        # Lines first (they reference receipts)
+        for table in reversed(PARTITION_KEYS):
+            if not is_partitioned(connection, table):
+                # Not migrated to partitions
+                continue
+
+            partitions = connection.scalars(
+                text(
+                    "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid"
+                    " WHERE i.inhparent = to_regclass(:table) ORDER BY c.relname"
+                ),
+                {"table": table},
+            ).all()
+
+            for name in partitions:
+                match = PARTITION_NAME.search(name)
+
+                if match is None or add_months(date(int(match[1]), int(match[2]), 1), 1) > cutoff.date():
+                    # Default partition or not archived yet
+                    continue
+
+                if connection.scalar(text(f"SELECT NOT EXISTS (SELECT FROM {name})")):
+                    # Detached first: partitions of receipts are referenced by lines
+                    connection.execute(text("SET LOCAL lock_timeout = '5s'"))
+                    connection.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+                    connection.execute(text(f"DROP TABLE {name}"))
+                    connection.commit()
+                    dropped.append(name)
+
+        return dropped
+
+    async def get(self, db_session: AsyncSession, receipt_id: int, user_id: int | None = None) -> dict | None:
+        """
+        Reads an archived receipt.
+
+        Args:
+            db_session (AsyncSession): The database session (to read the index).
+            receipt_id (int): The ID of the receipt.
+            user_id (int | None): The owner of the receipt, when it must be checked.
+
+        Returns:
+            dict | None: The receipt with its products (as archived: money as strings,
+                the creation time in ISO 8601), or None when it's not archived.
+        """
+
+        conditions = [ArchivedReceipt.id == receipt_id]
+
+        if user_id is not None:
+            # Owner only
+            conditions.append(ArchivedReceipt.user_id == user_id)
+
+        location = (await db_session.execute(
+            select(
+                ArchivedReceipt.segment,
+                ArchivedReceipt.frame_offset,
+                ArchivedReceipt.frame_length,
+            ).where(
+                *conditions
+            )
+        )).first()
+
+        if location is None:
+            # Not archived
+            return None
+
+        # Disk read & decompression off the loop
+        records = await asyncio.to_thread(self.read_frame, *location)
+
+        return next((record for record in records if record["id"] == receipt_id), None)
+
+
+# Defined archive of the app
+RECEIPT_ARCHIVE = ReceiptArchive()
+
+
+def main() -> None:
+    """
+    Moves receipts older than `ARCHIVE_RETENTION_MONTHS` to the archive, then drops emptied partitions.
+    Meant to run regularly (e.g. monthly from cron) on the host whose `ARCHIVE_DIR` the app reads.
+    """
+
+    parser = argparse.ArgumentParser(description="Moves old receipts to the cold-storage archive.")
+    parser.add_argument("--months", type=int, default=ARCHIVE_SETTINGS.retention_months)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    # Synchronous connection, like migrations
+    engine = create_engine(DATABASE_URL.replace("+asyncpg", "+psycopg2"))
+    cutoff = get_cutoff(args.months)
+
+    with engine.connect() as connection:
+        logger.info("Archived %d receipts created before %s", RECEIPT_ARCHIVE.archive(connection, cutoff), cutoff)
+
+        for name in RECEIPT_ARCHIVE.drop_empty_partitions(connection, cutoff):
+            logger.info("Dropped partition %s", name)
+
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+# coding=utf-8
+
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+
+from .metrics import CACHE_REQUESTS, CACHE_HIT_RATIO, CACHE_SIZE_BYTES
+from .settings import CACHE_SETTINGS, CacheSettings, ServerSettings
+
+
+# Defined logger
+logger = logging.getLogger("easycheck.cache")
+
+
+class MemoryCache:
+    """
+    In-process LRU cache of byte strings, evicting the least recently used entries
+    once their total size is above `max_bytes`. Counters (e.g. generations) are kept
+    apart and never evicted, so a counter can't go back to an old value.
+
+    Attributes:
+        max_bytes (int): Maximum total size of cached values.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries: OrderedDict[str, tuple[bytes, float | None]] = OrderedDict()
+        self.counters: dict[str, int] = {}
+
+    async def get(self, key: str) -> bytes | None:
+        """
+        Returns the cached value, or None when it's missing or expired.
+        """
+
+        entry = self.entries.get(key)
+
+        if entry is None:
+            # Not cached
+            return None
+
+        value, expires_at = entry
+
+        if expires_at is not None and expires_at <= time.monotonic():
+            # Expired
+            self.delete(key)
+            return None
+
+        # Recently used
+        self.entries.move_to_end(key)
+
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        """
+        Caches the value for `ttl` seconds (forever when None), evicting the least recently used ones.
+        """
+
+        if len(value) > self.max_bytes:
+            # Would evict everything else
+            return
+
+        self.delete(key)
+        self.entries[key] = (value, time.monotonic() + ttl if ttl is not None else None)
+        self.size += len(value)
+
+        while self.size > self.max_bytes:
+            self.delete(next(iter(self.entries)))
+
+        CACHE_SIZE_BYTES.set(self.size)
+
+    def delete(self, key: str) -> None:
+        """
+        Removes the entry, if it's cached.
+        """
+
+        entry = self.entries.pop(key, None)
+
+        if entry is not None:
+            self.size -= len(entry[0])
+
+    async def get_counter(self, key: str) -> int:
+        """
+        Returns the counter (0 until it's incremented).
+        """
+
+        return self.counters.get(key, 0)
+
+    async def incr(self, key: str) -> int:
+        """
+        Increments the counter and returns its new value.
+        """
+
+        self.counters[key] = self.counters.get(key, 0) + 1
+
+        return self.counters[key]
+
+    async def clear(self) -> None:
+        """
+        Removes all entries & counters.
+        """
+
+        self.entries.clear()
+        self.counters.clear()
+        self.size = 0
+        CACHE_SIZE_BYTES.set(0)
+
+
+class RedisCache:
+    """
+    Cache in a Redis-compatible server, shared by all workers (and instances) using it.
+    Errors of the server are logged and served as misses, so the app keeps working without it.
+
+    Attributes:
+        url (str): URL of the server.
+    """
+
+    def __init__(self, url: str):
+        # Imported only when the backend is used
+        import redis.asyncio
+
+        self.url = url
+        self.client = redis.asyncio.Redis.from_url(url)
+        self.errors = (redis.RedisError, OSError)
+
+    async def get(self, key: str) -> bytes | None:
+        """
+        Returns the cached value, or None when it's missing, expired or the server fails.
+        """
+
+        try:
+            return await self.client.get(key)
+
+        except self.errors as error:
+            logger.warning("Cache read failed: %s", error)
+            return None
+
+    async def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        """
+        Caches the value for `ttl` seconds (forever when None, evicted by the server's policy).
+        """
+
+        try:
+            await self.client.set(key, value, ex=int(ttl) if ttl is not None else None)
+
+        except self.errors as error:
+            logger.warning("Cache write failed: %s", error)
+
+    async def get_counter(self, key: str) -> int:
+        """
+        Returns the counter (0 until it's incremented).
+        """
+
+        try:
+            return int(await self.client.get(key) or 0)
+
+        except self.errors as error:
+            logger.warning("Cache read failed: %s", error)
+            return 0
+
+    async def incr(self, key: str) -> int:
+        """
+        Increments the counter and returns its new value.
+        """
+
+        try:
+            return await self.client.incr(key)
+
+        except self.errors as error:
+            # Cached pages of the user expire by themselves
+            logger.warning("Cache counter increment failed: %s", error)
+            return 0
+
+    async def clear(self) -> None:
+        """
+        Removes all keys of the database.
+        """
+
+        await self.client.flushdb()
+
+
+class ResponseCache:
+    """
+    Cache of receipt responses (JSON), in a pluggable backend.
+
+    A receipt never changes once created, so it's cached by its ID (with its owner, checked on reads).
+    A page of the list is cached by the filters of the request and the generation of its user:
+    a counter incremented by `create_receipt`, so pages cached before a new receipt are never read again
+    (they are evicted or expire). Generations are kept in the process when the cache is off,
+    as keys of coalesced reads (see `app/singleflight.py`).
+
+    Generations of the "memory" backend are per process: a worker would keep serving pages cached before
+    a receipt created through another worker. So with several workers, only receipts are cached in memory.
+
+    Attributes:
+        backend (MemoryCache | RedisCache | None): Where responses are kept (None when the cache is off).
+        settings (CacheSettings): Settings of the cache.
+        workers (int): Number of worker processes of the server.
+    """
+
+    def __init__(self, settings: CacheSettings = CACHE_SETTINGS, workers: int | None = None):
+        self.settings = settings
+        self.backend = build_backend(settings)
+        self.workers = ServerSettings.from_env().workers if workers is None else workers
+        self.lookups: dict[str, list[int]] = {}
+        self.generations: dict[int, int] = {}
+
+        if isinstance(self.backend, MemoryCache) and self.workers > 1:
+            logger.warning(
+                "Pages of the list are not cached by the memory backend with %d workers, use CACHE_BACKEND=redis",
+                self.workers,
+            )
+
+    @property
+    def enabled(self) -> bool:
+        """
+        Returns whether responses are cached.
+        """
+
+        return self.backend is not None
+
+    @property
+    def lists_enabled(self) -> bool:
+        """
+        Returns whether pages of the list are cached (their generations are shared by all workers).
+        """
+
+        return self.backend is not None and not (isinstance(self.backend, MemoryCache) and self.workers > 1)
+
+    def count(self, cache: str, hit: bool) -> None:
+        """
+        Counts a lookup in the metrics (hits & misses, and the hit ratio of the process).
+        """
+
+        hits, total = self.lookups.setdefault(cache, [0, 0])
+        self.lookups[cache] = [hits + hit, total + 1]
+
+        CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+        CACHE_HIT_RATIO.labels(cache=cache).set((hits + hit) / (total + 1))
+
+    async def get_receipt(self, receipt_id: int, user_id: int) -> bytes | None:
+        """
+        Returns the cached JSON of the receipt, when it's cached & belongs to the user.
+        """
+
+        value = await self.backend.get(f"receipt:{receipt_id}")
+        owner, _, content = (value or b"").partition(b":")
+        hit = value is not None and int(owner) == user_id
+        self.count("receipt", hit)
+
+        return content if hit else None
+
+    async def set_receipt(self, receipt_id: int, user_id: int, content: bytes) -> None:
+        """
+        Caches the JSON of the receipt with its owner.
+        """
+
+        await self.backend.set(f"receipt:{receipt_id}", b"%d:%s" % (user_id, content), self.settings.receipt_ttl or None)
+
+    async def get_list_key(self, user_id: int, filters: tuple) -> str:
+        """
+        Returns the key of a page of the user's list: the current generation of the user
+        and a digest of the normalized filters (& page) of the request.
+        """
+
+        generation = await self.get_generation(user_id)
+        digest = hashlib.blake2b(repr(filters).encode(), digest_size=16).hexdigest()
+
+        return f"receipts:{user_id}:{generation}:{digest}"
+
+    async def get_list(self, key: str) -> bytes | None:
+        """
+        Returns the cached JSON of a page of the list.
+        """
+
+        content = await self.backend.get(key)
+        self.count("receipts", content is not None)
+
+        return content
+
+    async def set_list(self, key: str, content: bytes) -> None:
+        """
+        Caches the JSON of a page of the list.
+        """
+
+        await self.backend.set(key, content, self.settings.list_ttl or None)
+
+    async def clear(self) -> None:
+        """
+        Removes all cached responses (e.g. after rows were changed by hand).
+        """
+
+        if self.backend is not None:
+            await self.backend.clear()
+
+    async def get_generation(self, user_id: int) -> int:
+        """
+        Returns the generation of the user's list.
+        """
+
+        if self.backend is None:
+            # Kept for coalescing of reads
+            return self.generations.get(user_id, 0)
+
+        return await self.backend.get_counter(f"generation:{user_id}")
+
+    async def bump(self, user_id: int) -> None:
+        """
+        Starts a new generation of the user's list (cached pages are no longer read,
+        and reads in flight are no longer joined).
+        """
+
+        if self.backend is None:
+            self.generations[user_id] = self.generations.get(user_id, 0) + 1
+
+        else:
+            await self.backend.incr(f"generation:{user_id}")
+
+
+def build_backend(settings: CacheSettings) -> MemoryCache | RedisCache | None:
+    """
+    Creates the backend of the configured cache (None when it's off).
+    """
+
+    if settings.backend == "memory":
+        return MemoryCache(settings.max_bytes)
+
+    if settings.backend == "redis":
+        return RedisCache(settings.redis_url)
+
+    return None
+
+
+# Defined response cache of the app
+RESPONSE_CACHE = ResponseCache()
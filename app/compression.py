@@ -0,0 +1,296 @@
+# coding=utf-8
+
+import asyncio
+import zlib
+
+import brotli
+import zstandard
+from starlette.datastructures import MutableHeaders
+
+from .metrics import get_route_path
+from .settings import COMPRESSION_SETTINGS, CompressionSettings
+
+
+# Defined content types worth compressing
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/msgpack",
+    "application/cbor",
+    "application/xml",
+    "application/javascript",
+    "text/",
+)
+
+
+class GzipCompressor:
+    """
+    Streaming gzip compressor.
+    """
+
+    def __init__(self, level: int):
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31 => gzip container
+
+    def compress(self, data: bytes) -> bytes:
+        return self.compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self.compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliCompressor:
+    """
+    Streaming brotli compressor.
+    """
+
+    def __init__(self, level: int):
+        self.compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self.compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self.compressor.flush()
+
+    def finish(self) -> bytes:
+        return self.compressor.finish()
+
+
+class ZstdCompressor:
+    """
+    Streaming zstd compressor.
+    """
+
+    def __init__(self, level: int):
+        self.compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self.compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self.compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self.compressor.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+# Defined codecs: content coding => (compressor, min level, max level), in order of preference
+CODECS = {
+    "zstd": (ZstdCompressor, 1, 22),
+    "br": (BrotliCompressor, 0, 11),
+    "gzip": (GzipCompressor, 1, 9),
+}
+
+
+def choose_codec(accept_encoding: str) -> str | None:
+    """
+    Chooses the content coding from the `Accept-Encoding` header: the highest q-value wins,
+    ties are broken by our preference (zstd, br, gzip).
+
+    Args:
+        accept_encoding (str): Value of the `Accept-Encoding` header.
+
+    Returns:
+        str | None: The content coding, or None when no supported one is accepted.
+    """
+
+    accepted: dict[str, float] = {}
+
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.partition(";")
+        quality = 1.0
+
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+
+            if key == "q":
+                try:
+                    quality = float(value)
+
+                except ValueError:
+                    # Invalid q-value
+                    quality = 0.0
+
+        accepted[name.strip()] = quality
+
+    best: str | None = None
+    best_quality = 0.0
+
+    for name in CODECS:
+        quality = accepted.get(name, accepted.get("*", 0.0))
+
+        if quality > best_quality:
+            best, best_quality = name, quality
+
+    return best
+
+
+def get_level(codec: str, scope: dict, settings: CompressionSettings) -> int:
+    """
+    Returns the compression level of the route, limited to the range of the codec.
+    """
+
+    _, min_level, max_level = CODECS[codec]
+
+    # Defined level of the route or the codec default
+    level = settings.route_levels.get(get_route_path(scope))
+
+    if level is None:
+        level = {
+            "zstd": settings.zstd_level,
+            "br": settings.brotli_level,
+            "gzip": settings.gzip_level,
+        }[codec]
+
+    return max(min_level, min(max_level, level))
+
+
+class CompressionResponder:
+    """
+    Compresses the response of one request while it's being sent.
+
+    A response sent in one body message is compressed at once (when it's large enough).
+    A streaming response is compressed chunk by chunk, each chunk is flushed,
+    so nothing is buffered and clients receive data as soon as it's produced.
+    Large bodies & chunks are compressed in a worker thread.
+    """
+
+    def __init__(self, send, codec: str, scope: dict, settings: CompressionSettings):
+        self.send = send
+        self.codec = codec
+        self.scope = scope
+        self.settings = settings
+        self.start_message: dict | None = None
+        self.compressor = None
+        self.passthrough = False
+
+    async def run(self, func, data: bytes) -> bytes:
+        """
+        Runs (de)compression inline for small data, in a worker thread for large data.
+        """
+
+        if len(data) > self.settings.offload_size:
+            # Would block the loop
+            return await asyncio.to_thread(func, data)
+
+        return func(data)
+
+    def should_compress(self, message: dict) -> bool:
+        """
+        Whether the response (by its start message) should be compressed.
+        """
+
+        headers = MutableHeaders(raw=message["headers"])
+
+        if message["status"] in (204, 304) or "content-encoding" in headers:
+            # No body or already encoded
+            return False
+
+        content_type = headers.get("content-type", "")
+
+        if not content_type.startswith(COMPRESSIBLE_TYPES):
+            # E.g. images
+            return False
+
+        content_length = headers.get("content-length")
+
+        return content_length is None or int(content_length) >= self.settings.minimum_size
+
+    def set_headers(self, message: dict, content_length: int | None) -> None:
+        """
+        Marks the response as compressed.
+        """
+
+        headers = MutableHeaders(raw=message["headers"])
+        headers["content-encoding"] = self.codec
+        headers.add_vary_header("Accept-Encoding")
+
+        if content_length is None:
+            # Streaming
+            del headers["content-length"]
+
+        else:
+            headers["content-length"] = str(content_length)
+
+    async def __call__(self, message: dict) -> None:
+        if message["type"] == "http.response.start":
+            # Wait for the first body message to decide
+            self.start_message = message
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            # Not compressed
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.start_message is not None:
+            # First body message
+            start_message, self.start_message = self.start_message, None
+
+            if not self.should_compress(start_message) or (not more_body and len(body) < self.settings.minimum_size):
+                # Send as is
+                self.passthrough = True
+                await self.send(start_message)
+                await self.send(message)
+                return
+
+            self.compressor = CODECS[self.codec][0](get_level(self.codec, self.scope, self.settings))
+
+            if not more_body:
+                # Whole body at once
+                compressed = await self.run(self.compress_last, body)
+                self.set_headers(start_message, len(compressed))
+                await self.send(start_message)
+                await self.send({"type": "http.response.body", "body": compressed})
+                return
+
+            # Streaming
+            self.set_headers(start_message, None)
+            await self.send(start_message)
+
+        await self.send({
+            "type": "http.response.body",
+            "body": await self.run(self.compress_chunk if more_body else self.compress_last, body),
+            "more_body": more_body,
+        })
+
+    def compress_chunk(self, data: bytes) -> bytes:
+        return self.compressor.compress(data) + self.compressor.flush()
+
+    def compress_last(self, data: bytes) -> bytes:
+        return self.compressor.compress(data) + self.compressor.finish()
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses with zstd, brotli or gzip, as negotiated by `Accept-Encoding`.
+    """
+
+    def __init__(self, app, settings: CompressionSettings = COMPRESSION_SETTINGS):
+        self.app = app
+        self.settings = settings
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            # Lifespan & websockets
+            await self.app(scope, receive, send)
+            return
+
+        codec = None
+
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                codec = choose_codec(value.decode("latin-1"))
+                break
+
+        if codec is None:
+            # Client doesn't accept compression
+            await self.app(scope, receive, send)
+            return
+
+        await self.app(scope, receive, CompressionResponder(send, codec, scope, self.settings))
@@ -39,3 +39,6 @@ TEST_DATABASE_URL = (
     f"{os.getenv('TEST_DATABASE_PORT')}/"
     f"{os.getenv('TEST_DATABASE_NAME')}"
 )
+
+# Defined URL of a second database standing in for a read replica (replica tests are skipped without it)
+TEST_DATABASE_REPLICA_URL = os.getenv("TEST_DATABASE_REPLICA_URL")
@@ -1,14 +1,61 @@
 # coding=utf-8
 
-from sqlalchemy.ext.asyncio import create_async_engine
+import time
+from itertools import cycle
+from dataclasses import replace
+
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from .conf import DATABASE_URL
+from .settings import DB_SETTINGS, DatabaseSettings
+from .metrics import TimedQueuePool
+
+
+def build_engine(settings: DatabaseSettings, read_only: bool = False) -> AsyncEngine:
+    """
+    Creates an async engine with the pool and driver settings provided.
+
+    Args:
+        settings (DatabaseSettings): Engine, pool and driver settings.
+        read_only (bool): Open every transaction as read-only (used for replicas).
+
+    Returns:
+        AsyncEngine: The configured engine.
+    """
+
+    # Defined server-side settings of every new connection
+    server_settings = {
+        "application_name": settings.application_name,
+        "statement_timeout": str(settings.statement_timeout),
+    }
+
+    if read_only:
+        # Any write sent to a replica fails instead of being silently attempted
+        server_settings["default_transaction_read_only"] = "on"
+
+    return create_async_engine(
+        settings.url,
+        echo=settings.echo,
+        poolclass=TimedQueuePool,
+        pool_size=settings.pool_size,
+        max_overflow=settings.max_overflow,
+        pool_timeout=settings.pool_timeout,
+        pool_recycle=settings.pool_recycle,
+        pool_pre_ping=settings.pool_pre_ping,
+        connect_args={
+            "prepared_statement_cache_size": settings.prepared_statement_cache_size,
+            "command_timeout": settings.command_timeout,
+            "server_settings": server_settings,
+        },
+    )
+
 
 # Connect to DB
-engine = create_async_engine(DATABASE_URL, echo=True)
+engine = build_engine(DB_SETTINGS)
 
 # Defined session
 SessionLocal = sessionmaker(
@@ -18,14 +65,161 @@ SessionLocal = sessionmaker(
     autocommit=False,
 )
 
+# Connect to read replicas
+replica_engines = [
+    build_engine(replace(DB_SETTINGS, url=url), read_only=True)
+    for url in DB_SETTINGS.replica_urls
+]
+
 # Defined base model class
 Base = declarative_base()
 
 
-async def get_session():
+class ReplicaRouter:
+    """
+    Chooses the session factory for read-only requests.
+
+    Reads are spread round-robin over the replicas. A client that has written
+    something keeps reading from the primary for `window` seconds, so it always
+    sees its own writes even while the replicas are lagging.
+
+    Attributes:
+        primary (sessionmaker): Session factory of the primary.
+        replicas (list[sessionmaker]): Session factories of the replicas.
+        window (float): Read-your-writes window in seconds.
+    """
+
+    # Expired write marks are dropped once there are this many of them
+    max_marks = 10000
+
+    def __init__(self, primary: sessionmaker, replicas: list[sessionmaker], window: float):
+        self.primary = primary
+        self.replicas = replicas
+        self.window = window
+        self._next_replica = cycle(replicas).__next__ if replicas else None
+        self._writes: dict[str, float] = {}
+
+    def mark_write(self, client: str | None) -> None:
+        """
+        Remembers that the client has just written, so its reads go to the primary for a while.
+        """
+
+        if client is None or not self.replicas:
+            # Nothing to remember
+            return
+
+        now = time.monotonic()
+
+        if len(self._writes) >= self.max_marks:
+            # Drop expired marks
+            self._writes = {key: until for key, until in self._writes.items() if until > now}
+
+        self._writes[client] = now + self.window
+
+    def choose(self, client: str | None = None) -> sessionmaker:
+        """
+        Returns the session factory the client should read from.
+        """
+
+        if self._next_replica is None:
+            # No replicas configured
+            return self.primary
+
+        if client is not None:
+            until = self._writes.get(client)
+
+            if until is not None:
+                if until > time.monotonic():
+                    # Inside read-your-writes window
+                    return self.primary
+
+                # Window is over
+                self._writes.pop(client, None)
+
+        return self._next_replica()
+
+
+# Defined read router
+read_router = ReplicaRouter(
+    primary=SessionLocal,
+    replicas=[
+        sessionmaker(
+            bind=replica_engine,
+            class_=AsyncSession,
+            autoflush=False,
+            autocommit=False,
+        )
+        for replica_engine in replica_engines
+    ],
+    window=DB_SETTINGS.read_your_writes_window,
+)
+
+
+def get_client_key(request: Request) -> str | None:
+    """
+    Returns the key identifying the client for read-your-writes (its bearer token).
+    """
+
+    return request.headers.get("authorization")
+
+
+def set_statement_timeout(session: AsyncSession, timeout: int) -> None:
+    """
+    Applies `statement_timeout` (in milliseconds) to every transaction of the session.
+    `SET LOCAL` is used, so the value never leaks to other sessions through the pool.
+    """
+
+    @event.listens_for(session.sync_session, "after_begin")
+    def apply_timeout(_session, _transaction, connection) -> None:
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout)}")
+
+
+async def get_session(request: Request):
     """
-    Generates a new database session for each request.
+    Generates a new database session (on the primary) for each request.
+    The endpoint's own `statement_timeout` is applied when one is configured.
     """
 
+    # Defined statement timeout of the called endpoint
+    endpoint = request.scope.get("endpoint")
+    timeout = DB_SETTINGS.statement_timeout_for(getattr(endpoint, "__name__", None))
+
+    # Defined whether the request may write
+    writes = request.method not in ("GET", "HEAD")
+
+    if writes:
+        # Keep client's next reads on the primary
+        read_router.mark_write(get_client_key(request))
+
     async with SessionLocal() as session:
+        if timeout is not None:
+            # Endpoint has its own timeout
+            set_statement_timeout(session, timeout)
+
+        yield session
+
+    if writes:
+        # Window starts again once the write is finished
+        read_router.mark_write(get_client_key(request))
+
+
+async def get_read_session(request: Request):
+    """
+    Generates a new read-only database session for each request.
+    The session uses a replica, unless the client wrote within the read-your-writes window.
+    Only use it for endpoints that never write.
+    """
+
+    # Defined statement timeout of the called endpoint
+    endpoint = request.scope.get("endpoint")
+    timeout = DB_SETTINGS.statement_timeout_for(getattr(endpoint, "__name__", None))
+
+    # Defined session factory
+    session_factory = read_router.choose(get_client_key(request))
+
+    async with session_factory() as session:
+        if timeout is not None:
+            # Endpoint has its own timeout
+            set_statement_timeout(session, timeout)
+
         yield session
@@ -0,0 +1,92 @@
+# coding=utf-8
+
+from sqlalchemy import Numeric, cast, func
+
+from app.money import from_cents, cents_column
+from app.routes.receipt.schema import ReceiptsAggregatesSchema, ReceiptsPaymentTypeAggregateSchema
+from app.settings import RECEIPT_SETTINGS
+
+
+# Defined aggregates of the filtered receipts a list can return (`aggregates=sum,avg,by_payment_type`)
+AGGREGATES = ("sum", "avg", "by_payment_type")
+
+# Defined payment types (summed by FILTER clauses, so all of them come from the one scan)
+PAYMENT_TYPES = ("cash", "card")
+
+
+def parse_aggregates(value: str | None) -> list[str]:
+    """
+    Returns names of the requested aggregates (e.g. "sum,avg" => ["sum", "avg"]), in the order of `AGGREGATES`.
+    """
+
+    requested = set((value or "").split(","))
+
+    return [name for name in AGGREGATES if name in requested]
+
+
+def aggregate_columns(receipt, aggregates: list[str]) -> list:
+    """
+    Returns aggregate columns of the requested aggregates, to be selected next to the count
+    of the filtered receipts (sums of totals in cents in the "cents" money mode).
+
+    Args:
+        receipt: The `receipt` table, or a selectable with its columns (e.g. the filtered CTE).
+        aggregates (list[str]): Names of the requested aggregates.
+
+    Returns:
+        list: Labeled columns, read back by `aggregates_dict` (& `pg_json.aggregates_json`).
+    """
+
+    if RECEIPT_SETTINGS.money_mode == "cents":
+        # Receipts without cents are summed too
+        total = cents_column(receipt.c.total_cents, receipt.c.total)
+        zero = 0
+
+    else:
+        # Empty sums are "0.00" like other amounts, not "0"
+        total = receipt.c.total
+        zero = cast(0, Numeric(10, 2))
+
+    columns = []
+
+    if "sum" in aggregates:
+        columns.append(func.coalesce(func.sum(total), zero).label("sum_total"))
+
+    if "avg" in aggregates:
+        columns.append(func.round(func.avg(total), 0 if RECEIPT_SETTINGS.money_mode == "cents" else 2).label("avg_total"))
+
+    if "by_payment_type" in aggregates:
+        for payment_type in PAYMENT_TYPES:
+            matched = receipt.c.payment_type == payment_type
+            columns.append(func.count().filter(matched).label(f"count_{payment_type}"))
+            columns.append(func.coalesce(func.sum(total).filter(matched), zero).label(f"sum_{payment_type}"))
+
+    return columns
+
+
+def aggregates_dict(aggregates: list[str], row) -> ReceiptsAggregatesSchema | None:
+    """
+    Returns the `aggregates` of a list response from a row with the columns of `aggregate_columns`.
+    """
+
+    if not aggregates:
+        # Not requested
+        return None
+
+    def to_money(value):
+        if value is None or RECEIPT_SETTINGS.money_mode != "cents":
+            return value
+
+        return from_cents(int(value))
+
+    return ReceiptsAggregatesSchema.model_construct(
+        sum=to_money(row.sum_total) if "sum" in aggregates else None,
+        avg=to_money(row.avg_total) if "avg" in aggregates else None,
+        by_payment_type={
+            payment_type: ReceiptsPaymentTypeAggregateSchema.model_construct(
+                receipts=row._mapping[f"count_{payment_type}"],
+                sum=to_money(row._mapping[f"sum_{payment_type}"]),
+            )
+            for payment_type in PAYMENT_TYPES
+        } if "by_payment_type" in aggregates else None,
+    )
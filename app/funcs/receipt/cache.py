@@ -0,0 +1,175 @@
+# coding=utf-8
+
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Awaitable, Callable, Hashable
+
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import RESPONSE_CACHE
+from app.db import get_read_session, get_session
+from app.routes.receipt.schema import ReceiptResponseSchema, ReceiptsResponseSchema
+from app.routes.receipt.serialize import RECEIPT_ADAPTER, RECEIPTS_ADAPTER
+from app.singleflight import SingleFlight
+
+from . import funcs
+from .aggregates import parse_aggregates
+
+
+# Defined coalesced reads (identical concurrent reads share one computation)
+RECEIPT_FLIGHTS = SingleFlight("receipt")
+RECEIPTS_FLIGHTS = SingleFlight("receipts")
+TEXT_FLIGHTS = SingleFlight("text")
+
+
+async def coalesce(flights: SingleFlight, key: Hashable, function: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Runs the read, joining an identical read in flight when single-flight is on.
+    """
+
+    if not RESPONSE_CACHE.settings.single_flight:
+        # Every caller reads
+        return await function()
+
+    return await flights.run(key, function)
+
+
+async def get_receipt(
+    db_session: AsyncSession,
+    receipt_id: int,
+    user_id: int,
+) -> ReceiptResponseSchema | bytes:
+    """
+    Returns the receipt of the user like `funcs.get_receipt`, as cached JSON when it was read before.
+
+    Args:
+        db_session (AsyncSession): The database session (used on misses only).
+        receipt_id (int): The ID of the receipt.
+        user_id (int): The user requesting the receipt (its owner).
+
+    Returns:
+        ReceiptResponseSchema | bytes: The receipt (JSON when the cache is on).
+    """
+
+    if RESPONSE_CACHE.enabled:
+        content = await RESPONSE_CACHE.get_receipt(receipt_id, user_id)
+
+        if content is not None:
+            # Read before
+            return content
+
+    async def load() -> ReceiptResponseSchema | bytes:
+        # Not cached, or not the owner (a 404 is raised then)
+        receipt = await funcs.get_receipt(db_session=db_session, receipt_id=receipt_id, user_id=user_id)
+
+        if not RESPONSE_CACHE.enabled:
+            # Nothing to cache
+            return receipt
+
+        content = receipt if isinstance(receipt, bytes) else RECEIPT_ADAPTER.dump_json(receipt)
+        await RESPONSE_CACHE.set_receipt(receipt_id, user_id, content)
+
+        return content
+
+    return await coalesce(RECEIPT_FLIGHTS, (receipt_id, user_id), load)
+
+
+async def get_list_session(
+    primary_session: AsyncSession = Depends(get_session),
+    read_session: AsyncSession = Depends(get_read_session),
+) -> AsyncSession:
+    """
+    Returns the session of list reads: the primary when pages are cached, a replica otherwise.
+    A replica behind the primary would return a page without the user's new receipt,
+    cached under the generation that receipt started. Sessions connect on first use only.
+    """
+
+    return primary_session if RESPONSE_CACHE.lists_enabled else read_session
+
+
+async def get_receipts(
+    db_session: AsyncSession,
+    user_id: int,
+    start_date: datetime | None = None,
+    end_date: datetime | None = None,
+    total: Decimal | None = None,
+    payment_type: str | None = None,
+    product_query: str | None = None,
+    page: int = 0,
+    on_page: int = 10,
+    aggregates: str | None = None,
+) -> dict | bytes:
+    """
+    Returns a page of the user's list like `funcs.get_receipts`, as cached JSON when the same page
+    was read since the user's last receipt (see `ResponseCache`).
+    Pages are cached only when read from the primary (see `get_list_session`).
+
+    Returns:
+        dict | bytes: The page (JSON when the cache is on).
+    """
+
+    filters = {
+        "user_id": user_id,
+        "start_date": start_date,
+        "end_date": end_date,
+        "total": total,
+        "payment_type": payment_type,
+        "product_query": product_query,
+        "page": page,
+        "on_page": on_page,
+        "aggregates": aggregates,
+    }
+
+    # Equal filters written differently share the page (e.g. time zones, "10" & "10.00", order of aggregates)
+    key = await RESPONSE_CACHE.get_list_key(user_id, (
+        start_date and funcs.as_utc(start_date).isoformat(),
+        end_date and funcs.as_utc(end_date).isoformat(),
+        total is not None and str(Decimal(str(total)).normalize()),
+        payment_type,
+        product_query,
+        page,
+        on_page,
+        tuple(parse_aggregates(aggregates)),
+    ))
+
+    if RESPONSE_CACHE.lists_enabled:
+        content = await RESPONSE_CACHE.get_list(key)
+
+        if content is not None:
+            # Read since the user's last receipt
+            return content
+
+    async def load() -> dict | bytes:
+        receipts = await funcs.get_receipts(db_session=db_session, **filters)
+
+        if not RESPONSE_CACHE.lists_enabled:
+            # Nothing to cache
+            return receipts
+
+        content = receipts if isinstance(receipts, bytes) else RECEIPTS_ADAPTER.dump_json(
+            ReceiptsResponseSchema.model_construct(**receipts)
+        )
+        await RESPONSE_CACHE.set_list(key, content)
+
+        return content
+
+    # Reads started before the user's last receipt are not joined (the key has the generation)
+    return await coalesce(RECEIPTS_FLIGHTS, key, load)
+
+
+async def get_receipt_text(
+    db_session: AsyncSession,
+    receipt_id: int,
+    width: int,
+) -> str:
+    """
+    Returns the text of the receipt like `funcs.get_receipt_text`; identical concurrent requests
+    (e.g. a QR code scanned by a crowd) share one query & render.
+    """
+
+    return await coalesce(
+        TEXT_FLIGHTS,
+        (receipt_id, width),
+        lambda: funcs.get_receipt_text(db_session=db_session, receipt_id=receipt_id, width=width),
+    )
@@ -0,0 +1,224 @@
+# coding=utf-8
+
+import asyncio
+import json
+import logging
+import secrets
+from typing import AsyncIterator
+
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.future import select
+
+from app.models import Receipt
+from app.pubsub import PubSub
+from app.routes.receipt.schema import ReceiptResponseSchema
+from app.routes.receipt.serialize import RECEIPT_ADAPTER
+from app.settings import FEED_SETTINGS, FeedSettings
+
+from . import pg_json
+
+
+# Defined logger
+logger = logging.getLogger("easycheck.feed")
+
+# Defined feed of new receipts of this process (topics are user IDs, messages are SSE events)
+RECEIPT_FEED = PubSub("receipts", FEED_SETTINGS.buffer_size)
+
+# Defined ID of this process in notifications (its own receipts are published without them)
+INSTANCE_ID = secrets.token_hex(8)
+
+
+def receipt_event(receipt_id: int, content: bytes) -> bytes:
+    """
+    Returns the Server-Sent Event of a new receipt (its ID is the event ID, its JSON the data).
+    """
+
+    return b"id: %d\nevent: receipt\ndata: %s\n\n" % (receipt_id, content)
+
+
+async def notify_receipt(db_session: AsyncSession, user_id: int, receipt_id: int) -> None:
+    """
+    Announces a new receipt to other workers, in the transaction creating it:
+    Postgres delivers the notification on commit only, and never for a rolled back receipt.
+    """
+
+    if not FEED_SETTINGS.notify:
+        # Subscribers of this worker only
+        return
+
+    payload = json.dumps({"user_id": user_id, "id": receipt_id, "instance": INSTANCE_ID})
+    await db_session.execute(select(func.pg_notify(FEED_SETTINGS.channel, payload)))
+
+
+def publish_receipt(user_id: int, receipt_id: int, receipt: ReceiptResponseSchema | bytes) -> None:
+    """
+    Sends a new receipt (as created) to subscribers of its user in this process.
+    """
+
+    if not RECEIPT_FEED.has_subscribers(user_id):
+        # Nobody to serialize it for
+        return
+
+    content = receipt if isinstance(receipt, bytes) else RECEIPT_ADAPTER.dump_json(receipt)
+    RECEIPT_FEED.publish(user_id, receipt_event(receipt_id, content))
+
+
+async def stream_receipts(user_id: int, settings: FeedSettings = FEED_SETTINGS) -> AsyncIterator[bytes]:
+    """
+    Yields Server-Sent Events of new receipts of the user until the client goes away
+    (or reads too slowly: the stream ends, and the client reconnects & syncs what it missed).
+    """
+
+    subscription = RECEIPT_FEED.subscribe(user_id)
+
+    try:
+        # Sent at once, so the response starts (and proxies pass it on) before the first receipt
+        yield b"retry: %d\n\n" % int(settings.reconnect_delay * 1000)
+
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), settings.keepalive)
+
+            except asyncio.TimeoutError:
+                # Idle connections are not closed by proxies
+                yield b": keepalive\n\n"
+                continue
+
+            if event is None:
+                # Closed (buffer was full)
+                return
+
+            yield event
+
+    finally:
+        RECEIPT_FEED.unsubscribe(subscription)
+
+
+class FeedBridge:
+    """
+    Publishes receipts created by other workers (& instances) to subscribers of this process:
+    listens to the `NOTIFY` channel on a dedicated connection, and loads announced receipts
+    (once per worker) only when their user has subscribers here.
+
+    Notifications sent while the connection is lost are missed; it's opened again after
+    `reconnect_delay` seconds (doubled while it keeps failing).
+    """
+
+    def __init__(self, engine: AsyncEngine, settings: FeedSettings = FEED_SETTINGS):
+        self.engine = engine
+        self.settings = settings
+        self.task: asyncio.Task | None = None
+        self.loads: set[asyncio.Task] = set()
+        self.listening = asyncio.Event()
+
+    async def start(self) -> None:
+        """
+        Starts listening in the background.
+        """
+
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """
+        Stops listening (and loading announced receipts).
+        """
+
+        for task in [self.task, *self.loads]:
+            if task is not None:
+                task.cancel()
+
+                try:
+                    await task
+
+                except asyncio.CancelledError:
+                    pass
+
+    async def run(self) -> None:
+        delay = self.settings.reconnect_delay
+
+        while True:
+            try:
+                await self.listen()
+
+            except Exception:
+                # Listened again after the delay
+                logger.exception("Receipt feed connection failed")
+
+            else:
+                # Lost connection
+                delay = self.settings.reconnect_delay
+                logger.warning("Receipt feed connection lost, listening again in %.1f s", delay)
+
+            self.listening.clear()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 60.0)
+
+    async def listen(self) -> None:
+        """
+        Listens to the channel until the connection is closed.
+        """
+
+        async with self.engine.connect() as connection:
+            raw_connection = await connection.get_raw_connection()
+            driver_connection = raw_connection.driver_connection
+
+            closed = asyncio.Event()
+            driver_connection.add_termination_listener(lambda _connection: closed.set())
+            await driver_connection.add_listener(self.settings.channel, self.on_notification)
+            self.listening.set()
+
+            try:
+                await closed.wait()
+
+            finally:
+                if driver_connection.is_closed():
+                    # Not returned to the pool
+                    await connection.invalidate()
+
+                else:
+                    # Back to the pool
+                    await driver_connection.remove_listener(self.settings.channel, self.on_notification)
+
+    def on_notification(self, _connection, _pid: int, _channel: str, payload: str) -> None:
+        """
+        Loads & publishes an announced receipt when its user has subscribers here.
+        """
+
+        notification = json.loads(payload)
+
+        if notification["instance"] == INSTANCE_ID:
+            # Published by this process already
+            return
+
+        if not RECEIPT_FEED.has_subscribers(notification["user_id"]):
+            # Nobody to load it for
+            return
+
+        task = asyncio.create_task(self.load(notification["user_id"], notification["id"]))
+        self.loads.add(task)
+        task.add_done_callback(self.loads.discard)
+
+    async def load(self, user_id: int, receipt_id: int) -> None:
+        """
+        Publishes the receipt as JSON assembled by Postgres (in the shape of `GET /receipts/{id}`).
+        """
+
+        try:
+            # From the primary, which committed it
+            async with AsyncSession(self.engine) as db_session:
+                content = await pg_json.get_receipt_json(
+                    db_session=db_session,
+                    conditions=[
+                        Receipt.id == receipt_id,
+                        Receipt.user_id == user_id,
+                    ],
+                )
+
+        except Exception:
+            # Subscribers sync it later
+            logger.exception("Loading receipt %s for the feed failed", receipt_id)
+            return
+
+        if content is not None:
+            RECEIPT_FEED.publish(user_id, receipt_event(receipt_id, content))
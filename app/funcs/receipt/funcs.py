@@ -1,7 +1,8 @@
 # coding=utf-8
 
 from typing import Literal
-from datetime import datetime
+from datetime import datetime, timezone
+from decimal import Decimal
 from fastapi import HTTPException
 
 from sqlalchemy import func
@@ -9,14 +10,35 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload, Query
 from sqlalchemy.future import select
 
-from app.routes.receipt.schema import ReceiptRequestSchema
-from app.models import Receipt, ReceiptProduct
+from app.routes.receipt.schema import (
+    ReceiptRequestSchema,
+    ReceiptResponseSchema,
+    ReceiptProductResponseSchema,
+    ReceiptPaymentSchema,
+)
+from app.routes.receipt.serialize import RECEIPT_ADAPTER
+from app.archive import RECEIPT_ARCHIVE
+from app.cache import RESPONSE_CACHE
+from app.models import Receipt, ReceiptProduct, Product, User
+from app.metrics import TEXT_RENDER_SECONDS
+from app.money import to_cents, from_cents, format_cents, cents_column, cents_or_amount
+from app.outbox import add_event
+from app.settings import RECEIPT_SETTINGS
+
+from . import pg_json
+from .aggregates import aggregate_columns, aggregates_dict, parse_aggregates
+from .feed import notify_receipt, publish_receipt
+from .idempotency import IDEMPOTENCY_KEYS, get_request_hash
+from .products import PRODUCT_TITLES
+from .search import product_query_filter
+from .stats import add_to_stats, add_products_to_stats
 
 
 async def create_receipt(
         user_id: int,
         db_session: AsyncSession,
-        receipt_data: ReceiptRequestSchema
+        receipt_data: ReceiptRequestSchema,
+        idempotency_key: str | None = None,
 ) -> dict:
     """
     Function to create a receipt and calculate total values.
@@ -25,31 +47,80 @@ async def create_receipt(
         user_id (int): The user ID who is creating the receipt.
         db_session (AsyncSession): Database session for interacting with the database.
         receipt_data (ReceiptRequestSchema): Data for creating a receipt.
+        idempotency_key (str | None): The `Idempotency-Key` header: a receipt already created
+            with it is returned instead of creating another one.
 
     Returns:
         dict: Created receipt with include information
     """
 
+    if idempotency_key is not None:
+        # Defined fingerprint of the request (the key can't be reused for another receipt)
+        request_hash = get_request_hash(receipt_data)
+
+        # Retried request
+        receipt_id = await IDEMPOTENCY_KEYS.get_receipt_id(db_session, user_id, idempotency_key, request_hash)
+
+        if receipt_id is not None:
+            return await get_receipt(receipt_id=receipt_id, db_session=db_session, user_id=user_id)
+
+    # Defined money mode (amounts are computed in cents or as Decimals)
+    cents_mode = RECEIPT_SETTINGS.money_mode == "cents"
+
+    # Defined IDs of product titles
+    product_ids = await PRODUCT_TITLES.get_ids(
+        db_session=db_session,
+        user_id=user_id,
+        titles=[product.title for product in receipt_data.products],
+    )
+
     # Set default value
     total = 0
+    unit_count = 0
     items = []
 
     for product in receipt_data.products:
+        # Defined price in cents (stored next to the Decimal price)
+        price_cents = to_cents(product.price)
+        line_total_cents = price_cents * product.quantity
+
         # Defined total price for item
-        item_total = product.price * product.quantity
+        item_total = line_total_cents if cents_mode else product.price * product.quantity
 
         items.append(
             ReceiptProduct(
-                title=product.title,
+                product_id=product_ids[product.title],
                 price=product.price,
+                price_cents=price_cents,
                 quantity=product.quantity,
+                line_total=from_cents(line_total_cents),  # Of the stored (rounded) price
+                line_total_cents=line_total_cents,
             ))
 
-        # Defined total price for receipt
+        # Defined total price & units for receipt
         total += item_total
+        unit_count += product.quantity
+
+    if cents_mode:
+        # Integer arithmetic, Decimals are derived
+        total_cents = total
+        payment_amount_cents = to_cents(receipt_data.payment.amount)
+        rest_cents = payment_amount_cents - total_cents
+        total = from_cents(total_cents)
+        rest = from_cents(rest_cents)
+
+    else:
+        # Defined 'rest' value for receipt
+        rest = receipt_data.payment.amount - total
+        total_cents = to_cents(total)
+        payment_amount_cents = to_cents(receipt_data.payment.amount)
+        rest_cents = to_cents(rest)
 
-    # Defined 'rest' value for receipt
-    rest = receipt_data.payment.amount - total
+    # Defined creation time (also the partition key of the lines)
+    created_at = datetime.utcnow()
+
+    for item in items:
+        item.receipt_created_at = created_at
 
     # Step 3: Create a new receipt and add it to the database
     receipt = Receipt(
@@ -58,28 +129,246 @@ async def create_receipt(
         payment_type=receipt_data.payment.type,
         payment_amount=receipt_data.payment.amount,
         rest=rest,
+        total_cents=total_cents,
+        payment_amount_cents=payment_amount_cents,
+        rest_cents=rest_cents,
+        item_count=len(items),
+        unit_count=unit_count,
+        created_at=created_at,
         products=items
     )
 
     # Save all changes
     db_session.add(receipt)
+    await db_session.flush()
+
+    # Defined receipt ID (read before commit expires the object)
+    receipt_id = receipt.id
+
+    if idempotency_key is not None and not await IDEMPOTENCY_KEYS.claim(
+        db_session, user_id, idempotency_key, request_hash, receipt_id,
+    ):
+        # Created by a concurrent request with the same key (committed meanwhile)
+        await db_session.rollback()
+        receipt_id = await IDEMPOTENCY_KEYS.get_receipt_id(db_session, user_id, idempotency_key, request_hash)
+
+        return await get_receipt(receipt_id=receipt_id, db_session=db_session, user_id=user_id)
+
+    # Defined daily sales (committed with the receipt)
+    await add_to_stats(
+        db_session=db_session,
+        user_id=user_id,
+        created_at=created_at,
+        payment_type=receipt_data.payment.type,
+        total=total,
+        payment_amount=receipt_data.payment.amount,
+        rest=rest,
+    )
+    await add_products_to_stats(
+        db_session=db_session,
+        user_id=user_id,
+        created_at=created_at,
+        items=items,
+    )
+
+    # Downstream systems get the receipt if and only if it's committed
+    add_event(
+        db_session=db_session,
+        event_type="receipt.created",
+        user_id=user_id,
+        payload=RECEIPT_ADAPTER.dump_python(
+            # Of the stored (rounded) amounts, as `GET /receipts/{id}` returns them
+            ReceiptResponseSchema(
+                id=receipt_id,
+                total=from_cents(total_cents),
+                rest=from_cents(rest_cents),
+                created_at=created_at,
+                products=[
+                    ReceiptProductResponseSchema(
+                        title=product.title,
+                        price=from_cents(item.price_cents),
+                        quantity=item.quantity,
+                        total=from_cents(item.line_total_cents),
+                    )
+                    for product, item in zip(receipt_data.products, items)
+                ],
+                payment=ReceiptPaymentSchema(
+                    type=receipt_data.payment.type,
+                    amount=from_cents(payment_amount_cents),
+                ),
+            ),
+            mode="json",
+        ),
+    )
+
+    # Other workers learn about the receipt once it's committed
+    await notify_receipt(db_session, user_id, receipt_id)
     await db_session.commit()
-    await db_session.refresh(receipt)
 
-    return await get_receipt(
-        receipt_id=receipt.id,
+    if idempotency_key is not None:
+        # Retries are answered without a lookup
+        IDEMPOTENCY_KEYS.put(user_id, idempotency_key, receipt_id, request_hash)
+
+    # Cached pages of the user's list are outdated
+    await RESPONSE_CACHE.bump(user_id)
+
+    created_receipt = await get_receipt(
+        receipt_id=receipt_id,
         db_session=db_session,
         user_id=user_id
     )
 
+    # Live feeds of the user's screens
+    publish_receipt(user_id, receipt_id, created_receipt)
+
+    return created_receipt
+
+
+# Defined receipt columns of the response
+RECEIPT_COLUMNS = (
+    Receipt.id,
+    Receipt.total,
+    Receipt.rest,
+    Receipt.created_at,
+    Receipt.payment_type,
+    Receipt.payment_amount,
+)
+
+# Defined title of a product line (from the product dictionary, or stored in rows not migrated yet)
+PRODUCT_TITLE = func.coalesce(Product.title, ReceiptProduct.stored_title)
+
+# Defined product columns of the response (selected from `receipt_product` outer joined with `product`)
+# (line totals are stored on creation, rows not backfilled yet fall back to price by quantity)
+PRODUCT_COLUMNS = (
+    ReceiptProduct.receipt_id,
+    PRODUCT_TITLE,
+    ReceiptProduct.price,
+    ReceiptProduct.quantity,
+    func.coalesce(ReceiptProduct.line_total, ReceiptProduct.price * ReceiptProduct.quantity),
+)
+
+# Defined same columns with money in cents ("cents" money mode)
+# (cents columns are nullable: rows without them are converted from the Numeric columns)
+RECEIPT_CENTS_COLUMNS = (
+    Receipt.id,
+    cents_column(Receipt.total_cents, Receipt.total).label("total_cents"),
+    cents_column(Receipt.rest_cents, Receipt.rest).label("rest_cents"),
+    Receipt.created_at,
+    Receipt.payment_type,
+    cents_column(Receipt.payment_amount_cents, Receipt.payment_amount).label("payment_amount_cents"),
+)
+PRODUCT_CENTS_COLUMNS = (
+    ReceiptProduct.receipt_id,
+    PRODUCT_TITLE,
+    cents_column(ReceiptProduct.price_cents, ReceiptProduct.price),
+    ReceiptProduct.quantity,
+    func.coalesce(
+        ReceiptProduct.line_total_cents,
+        cents_column(ReceiptProduct.price_cents, ReceiptProduct.price) * ReceiptProduct.quantity,
+    ),
+)
+
+
+def receipt_columns() -> tuple:
+    """
+    Returns receipt columns of the response in the configured money mode.
+    """
+
+    return RECEIPT_CENTS_COLUMNS if RECEIPT_SETTINGS.money_mode == "cents" else RECEIPT_COLUMNS
+
+
+async def build_receipts(
+    db_session: AsyncSession,
+    receipt_rows: list,
+) -> list[ReceiptResponseSchema]:
+    """
+    Builds response models of receipts straight from row tuples, without ORM objects
+    and without validation (values come from the database, so they are valid already).
+    Products of all receipts are loaded with one query.
+
+    In "cents" money mode amounts are read as integers and converted to Decimals here.
+
+    Args:
+        db_session (AsyncSession): The database session.
+        receipt_rows (list): Rows with `receipt_columns()` of the receipts.
+
+    Returns:
+        list[ReceiptResponseSchema]: Response models in the order of the rows.
+    """
+
+    if not receipt_rows:
+        # Nothing to load
+        return []
+
+    # Defined money mode
+    cents_mode = RECEIPT_SETTINGS.money_mode == "cents"
+
+    # Defined products of each receipt
+    products: dict[int, list[ReceiptProductResponseSchema]] = {row[0]: [] for row in receipt_rows}
+
+    product_rows = await db_session.execute(
+        select(
+            *(PRODUCT_CENTS_COLUMNS if cents_mode else PRODUCT_COLUMNS)
+        ).outerjoin(
+            Product,
+            Product.id == ReceiptProduct.product_id,
+        ).where(
+            ReceiptProduct.receipt_id.in_(products.keys()),
+            # Only partitions of the page's months are scanned
+            ReceiptProduct.receipt_created_at.between(
+                min(row[3] for row in receipt_rows),
+                max(row[3] for row in receipt_rows),
+            ),
+        ).order_by(
+            ReceiptProduct.id
+        )
+    )
+
+    for receipt_id, title, price, quantity, total in product_rows:
+        if cents_mode:
+            # Decimals only in the response
+            price, total = from_cents(price), from_cents(total)
+
+        products[receipt_id].append(
+            ReceiptProductResponseSchema.model_construct(
+                title=title,
+                price=price,
+                quantity=quantity,
+                total=total,
+            )
+        )
+
+    if cents_mode:
+        # Decimals only in the response
+        receipt_rows = [
+            (receipt_id, from_cents(total), from_cents(rest), created_at, payment_type, from_cents(payment_amount))
+            for receipt_id, total, rest, created_at, payment_type, payment_amount in receipt_rows
+        ]
+
+    return [
+        ReceiptResponseSchema.model_construct(
+            id=receipt_id,
+            total=total,
+            rest=rest,
+            created_at=created_at,
+            products=products[receipt_id],
+            payment=ReceiptPaymentSchema.model_construct(
+                type=payment_type,
+                amount=payment_amount,
+            ),
+        )
+        for receipt_id, total, rest, created_at, payment_type, payment_amount in receipt_rows
+    ]
+
 
 async def get_receipt(
     receipt_id: int,
     user_id: int,
     db_session: AsyncSession
-) -> dict:
+) -> ReceiptResponseSchema | bytes:
     """
     Function to retrieve a receipt by its ID, including associated items and payment method.
+    Receipts moved to the cold-storage archive are read from it.
 
     Args:
         receipt_id (int): The ID of the receipt to be retrieved.
@@ -90,31 +379,188 @@ async def get_receipt(
         HTTPException: If no receipt is found with the given ID, raises a 404 error.
 
     Returns:
-        dict: The receipt data including its ID, products, payment info, and other details.
+        ReceiptResponseSchema | bytes: The receipt data including its ID, products, payment info,
+            and other details (ready JSON when the "postgres" read engine is on).
     """
 
+    if RECEIPT_SETTINGS.read_engine == "postgres":
+        # JSON is assembled by Postgres
+        receipt_json = await pg_json.get_receipt_json(
+            db_session=db_session,
+            conditions=[
+                Receipt.id == receipt_id,
+                Receipt.user_id == user_id,
+            ],
+        )
+
+        if receipt_json is not None:
+            return receipt_json
+
+        return await get_archived_receipt(db_session, receipt_id, user_id)
+
     # Get receipt from DB
-    receipt: Receipt | None = await db_session.scalar(
+    receipt_rows = (await db_session.execute(
         select(
-            Receipt
-        ).options(
-            joinedload(
-                Receipt.products
-            ),
+            *receipt_columns()
         ).where(
             Receipt.id == receipt_id,
             Receipt.user_id == user_id,
         )
-    )
+    )).all()
 
-    if not receipt:
+    if not receipt_rows:
+        # Not in the hot tables
+        return await get_archived_receipt(db_session, receipt_id, user_id)
+
+    receipts = await build_receipts(db_session, receipt_rows)
+
+    return receipts[0]
+
+
+async def get_archived_receipt(
+    db_session: AsyncSession,
+    receipt_id: int,
+    user_id: int,
+) -> ReceiptResponseSchema:
+    """
+    Function to retrieve a receipt moved to the cold-storage archive.
+
+    Args:
+        db_session (AsyncSession): The database session (to read the archive index).
+        receipt_id (int): The ID of the receipt.
+        user_id (int): The user ID who want to get receipt.
+
+    Raises:
+        HTTPException: If the receipt isn't archived either, raises a 404 error.
+
+    Returns:
+        ReceiptResponseSchema: The receipt, in the same shape as receipts of the hot tables.
+    """
+
+    record = await RECEIPT_ARCHIVE.get(db_session, receipt_id, user_id)
+
+    if record is None:
         # Not found
         raise HTTPException(
             status_code=404,
             detail=f"Receipt with ID {receipt_id} not found"
         )
 
-    return receipt
+    return ReceiptResponseSchema.model_construct(
+        id=record["id"],
+        total=Decimal(record["total"]),
+        rest=Decimal(record["rest"]),
+        created_at=datetime.fromisoformat(record["created_at"]),
+        products=[
+            ReceiptProductResponseSchema.model_construct(
+                title=product["title"],
+                price=Decimal(product["price"]),
+                quantity=product["quantity"],
+                total=Decimal(product["line_total"]),
+            )
+            for product in record["products"]
+        ],
+        payment=ReceiptPaymentSchema.model_construct(
+            type=record["payment_type"],
+            amount=Decimal(record["payment_amount"]),
+        ),
+    )
+
+
+def archived_receipt_model(record: dict, user: User) -> Receipt:
+    """
+    Builds a transient (never saved) receipt with its products from an archived receipt,
+    for code working with models (e.g. the text receipt).
+    """
+
+    money = ("total", "payment_amount", "rest")
+
+    return Receipt(
+        **{
+            key: Decimal(value) if key in money else value
+            for key, value in record.items()
+            if key not in ("products", "created_at")
+        },
+        created_at=datetime.fromisoformat(record["created_at"]),
+        user=user,
+        products=[
+            ReceiptProduct(
+                product=Product(title=product["title"]),
+                price=Decimal(product["price"]),
+                price_cents=product["price_cents"],
+                quantity=product["quantity"],
+                line_total=Decimal(product["line_total"]),
+                line_total_cents=product["line_total_cents"],
+            )
+            for product in record["products"]
+        ],
+    )
+
+
+def as_utc(value: datetime) -> datetime:
+    """
+    Converts a datetime with a time zone to naive UTC, like `created_at` is stored.
+    Compared to an aware value, the column would be cast to `timestamptz` in SQL,
+    which hides it from partition pruning (and indexes).
+    """
+
+    if value.tzinfo is None:
+        # Naive values are UTC already
+        return value
+
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def receipt_filters(
+    user_id: int,
+    start_date: datetime | None = None,
+    end_date: datetime | None = None,
+    total: float | None = None,
+    payment_type: str | None = None,
+    product_query: str | None = None,
+) -> list:
+    """
+    Builds filter conditions of the receipt list, shared by all read engines.
+
+    Args:
+        user_id (int): The ID of the user whose receipts we are fetching.
+        start_date (datetime | None): Filter receipts by start date.
+        end_date (datetime | None): Filter receipts by end date.
+        total (float | None): Filter receipts with a total greater than or equal to the given value.
+        payment_type (str | None): Filter by payment type (cash or card).
+        product_query (str | None): Filter receipts containing a product whose title contains the text.
+
+    Returns:
+        list: SQL conditions to be combined with AND.
+    """
+
+    conditions = [Receipt.user_id == user_id]
+
+    if start_date:
+        # Filter by start data
+        conditions.append(Receipt.created_at >= as_utc(start_date))
+
+    if end_date:
+        # Filter by end data
+        conditions.append(Receipt.created_at <= as_utc(end_date))
+
+    if total is not None:
+        # Filter by total price of receipt
+        if RECEIPT_SETTINGS.money_mode == "cents":
+            conditions.append(cents_column(Receipt.total_cents, Receipt.total) >= to_cents(Decimal(str(total))))
+
+        else:
+            conditions.append(Receipt.total >= total)
+
+    if payment_type:
+        # Filter by payment type
+        conditions.append(Receipt.payment_type == payment_type)
+
+    if product_query:
+        # Filter by product titles
+        conditions.append(product_query_filter(user_id, product_query))
+
+    return conditions
 
 
 async def get_receipts(
@@ -124,12 +570,15 @@ async def get_receipts(
     end_date: datetime | None = None,
     total: float | None = None,
     payment_type: str | None = None,
+    product_query: str | None = None,
     page: int | None = 0,
-    on_page: int | None = 10
-) -> dict:
+    on_page: int | None = 10,
+    aggregates: str | None = None,
+) -> dict | bytes:
     """
     Function to retrieve a list of receipts for a user, applying filters and pagination.
-    We first fetch all receipts for the user, apply filters, and then calculate totals and pagination.
+    The count of filtered receipts and the requested aggregates are calculated by one query,
+    receipts of the page by another.
 
     Args:
         db_session (AsyncSession): The database session.
@@ -138,57 +587,81 @@ async def get_receipts(
         end_date (datetime | None): Filter receipts by end date.
         total (float | None): Filter receipts with a total greater than or equal to the given value.
         payment_type (str | None): Filter by payment type (cash or card).
+        product_query (str | None): Filter receipts containing a product whose title contains the text.
         page (int): The page number for pagination.
         on_page (int): The number of records per page.
+        aggregates (str | None): Comma-separated aggregates of filtered receipts (sum, avg, by_payment_type).
 
     Returns:
-        dict: The filtered and paginated list of receipts with total calculations.
+        dict | bytes: The filtered and paginated list of receipts with total calculations
+            (ready JSON when the "postgres" read engine is on).
     """
 
+    # Defined requested aggregates
+    aggregates = parse_aggregates(aggregates)
+
+    if RECEIPT_SETTINGS.read_engine == "postgres":
+        # JSON is assembled by Postgres
+        return await pg_json.get_receipts_json(
+            db_session=db_session,
+            conditions=receipt_filters(
+                user_id=user_id,
+                start_date=start_date,
+                end_date=end_date,
+                total=total,
+                payment_type=payment_type,
+                product_query=product_query,
+            ),
+            page=page,
+            on_page=on_page,
+            aggregates=aggregates,
+        )
+
     # Create a base query for receipts
     query: Query = select(
-        Receipt
-    ).options(
-        joinedload(
-            Receipt.products
-        )
+        *receipt_columns()
     ).filter(
-        Receipt.user_id == user_id
+        *receipt_filters(
+            user_id=user_id,
+            start_date=start_date,
+            end_date=end_date,
+            total=total,
+            payment_type=payment_type,
+            product_query=product_query,
+        )
     )
 
-    # Filters
-    if start_date:
-        # Filter by start data
-        query = query.filter(Receipt.created_at >= start_date)
-
-    if end_date:
-        # Filter by end data
-        query = query.filter(Receipt.created_at <= end_date)
-
-    if total is not None:
-        # Filter by total price of receipt
-        query = query.filter(Receipt.total >= total)
-
-    if payment_type:
-        # # Filter by payment type
-        query = query.filter(Receipt.payment_type == payment_type)
+    # Defined filtered receipts (all money columns, for aggregates)
+    filtered = select(
+        Receipt.__table__
+    ).filter(
+        *receipt_filters(
+            user_id=user_id,
+            start_date=start_date,
+            end_date=end_date,
+            total=total,
+            payment_type=payment_type,
+            product_query=product_query,
+        )
+    ).subquery()
 
-    # Defined total count of receipts
-    total_receipts_result = await db_session.execute(
+    # Defined total count of receipts & aggregates (in one pass)
+    count_row = (await db_session.execute(
         select(
-            func.count()
+            func.count().label("total"),
+            *aggregate_columns(filtered, aggregates),
         ).select_from(
-            query.subquery()
+            filtered
         )
-    )
-    total_receipts = total_receipts_result.scalar_one() or 0
+    )).one()
+    total_receipts = count_row.total or 0
 
     # Apply pagination
-    query = query.limit(on_page).offset(page * on_page)
+    query = query.order_by(Receipt.id).limit(on_page).offset(page * on_page)
 
     # Defined receipts with pagination and filters
     results = await db_session.execute(query)
-    receipts: list[Receipt] = results.scalars().unique().all()
+    receipts = await build_receipts(db_session, results.all())
 
     # Defined next page
     next_page = (page + 1 if on_page * (page + 1) < total_receipts else None)
@@ -198,7 +671,8 @@ async def get_receipts(
         "page": page,
         "on_page": on_page,
         "next_page": next_page,
-        "results": receipts
+        "results": receipts,
+        "aggregates": aggregates_dict(aggregates, count_row),
     }
 
 
@@ -208,7 +682,7 @@ async def get_receipt_text(
     width: int,
 ) -> dict:
     """"
-    Retrieves the formatted text representation of a receipt.
+    Retrieves the formatted text representation of a receipt (archived receipts included).
 
     Args:
         db_session (AsyncSession): Database session for querying the receipt.
@@ -229,6 +703,8 @@ async def get_receipt_text(
         ).options(
             joinedload(
                 Receipt.products
+            ).joinedload(
+                ReceiptProduct.product
             ),
             joinedload(
                 Receipt.user
@@ -239,17 +715,28 @@ async def get_receipt_text(
     )
 
     if not receipt:
-        # Not found
-        raise HTTPException(
-            status_code=404,
-            detail=f"Receipt with ID {receipt_id} not found"
-        )
+        # Not in the hot tables
+        record = await RECEIPT_ARCHIVE.get(db_session, receipt_id)
+
+        if record is None:
+            # Not found
+            raise HTTPException(
+                status_code=404,
+                detail=f"Receipt with ID {receipt_id} not found"
+            )
+
+        # Defined owner (a detached copy, so the transient receipt never joins the session)
+        user_row = (await db_session.execute(
+            select(User.first_name, User.last_name).where(User.id == record["user_id"])
+        )).one()
+        receipt = archived_receipt_model(record, User(first_name=user_row.first_name, last_name=user_row.last_name))
 
     # Defined receipt text
-    receipt_text = get_total_text(
-        receipt=receipt,
-        width=width,
-    )
+    with TEXT_RENDER_SECONDS.time():
+        receipt_text = get_total_text(
+            receipt=receipt,
+            width=width,
+        )
 
     return receipt_text
 
@@ -492,6 +979,9 @@ def get_total_text(receipt: Receipt, width: int = 32, min_spaces: int = 5) -> st
     Get formatted string of receipt.
     """
 
+    # Defined money mode ("cents" => amounts are multiplied & formatted as integers)
+    cents_mode = RECEIPT_SETTINGS.money_mode == "cents"
+
     # Prepare separators
     main_separator = "=" * width
     item_separator = "-" * width
@@ -512,12 +1002,25 @@ def get_total_text(receipt: Receipt, width: int = 32, min_spaces: int = 5) -> st
     # Form lines for each item
 
     for index, product in enumerate(receipt.products):
+        # Defined price & total price of the product
+        if cents_mode:
+            price_cents = cents_or_amount(product.price_cents, product.price)
+            price = format_cents(price_cents)
+            product_total = format_cents(
+                product.line_total_cents if product.line_total_cents is not None
+                else price_cents * product.quantity
+            )
+
+        else:
+            price = format_number(product.price)
+            product_total = format_number(product.total)
+
         # Add count & price
         lines.append(
             format_lines(
                 width=width,
                 min_spaces=min_spaces,
-                left=f"{product.quantity} x {format_number(product.price)}",
+                left=f"{product.quantity} x {price}",
                 left_hyphen=False,  # Break words without hyphen (because it's a numbers)
             ),
         )
@@ -528,7 +1031,7 @@ def get_total_text(receipt: Receipt, width: int = 32, min_spaces: int = 5) -> st
                 width=width,
                 min_spaces=min_spaces,
                 left=product.title,
-                right=format_number(product.total),
+                right=product_total,
                 right_hyphen=False,  # Break words without hyphen (because it's a numbers)
                 priority="right",  # Priority to fit price
             ),
@@ -542,13 +1045,22 @@ def get_total_text(receipt: Receipt, width: int = 32, min_spaces: int = 5) -> st
             # Add item separator
             lines.append(item_separator)
 
+    # Defined total & change of the receipt
+    if cents_mode:
+        total = format_cents(cents_or_amount(receipt.total_cents, receipt.total))
+        rest = format_cents(cents_or_amount(receipt.rest_cents, receipt.rest))
+
+    else:
+        total = format_number(receipt.total)
+        rest = format_number(receipt.rest)
+
     # Add sum
     lines.append(
         format_lines(
             width=width,
             min_spaces=min_spaces,
             left="СУМА",
-            right=format_number(receipt.total),
+            right=total,
             right_hyphen=False,  # Break words without hyphen (because it's a numbers)
             priority="left",  # Priority to fit "СУМА"
         ),
@@ -560,7 +1072,7 @@ def get_total_text(receipt: Receipt, width: int = 32, min_spaces: int = 5) -> st
             width=width,
             min_spaces=min_spaces,
             left=receipt.payment_type,
-            right=format_number(receipt.total),
+            right=total,
             right_hyphen=False,  # Break words without hyphen (because it's a numbers)
             priority="left",  # Priority to fit payment type
         ),
@@ -572,7 +1084,7 @@ def get_total_text(receipt: Receipt, width: int = 32, min_spaces: int = 5) -> st
             width=width,
             min_spaces=min_spaces,
             left="Решта",
-            right=format_number(receipt.rest),
+            right=rest,
             right_hyphen=False,  # Break words without hyphen (because it's a numbers)
             priority="left",  # Priority to fit "Решта"
         ),
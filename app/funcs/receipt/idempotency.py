@@ -0,0 +1,146 @@
+# coding=utf-8
+
+import hashlib
+from collections import OrderedDict
+
+from fastapi import HTTPException
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.models import ReceiptIdempotencyKey
+from app.routes.receipt.schema import ReceiptRequestSchema
+from app.settings import RECEIPT_SETTINGS
+
+
+def get_request_hash(receipt_data: ReceiptRequestSchema) -> str:
+    """
+    Returns the fingerprint of a receipt creation request (SHA-256 of its normalized JSON).
+    """
+
+    return hashlib.sha256(receipt_data.model_dump_json().encode()).hexdigest()
+
+
+class IdempotencyKeys:
+    """
+    `Idempotency-Key` headers of receipt creations: maps keys of a user to the receipts they created.
+    Committed keys are kept in a per-process LRU cache, so a retry right after a lost response
+    costs no lookup (keys are never changed once committed).
+
+    Attributes:
+        max_size (int): Maximum number of cached keys.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.keys: OrderedDict[tuple[int, str], tuple[int, str]] = OrderedDict()
+
+    def get(self, user_id: int, key: str) -> tuple[int, str] | None:
+        """
+        Returns the cached receipt ID & request hash of the key.
+        """
+
+        created = self.keys.get((user_id, key))
+
+        if created is not None:
+            # Recently used
+            self.keys.move_to_end((user_id, key))
+
+        return created
+
+    def put(self, user_id: int, key: str, receipt_id: int, request_hash: str) -> None:
+        """
+        Caches the receipt ID & request hash of the key, evicting the least recently used one when full.
+        """
+
+        self.keys[(user_id, key)] = (receipt_id, request_hash)
+        self.keys.move_to_end((user_id, key))
+
+        if len(self.keys) > self.max_size:
+            self.keys.popitem(last=False)
+
+    async def get_receipt_id(
+        self,
+        db_session: AsyncSession,
+        user_id: int,
+        key: str,
+        request_hash: str,
+    ) -> int | None:
+        """
+        Returns the ID of the receipt created with the key, if any (by primary key lookup when not cached).
+
+        Args:
+            db_session (AsyncSession): The database session (of the primary, which committed the key).
+            user_id (int): The sender of the request.
+            key (str): The `Idempotency-Key` header.
+            request_hash (str): The fingerprint of the request.
+
+        Returns:
+            int | None: The receipt ID, or None when the key is new.
+
+        Raises:
+            HTTPException: If the key was used for another receipt.
+        """
+
+        created = self.get(user_id, key)
+
+        if created is None:
+            # Not cached
+            created = (await db_session.execute(
+                select(
+                    ReceiptIdempotencyKey.receipt_id,
+                    ReceiptIdempotencyKey.request_hash,
+                ).where(
+                    ReceiptIdempotencyKey.user_id == user_id,
+                    ReceiptIdempotencyKey.key == key,
+                )
+            )).first()
+
+            if created is None:
+                # New key
+                return None
+
+            self.put(user_id, key, *created)
+
+        receipt_id, created_hash = created
+
+        if created_hash != request_hash:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used for another receipt")
+
+        return receipt_id
+
+    async def claim(
+        self,
+        db_session: AsyncSession,
+        user_id: int,
+        key: str,
+        request_hash: str,
+        receipt_id: int,
+    ) -> bool:
+        """
+        Saves the key with the receipt being created, in its transaction. The primary key settles concurrent
+        requests with the same key: the insert waits for a transaction holding the key, and is skipped
+        once it committed.
+
+        Returns:
+            bool: Whether the key was saved (otherwise another request created a receipt with it).
+        """
+
+        return (await db_session.execute(
+            insert(
+                ReceiptIdempotencyKey
+            ).values(
+                user_id=user_id,
+                key=key,
+                request_hash=request_hash,
+                receipt_id=receipt_id,
+            ).on_conflict_do_nothing(
+                index_elements=["user_id", "key"]
+            ).returning(
+                ReceiptIdempotencyKey.receipt_id
+            )
+        )).first() is not None
+
+
+# Defined idempotency keys of the process
+IDEMPOTENCY_KEYS = IdempotencyKeys(max_size=RECEIPT_SETTINGS.idempotency_cache_size)
@@ -0,0 +1,257 @@
+# coding=utf-8
+
+from sqlalchemy import func, case, cast, null, Numeric, Text
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.models import Receipt, ReceiptProduct, Product
+from app.money import cents_column
+from app.settings import RECEIPT_SETTINGS
+
+from .aggregates import PAYMENT_TYPES, aggregate_columns
+
+
+# JSON produced here has the shape of `ReceiptResponseSchema`: keys in the same order,
+# Decimals as strings and datetimes in ISO 8601 (as pydantic writes them), so clients
+# can't tell which read engine served the response.
+
+
+def money_json(column):
+    """
+    Returns the Numeric column as JSON string (e.g. "19.99"), like pydantic writes Decimals.
+    """
+
+    return cast(column, Text)
+
+
+def cents_json(column):
+    """
+    Returns integer cents as JSON string with two decimal places (e.g. 1999 => "19.99").
+    """
+
+    return cast(cast(cast(column, Numeric) / 100, Numeric(20, 2)), Text)
+
+
+def datetime_json(column):
+    """
+    Returns the timestamp as ISO 8601 string, like pydantic writes naive datetimes
+    (microseconds are left out when they are zero).
+    """
+
+    return func.to_char(column, 'YYYY-MM-DD"T"HH24:MI:SS') + case(
+        (func.to_char(column, "US") == "000000", ""),
+        else_="." + func.to_char(column, "US"),
+    )
+
+
+def receipt_json(receipt):
+    """
+    Returns a JSON object of the receipt (with its products) built by Postgres.
+
+    Args:
+        receipt: The `receipt` table, or a selectable with its columns (e.g. a page CTE).
+    """
+
+    # Defined money columns & their JSON ("cents" money mode reads BIGINT cents columns, converted from
+    # the Numeric ones where NULL; line totals of rows not backfilled yet are calculated)
+    if RECEIPT_SETTINGS.money_mode == "cents":
+        to_json = cents_json
+        price = cents_column(ReceiptProduct.price_cents, ReceiptProduct.price)
+        line_total = func.coalesce(ReceiptProduct.line_total_cents, price * ReceiptProduct.quantity)
+        total = cents_column(receipt.c.total_cents, receipt.c.total)
+        rest = cents_column(receipt.c.rest_cents, receipt.c.rest)
+        payment_amount = cents_column(receipt.c.payment_amount_cents, receipt.c.payment_amount)
+
+    else:
+        to_json = money_json
+        price = ReceiptProduct.price
+        line_total = func.coalesce(ReceiptProduct.line_total, price * ReceiptProduct.quantity)
+        total, rest, payment_amount = receipt.c.total, receipt.c.rest, receipt.c.payment_amount
+
+    # Defined products of the receipt, in order of creation
+    products = select(
+        func.coalesce(
+            func.json_agg(
+                aggregate_order_by(
+                    func.json_build_object(
+                        "title", func.coalesce(Product.title, ReceiptProduct.stored_title),
+                        "price", to_json(price),
+                        "quantity", ReceiptProduct.quantity,
+                        "total", to_json(line_total),
+                    ),
+                    ReceiptProduct.id,
+                )
+            ),
+            func.json_build_array(),
+        )
+    ).select_from(
+        ReceiptProduct
+    ).outerjoin(
+        Product,
+        Product.id == ReceiptProduct.product_id,
+    ).where(
+        ReceiptProduct.receipt_id == receipt.c.id,
+        # Only the partition of the receipt's month is scanned
+        ReceiptProduct.receipt_created_at == receipt.c.created_at,
+    ).scalar_subquery()
+
+    return func.json_build_object(
+        "id", receipt.c.id,
+        "total", to_json(total),
+        "rest", to_json(rest),
+        "created_at", datetime_json(receipt.c.created_at),
+        "products", products,
+        "payment", func.json_build_object(
+            "type", receipt.c.payment_type,
+            "amount", to_json(payment_amount),
+        ),
+    )
+
+
+def aggregates_json(aggregates: list[str], counted):
+    """
+    Returns the `aggregates` of a list response as JSON built by Postgres, in the shape of `aggregates.aggregates_dict`.
+
+    Args:
+        aggregates (list[str]): Names of the requested aggregates.
+        counted: The selectable with the columns of `aggregate_columns`.
+    """
+
+    if not aggregates:
+        # Not requested
+        return null()
+
+    to_json = cents_json if RECEIPT_SETTINGS.money_mode == "cents" else money_json
+
+    return func.json_build_object(
+        "sum", to_json(counted.c.sum_total) if "sum" in aggregates else null(),
+        "avg", to_json(counted.c.avg_total) if "avg" in aggregates else null(),
+        "by_payment_type", func.json_build_object(*(
+            item
+            for payment_type in PAYMENT_TYPES
+            for item in (
+                payment_type,
+                func.json_build_object(
+                    "receipts", counted.c[f"count_{payment_type}"],
+                    "sum", to_json(counted.c[f"sum_{payment_type}"]),
+                ),
+            )
+        )) if "by_payment_type" in aggregates else null(),
+    )
+
+
+def as_bytes(json_expression):
+    """
+    Returns the JSON as UTF-8 `bytea`, so the driver hands over bytes ready to be sent
+    (no decoding to `str` and encoding back).
+    """
+
+    return func.convert_to(cast(json_expression, Text), "UTF8")
+
+
+async def get_receipt_json(
+    db_session: AsyncSession,
+    conditions: list,
+) -> bytes | None:
+    """
+    Function to retrieve one receipt as JSON assembled by Postgres.
+
+    Args:
+        db_session (AsyncSession): The database session.
+        conditions (list): SQL conditions selecting the receipt (ID & owner).
+
+    Returns:
+        bytes | None: JSON of the receipt, or None when it's not found.
+    """
+
+    # Defined matching receipt
+    receipt = select(
+        Receipt.__table__
+    ).where(
+        *conditions
+    ).subquery("matched")
+
+    return await db_session.scalar(
+        select(
+            as_bytes(receipt_json(receipt))
+        ).select_from(
+            receipt
+        )
+    )
+
+
+async def get_receipts_json(
+    db_session: AsyncSession,
+    conditions: list,
+    page: int = 0,
+    on_page: int = 10,
+    aggregates: list[str] = (),
+) -> bytes:
+    """
+    Function to retrieve a page of receipts as JSON assembled by Postgres.
+    The count (with the aggregates), the page and products of all its receipts are returned in one row of one query.
+
+    Args:
+        db_session (AsyncSession): The database session.
+        conditions (list): SQL conditions of the list filters.
+        page (int): The page number for pagination.
+        on_page (int): The number of records per page.
+        aggregates (list[str]): Names of the requested aggregates of filtered receipts (see `aggregates.AGGREGATES`).
+
+    Returns:
+        bytes: JSON of the page, in the shape of `ReceiptsResponseSchema`.
+    """
+
+    # Defined filtered receipts (used by both the page & the count, which would materialize it:
+    # inlined, the page walks `ix_receipt_user_id_id` and stops after `on_page` rows)
+    filtered = select(
+        Receipt.__table__
+    ).where(
+        *conditions
+    ).cte("filtered").prefix_with("NOT MATERIALIZED")
+
+    # Defined receipts of the page
+    page_receipts = select(
+        filtered
+    ).order_by(
+        filtered.c.id
+    ).limit(
+        on_page
+    ).offset(
+        page * on_page
+    ).cte("page_receipts")
+
+    # Defined count of filtered receipts
+    counted = select(
+        func.count().label("total"),
+        *aggregate_columns(filtered, aggregates),
+    ).select_from(
+        filtered
+    ).cte("counted")
+    total = counted.c.total
+
+    # Defined receipts of the page as JSON array
+    results = select(
+        func.coalesce(
+            func.json_agg(aggregate_order_by(receipt_json(page_receipts), page_receipts.c.id)),
+            func.json_build_array(),
+        )
+    ).select_from(
+        page_receipts
+    ).scalar_subquery()
+
+    return await db_session.scalar(
+        select(
+            as_bytes(func.json_build_object(
+                "total", total,
+                "page", page,
+                "on_page", on_page,
+                "next_page", case((total > on_page * (page + 1), page + 1), else_=null()),
+                "results", results,
+                "aggregates", aggregates_json(aggregates, counted),
+            ))
+        ).select_from(
+            counted
+        )
+    )
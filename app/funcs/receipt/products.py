@@ -0,0 +1,137 @@
+# coding=utf-8
+
+from collections import OrderedDict
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.models import Product
+from app.settings import RECEIPT_SETTINGS
+
+
+class ProductTitles:
+    """
+    Dictionary of product titles: maps titles of a user to IDs of their `product` rows,
+    creating missing ones. Committed IDs are kept in a per-process LRU cache,
+    so repeated titles cost no queries (products are never deleted or renamed).
+
+    Attributes:
+        max_size (int): Maximum number of cached IDs.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.ids: OrderedDict[tuple[int, str], int] = OrderedDict()
+
+    def get(self, user_id: int, title: str) -> int | None:
+        """
+        Returns the cached product ID.
+        """
+
+        product_id = self.ids.get((user_id, title))
+
+        if product_id is not None:
+            # Recently used
+            self.ids.move_to_end((user_id, title))
+
+        return product_id
+
+    def put(self, user_id: int, title: str, product_id: int) -> None:
+        """
+        Caches the product ID, evicting the least recently used one when full.
+        """
+
+        self.ids[(user_id, title)] = product_id
+        self.ids.move_to_end((user_id, title))
+
+        if len(self.ids) > self.max_size:
+            self.ids.popitem(last=False)
+
+    async def get_ids(
+        self,
+        db_session: AsyncSession,
+        user_id: int,
+        titles: list[str],
+    ) -> dict[str, int]:
+        """
+        Returns product IDs of the titles, inserting products that don't exist yet.
+
+        Products created here are part of the caller's transaction, so they are cached
+        only when found again later (after the transaction has been committed).
+
+        Args:
+            db_session (AsyncSession): The database session (of the receipt transaction).
+            user_id (int): The owner of the products.
+            titles (list[str]): Titles of the products.
+
+        Returns:
+            dict[str, int]: Product IDs by title.
+        """
+
+        product_ids: dict[str, int] = {}
+        missing: list[str] = []
+
+        for title in dict.fromkeys(titles):
+            product_id = self.get(user_id, title)
+
+            if product_id is None:
+                # Not cached
+                missing.append(title)
+
+            else:
+                product_ids[title] = product_id
+
+        if not missing:
+            # All cached
+            return product_ids
+
+        # Existing products
+        for title, product_id in await db_session.execute(
+            select(
+                Product.title,
+                Product.id,
+            ).where(
+                Product.user_id == user_id,
+                Product.title.in_(missing),
+            )
+        ):
+            product_ids[title] = product_id
+            self.put(user_id, title, product_id)
+
+        new_titles = [title for title in missing if title not in product_ids]
+
+        if new_titles:
+            # New products (titles inserted concurrently by another request are skipped)
+            product_ids.update((await db_session.execute(
+                insert(
+                    Product
+                ).values(
+                    [{"user_id": user_id, "title": title} for title in new_titles]
+                ).on_conflict_do_nothing(
+                    index_elements=["user_id", "title"]
+                ).returning(
+                    Product.title,
+                    Product.id,
+                )
+            )).all())
+
+            skipped = [title for title in new_titles if title not in product_ids]
+
+            if skipped:
+                # Committed by another request meanwhile
+                product_ids.update((await db_session.execute(
+                    select(
+                        Product.title,
+                        Product.id,
+                    ).where(
+                        Product.user_id == user_id,
+                        Product.title.in_(skipped),
+                    )
+                )).all())
+
+        return product_ids
+
+
+# Defined product titles dictionary of the process
+PRODUCT_TITLES = ProductTitles(max_size=RECEIPT_SETTINGS.product_cache_size)
@@ -0,0 +1,94 @@
+# coding=utf-8
+
+import logging
+
+from sqlalchemy import exists, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.future import select
+
+from app.models import Product, Receipt, ReceiptProduct
+
+
+# Defined logger
+logger = logging.getLogger("easycheck.search")
+
+# Defined trigram index of product titles (`ILIKE '%...%'` searches read it instead of scanning titles)
+TITLE_INDEX = "ix_product_title_trgm"
+
+# Defined escape character of LIKE patterns (not a backslash, so patterns read the same in any SQL literal)
+LIKE_ESCAPE = "/"
+
+
+def trigram_available(connection: Connection) -> bool:
+    """
+    Returns whether the `pg_trgm` extension can be used (it's installed, or shipped with the server).
+    """
+
+    return bool(connection.scalar(text("SELECT EXISTS (SELECT FROM pg_available_extensions WHERE name = 'pg_trgm')")))
+
+
+def create_title_index(connection: Connection, concurrently: bool = False) -> bool:
+    """
+    Creates the trigram GIN index of product titles, with the `pg_trgm` extension.
+    Servers without the extension are left as they are: searches still work, by scanning titles
+    of the merchant (`uq_product_user_id_title`).
+
+    Args:
+        connection (Connection): The connection (outside a transaction when `concurrently`).
+        concurrently (bool): Builds the index without blocking inserts of products.
+
+    Returns:
+        bool: Whether the index exists.
+    """
+
+    if not trigram_available(connection):
+        logger.warning("pg_trgm is not available, product searches scan titles of each merchant")
+        return False
+
+    connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    connection.execute(text(
+        f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS {TITLE_INDEX}"
+        " ON product USING gin (title gin_trgm_ops)"
+    ))
+
+    return True
+
+
+def escape_like(value: str) -> str:
+    """
+    Escapes wildcards of a LIKE pattern (searched text is matched literally).
+    """
+
+    return value.replace(LIKE_ESCAPE, LIKE_ESCAPE * 2).replace("%", LIKE_ESCAPE + "%").replace("_", LIKE_ESCAPE + "_")
+
+
+def product_query_filter(user_id: int, product_query: str):
+    """
+    Returns the condition of receipts containing a product whose title contains the text (case-insensitive).
+
+    Titles of the merchant are matched first (by the trigram index), then receipts are found by an `EXISTS`
+    semi-join on lines of the matched products (`ix_receipt_product_product_id`), so neither all receipts
+    nor all lines of the merchant are read.
+
+    Args:
+        user_id (int): The owner of the receipts.
+        product_query (str): The text searched in product titles.
+    """
+
+    matched_products = select(
+        Product.id
+    ).where(
+        Product.user_id == user_id,
+        Product.title.ilike(f"%{escape_like(product_query)}%", escape=LIKE_ESCAPE),
+    )
+
+    return exists(
+        select(
+            ReceiptProduct.id
+        ).where(
+            ReceiptProduct.receipt_id == Receipt.id,
+            # Lines of the receipt's month only
+            ReceiptProduct.receipt_created_at == Receipt.created_at,
+            ReceiptProduct.product_id.in_(matched_products),
+        )
+    )
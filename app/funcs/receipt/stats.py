@@ -0,0 +1,274 @@
+# coding=utf-8
+
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Literal
+
+from sqlalchemy import cast, func, BigInteger, Date
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.models import Product, ProductDailyStats, ReceiptDailyStats, ReceiptProduct
+from app.routes.receipt.schema import (
+    ReceiptStatsItemSchema,
+    ReceiptStatsResponseSchema,
+    ReceiptTopProductItemSchema,
+    ReceiptTopProductsResponseSchema,
+)
+
+
+async def add_to_stats(
+    db_session: AsyncSession,
+    user_id: int,
+    created_at: datetime,
+    payment_type: str,
+    total: Decimal,
+    payment_amount: Decimal,
+    rest: Decimal,
+) -> None:
+    """
+    Adds a receipt to the daily sales of its user, in the transaction creating the receipt
+    (one upsert, so the rollup never disagrees with the receipts).
+
+    Args:
+        db_session (AsyncSession): The session creating the receipt (the caller commits).
+        user_id (int): The user who created the receipt.
+        created_at (datetime): The creation time of the receipt (UTC).
+        payment_type (str): The type of payment.
+        total (Decimal): The total amount of the receipt.
+        payment_amount (Decimal): The amount paid.
+        rest (Decimal): The balance refunded.
+    """
+
+    statement = insert(ReceiptDailyStats).values(
+        user_id=user_id,
+        day=created_at.date(),
+        payment_type=payment_type,
+        receipt_count=1,
+        total=total,
+        payment_amount=payment_amount,
+        rest=rest,
+    )
+
+    await db_session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[ReceiptDailyStats.user_id, ReceiptDailyStats.day, ReceiptDailyStats.payment_type],
+            set_={
+                "receipt_count": ReceiptDailyStats.receipt_count + statement.excluded.receipt_count,
+                "total": ReceiptDailyStats.total + statement.excluded.total,
+                "payment_amount": ReceiptDailyStats.payment_amount + statement.excluded.payment_amount,
+                "rest": ReceiptDailyStats.rest + statement.excluded.rest,
+            },
+        )
+    )
+
+
+async def add_products_to_stats(
+    db_session: AsyncSession,
+    user_id: int,
+    created_at: datetime,
+    items: list[ReceiptProduct],
+) -> None:
+    """
+    Adds lines of a receipt to the daily sales of their products, in the transaction creating the receipt
+    (one upsert of all products of the receipt).
+
+    Args:
+        db_session (AsyncSession): The session creating the receipt (the caller commits).
+        user_id (int): The user who created the receipt.
+        created_at (datetime): The creation time of the receipt (UTC).
+        items (list[ReceiptProduct]): Lines of the receipt.
+    """
+
+    # Lines of the same product are summed (a row can't be upserted twice by one statement)
+    products: dict[int, dict] = {}
+
+    for item in items:
+        product = products.setdefault(item.product_id, {"line_count": 0, "quantity": 0, "revenue": 0})
+        product["line_count"] += 1
+        product["quantity"] += item.quantity
+        product["revenue"] += item.line_total
+
+    statement = insert(ProductDailyStats).values([
+        {"user_id": user_id, "day": created_at.date(), "product_id": product_id, **product}
+        # Same order of row locks in every transaction, so concurrent receipts don't deadlock
+        for product_id, product in sorted(products.items())
+    ])
+
+    await db_session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[ProductDailyStats.user_id, ProductDailyStats.day, ProductDailyStats.product_id],
+            set_={
+                "line_count": ProductDailyStats.line_count + statement.excluded.line_count,
+                "quantity": ProductDailyStats.quantity + statement.excluded.quantity,
+                "revenue": ProductDailyStats.revenue + statement.excluded.revenue,
+            },
+        )
+    )
+
+
+async def get_receipt_stats(
+    db_session: AsyncSession,
+    user_id: int,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    period: Literal["day", "month"] = "day",
+    payment_type: str | None = None,
+) -> ReceiptStatsResponseSchema:
+    """
+    Function to retrieve sales of a user by day or month and payment type, from the daily rollup
+    (at most one row per day & payment type is read, whatever the number of receipts).
+
+    Args:
+        db_session (AsyncSession): The database session.
+        user_id (int): The ID of the user whose sales we are fetching.
+        start_date (date | None): The first day of the range.
+        end_date (date | None): The last day of the range (included).
+        period (str): Sales are summed by "day" or by "month".
+        payment_type (str | None): Filter by payment type (cash or card).
+
+    Returns:
+        ReceiptStatsResponseSchema: Sales of each period & payment type with receipts.
+    """
+
+    # Defined first day of the period of each row
+    period_date = (
+        ReceiptDailyStats.day if period == "day"
+        else cast(func.date_trunc("month", ReceiptDailyStats.day), Date)
+    ).label("date")
+
+    conditions = [ReceiptDailyStats.user_id == user_id]
+
+    if start_date:
+        # Filter by first day
+        conditions.append(ReceiptDailyStats.day >= start_date)
+
+    if end_date:
+        # Filter by last day
+        conditions.append(ReceiptDailyStats.day <= end_date)
+
+    if payment_type:
+        # Filter by payment type
+        conditions.append(ReceiptDailyStats.payment_type == payment_type)
+
+    rows = await db_session.execute(
+        select(
+            period_date,
+            ReceiptDailyStats.payment_type,
+            func.sum(ReceiptDailyStats.receipt_count),
+            func.sum(ReceiptDailyStats.total),
+            func.sum(ReceiptDailyStats.payment_amount),
+            func.sum(ReceiptDailyStats.rest),
+        ).where(
+            *conditions
+        ).group_by(
+            period_date,
+            ReceiptDailyStats.payment_type,
+        ).order_by(
+            period_date,
+            ReceiptDailyStats.payment_type,
+        )
+    )
+
+    return ReceiptStatsResponseSchema.model_construct(
+        period=period,
+        results=[
+            ReceiptStatsItemSchema.model_construct(
+                date=row_date,
+                payment_type=row_payment_type,
+                receipts=receipts,
+                total=total,
+                payment_amount=payment_amount,
+                rest=rest,
+            )
+            for row_date, row_payment_type, receipts, total, payment_amount, rest in rows
+        ],
+    )
+
+
+async def get_top_products(
+    db_session: AsyncSession,
+    user_id: int,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    order_by: Literal["revenue", "quantity"] = "revenue",
+    limit: int = 10,
+) -> ReceiptTopProductsResponseSchema:
+    """
+    Function to retrieve best selling products of a user, from the daily rollup of products.
+
+    Long ranges stay cheap in memory: rows of the range are summed per product (one group per product
+    of the catalog, whatever the number of days), and Postgres keeps only the `limit` best groups
+    while ranking them (top-N heapsort). Titles are joined to the best products only.
+
+    Args:
+        db_session (AsyncSession): The database session.
+        user_id (int): The ID of the user whose sales we are fetching.
+        start_date (date | None): The first day of the range.
+        end_date (date | None): The last day of the range (included).
+        order_by (str): Products are ranked by "revenue" or by "quantity".
+        limit (int): The number of products to return.
+
+    Returns:
+        ReceiptTopProductsResponseSchema: The best products, best first.
+    """
+
+    conditions = [ProductDailyStats.user_id == user_id]
+
+    if start_date:
+        # Filter by first day
+        conditions.append(ProductDailyStats.day >= start_date)
+
+    if end_date:
+        # Filter by last day
+        conditions.append(ProductDailyStats.day <= end_date)
+
+    lines = func.sum(ProductDailyStats.line_count).label("lines")
+    quantity = cast(func.sum(ProductDailyStats.quantity), BigInteger).label("quantity")  # Not numeric
+    revenue = func.sum(ProductDailyStats.revenue).label("revenue")
+    ranking = (revenue, quantity) if order_by == "revenue" else (quantity, revenue)
+
+    best = select(
+        ProductDailyStats.product_id,
+        lines,
+        quantity,
+        revenue,
+    ).where(
+        *conditions
+    ).group_by(
+        ProductDailyStats.product_id
+    ).order_by(
+        *(column.desc() for column in ranking),
+        ProductDailyStats.product_id,
+    ).limit(
+        limit
+    ).subquery()
+
+    rows = await db_session.execute(
+        select(
+            Product.title,
+            best.c.lines,
+            best.c.quantity,
+            best.c.revenue,
+        ).join(
+            Product,
+            Product.id == best.c.product_id,
+        ).order_by(
+            *(best.c[column.name].desc() for column in ranking),
+            best.c.product_id,
+        )
+    )
+
+    return ReceiptTopProductsResponseSchema.model_construct(
+        order_by=order_by,
+        results=[
+            ReceiptTopProductItemSchema.model_construct(
+                title=title,
+                lines=lines,
+                quantity=quantity,
+                revenue=revenue,
+            )
+            for title, lines, quantity, revenue in rows
+        ],
+    )
@@ -0,0 +1,87 @@
+# coding=utf-8
+
+from sqlalchemy import BigInteger, Text, cast, func, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.models import Receipt
+from app.routes.receipt.schema import ReceiptChangesResponseSchema
+
+from .funcs import build_receipts, receipt_columns
+
+
+def parse_token(token: str) -> tuple[int, int]:
+    """
+    Returns the sync position of a token: (transaction ID, receipt ID) of the last synced receipt
+    (e.g. "8841395-1142" => (8841395, 1142)). A bare number is a receipt ID (tokens returned
+    before transaction IDs were stored, when receipts were synced in order of IDs).
+    """
+
+    xact_id, _, receipt_id = token.rpartition("-")
+
+    return int(xact_id or 0), int(receipt_id)
+
+
+def format_token(xact_id: int, receipt_id: int) -> str:
+    """
+    Returns the token of a sync position (the opposite of `parse_token`).
+    """
+
+    return f"{xact_id}-{receipt_id}"
+
+
+async def get_receipt_changes(
+    db_session: AsyncSession,
+    user_id: int,
+    since: str = "0",
+    limit: int = 100,
+) -> ReceiptChangesResponseSchema:
+    """
+    Returns receipts of the user created after a sync token, and the next token.
+
+    Receipts are synced in order of the transactions which inserted them (`xact_id`, then ID),
+    by a range scan of `ix_receipt_user_id_xact_id_id`, so sync traffic grows with new receipts only,
+    not with history. Only receipts of transactions older than all running ones
+    (`pg_snapshot_xmin(pg_current_snapshot())`) are returned: those are all committed or rolled back,
+    and any transaction still inserting a receipt gets a position after them, so the token never moves
+    past a receipt which is committed later, however long its transaction takes.
+
+    Args:
+        db_session (AsyncSession): The database session (on the primary, a lagging replica
+            could hide receipts below the token as well).
+        user_id (int): The owner of the receipts.
+        since (str): The token of the previous sync ("0" for the first one).
+        limit (int): The maximum number of receipts to return.
+
+    Returns:
+        ReceiptChangesResponseSchema: Receipts after the token (in order of transactions) and the next token.
+    """
+
+    # Defined oldest transaction still running (in the snapshot of the query)
+    running_xmin = cast(cast(func.pg_snapshot_xmin(func.pg_current_snapshot()), Text), BigInteger)
+
+    # One row more tells whether there are more
+    receipt_rows = (await db_session.execute(
+        select(
+            *receipt_columns(),
+            Receipt.xact_id,
+        ).where(
+            Receipt.user_id == user_id,
+            tuple_(Receipt.xact_id, Receipt.id) > tuple_(*parse_token(since)),
+            Receipt.xact_id < running_xmin,
+        ).order_by(
+            Receipt.xact_id,
+            Receipt.id,
+        ).limit(
+            limit + 1
+        )
+    )).all()
+
+    has_more = len(receipt_rows) > limit
+    receipt_rows = receipt_rows[:limit]
+
+    return ReceiptChangesResponseSchema.model_construct(
+        token=format_token(receipt_rows[-1][-1], receipt_rows[-1][0]) if receipt_rows else since,
+        has_more=has_more,
+        results=await build_receipts(db_session, [row[:-1] for row in receipt_rows]),
+    )
@@ -79,7 +79,13 @@ async def get_user_id(
             # Exist user
             raise credentials_exception
 
-        return user.id
+        # Defined user ID
+        user_id = user.id
+
+        # Release the connection, read handlers may use a replica for the rest of the request
+        await db_session.rollback()
+
+        return user_id
 
     except PyJWTError:
         # Error
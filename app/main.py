@@ -1,16 +1,100 @@
 # coding=utf-8
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from app.db import engine, replica_engines
+from app.compression import CompressionMiddleware
+from app.funcs.receipt.feed import FeedBridge
+from app.metrics import MetricsMiddleware, instrument_engine, mark_worker_dead
+from app.outbox import OutboxDispatcher, build_sinks
+from app.partitions import PartitionMaintainer
+from app.profiling import ProfilingMiddleware
+from app.watchdog import LoopWatchdog, WatchdogMiddleware
+from app.settings import COMPRESSION_SETTINGS, FEED_SETTINGS, OUTBOX_SETTINGS, PARTITION_SETTINGS, PROFILING_SETTINGS, WATCHDOG_SETTINGS
 from app.routes.user.funcs import user_router
 from app.routes.receipt.funcs import receipt_router
+from app.routes.metrics.funcs import metrics_router
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    """
+    Starts background services of the app and stops them on shutdown.
+    """
+
+    # Defined event loop watchdog
+    watchdog = LoopWatchdog() if WATCHDOG_SETTINGS.enabled else None
+
+    # Defined creation of future partitions
+    maintainer = PartitionMaintainer(engine) if PARTITION_SETTINGS.maintenance else None
+
+    # Defined receipts of other workers for live feeds
+    bridge = FeedBridge(engine) if FEED_SETTINGS.notify else None
+
+    # Defined delivery of receipt events to downstream systems (none without sinks)
+    sinks = build_sinks() if OUTBOX_SETTINGS.dispatch else []
+    dispatcher = OutboxDispatcher(engine, sinks) if sinks else None
+
+    if watchdog is not None:
+        await watchdog.start()
+
+    if maintainer is not None:
+        await maintainer.start()
+
+    if bridge is not None:
+        await bridge.start()
+
+    if dispatcher is not None:
+        await dispatcher.start()
+
+    yield
+
+    if dispatcher is not None:
+        await dispatcher.stop()
+
+    if bridge is not None:
+        await bridge.stop()
+
+    if maintainer is not None:
+        await maintainer.stop()
+
+    if watchdog is not None:
+        await watchdog.stop()
+
+    # Stopped (e.g. recycled after `SERVER_MAX_REQUESTS`), its pool is gone
+    mark_worker_dead()
+
 
 app = FastAPI(
     title="EasyCheck API",
     description="EasyCheck is an API built with FastAPI to handle sales receipts.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 
+# Defined response compression (innermost => its time is part of request metrics)
+if COMPRESSION_SETTINGS.enabled:
+    app.add_middleware(CompressionMiddleware)
+
+# Defined profiler (runs inside metrics middleware and reuses its statistics)
+if PROFILING_SETTINGS.enabled:
+    app.add_middleware(ProfilingMiddleware)
+
+# Defined attribution of blocked event loop to routes
+if WATCHDOG_SETTINGS.enabled:
+    app.add_middleware(WatchdogMiddleware)
+
+# Defined metrics
+app.add_middleware(MetricsMiddleware)
+instrument_engine(engine, "primary")
+
+for index, replica_engine in enumerate(replica_engines):
+    instrument_engine(replica_engine, f"replica_{index}")
+
+
 # Defined base rout
 app.include_router(user_router)
 app.include_router(receipt_router)
+app.include_router(metrics_router)
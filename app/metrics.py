@@ -0,0 +1,351 @@
+# coding=utf-8
+
+import os
+from contextvars import ContextVar
+from time import perf_counter
+
+from prometheus_client import Counter, Gauge, Histogram, multiprocess
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+# Defined latency buckets (seconds), shared by request & query histograms
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Defined buckets for number of SQL statements per request
+STATEMENT_BUCKETS = (0, 1, 2, 3, 4, 6, 8, 12, 16, 32, 64)
+
+
+# Defined request metrics
+REQUEST_SECONDS = Histogram(
+    "easycheck_request_duration_seconds",
+    "Latency of HTTP requests per route.",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUEST_DB_SECONDS = Histogram(
+    "easycheck_request_db_seconds",
+    "Time spent in SQL statements per HTTP request.",
+    ["route"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUEST_STATEMENTS = Histogram(
+    "easycheck_request_statements",
+    "Number of SQL statements per HTTP request.",
+    ["route"],
+    buckets=STATEMENT_BUCKETS,
+)
+REQUEST_ERRORS = Counter(
+    "easycheck_request_errors_total",
+    "HTTP requests that raised an unhandled exception.",
+    ["method", "route"],
+)
+
+# Defined database metrics
+QUERY_SECONDS = Histogram(
+    "easycheck_db_query_duration_seconds",
+    "Latency of single SQL statements.",
+    ["engine", "operation"],
+    buckets=LATENCY_BUCKETS,
+)
+POOL_CHECKED_OUT = Gauge(
+    "easycheck_db_pool_checked_out",
+    "Connections currently checked out of the pool.",
+    ["engine"],
+    multiprocess_mode="livesum",
+)
+POOL_OVERFLOW = Gauge(
+    "easycheck_db_pool_overflow",
+    "Connections currently open above the pool size.",
+    ["engine"],
+    multiprocess_mode="livesum",
+)
+POOL_SIZE = Gauge(
+    "easycheck_db_pool_size",
+    "Configured size of the pool.",
+    ["engine"],
+    multiprocess_mode="livesum",
+)
+POOL_WAIT_SECONDS = Histogram(
+    "easycheck_db_pool_wait_seconds",
+    "Time spent waiting for a connection from the pool.",
+    buckets=LATENCY_BUCKETS,
+)
+
+# Defined receipt metrics
+TEXT_RENDER_SECONDS = Histogram(
+    "easycheck_receipt_text_render_seconds",
+    "Time spent rendering the text representation of a receipt.",
+    buckets=LATENCY_BUCKETS,
+)
+
+# Defined response cache metrics
+CACHE_REQUESTS = Counter(
+    "easycheck_cache_requests_total",
+    "Lookups of the response cache, by cached response & result (hit or miss).",
+    ["cache", "result"],
+)
+CACHE_HIT_RATIO = Gauge(
+    "easycheck_cache_hit_ratio",
+    "Share of lookups of the response cache served from it since the process started.",
+    ["cache"],
+)
+CACHE_SIZE_BYTES = Gauge(
+    "easycheck_cache_size_bytes",
+    "Size of responses cached in memory by this process.",
+)
+COALESCED_REQUESTS = Counter(
+    "easycheck_coalesced_requests_total",
+    "Calls served by an identical call already in flight (single-flight), by operation.",
+    ["operation"],
+)
+
+# Defined publish/subscribe metrics
+PUBSUB_SUBSCRIBERS = Gauge(
+    "easycheck_pubsub_subscribers",
+    "Subscriptions currently open in this process, by feed.",
+    ["feed"],
+)
+PUBSUB_MESSAGES = Counter(
+    "easycheck_pubsub_messages_total",
+    "Messages delivered to subscriptions, by feed.",
+    ["feed"],
+)
+PUBSUB_OVERFLOWS = Counter(
+    "easycheck_pubsub_overflows_total",
+    "Subscriptions closed because their buffer was full (slow consumers), by feed.",
+    ["feed"],
+)
+
+# Defined outbox metrics
+OUTBOX_EVENTS = Counter(
+    "easycheck_outbox_events_total",
+    "Outbox events delivered, by sink.",
+    ["sink"],
+)
+OUTBOX_FAILURES = Counter(
+    "easycheck_outbox_failures_total",
+    "Outbox events whose delivery failed (retried with backoff), by sink.",
+    ["sink"],
+)
+OUTBOX_BATCH_SECONDS = Histogram(
+    "easycheck_outbox_batch_seconds",
+    "Time spent delivering a batch of outbox events, by sink.",
+    ["sink"],
+    buckets=LATENCY_BUCKETS,
+)
+OUTBOX_LAG_SECONDS = Histogram(
+    "easycheck_outbox_lag_seconds",
+    "Delay between the creation of an outbox event and its delivery.",
+    buckets=LATENCY_BUCKETS + (30.0, 60.0, 300.0, 3600.0),
+)
+
+# Defined event loop metrics
+LOOP_LAG_SECONDS = Histogram(
+    "easycheck_event_loop_lag_seconds",
+    "Delay of the event loop heartbeat behind its schedule.",
+    buckets=LATENCY_BUCKETS,
+)
+LOOP_BLOCKED_SECONDS = Histogram(
+    "easycheck_event_loop_blocked_seconds",
+    "Duration of periods when the event loop was blocked above the threshold, per route.",
+    ["route"],
+    buckets=LATENCY_BUCKETS,
+)
+
+
+class RequestStats:
+    """
+    Database statistics of one HTTP request.
+
+    Attributes:
+        db_seconds (float): Time spent in SQL statements.
+        statements (int): Number of SQL statements executed.
+        pool_wait_seconds (float): Time spent waiting for pool connections.
+        queries (list[tuple[str, float]] | None): Executed statements with their duration,
+            collected only when not None (e.g. while the request is profiled).
+    """
+
+    __slots__ = ("db_seconds", "statements", "pool_wait_seconds", "queries")
+
+    def __init__(self):
+        self.db_seconds = 0.0
+        self.statements = 0
+        self.pool_wait_seconds = 0.0
+        self.queries = None
+
+
+# Defined statistics of the current request
+REQUEST_STATS: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Pool that measures how long each checkout waits for a free connection, and publishes its state
+    (with `on_change`, set by `instrument_engine`) whenever a connection is checked out or returned.
+    """
+
+    on_change = None
+
+    def _do_get(self):
+        started_at = perf_counter()
+
+        try:
+            return super()._do_get()
+
+        finally:
+            elapsed = perf_counter() - started_at
+            POOL_WAIT_SECONDS.observe(elapsed)
+
+            stats = REQUEST_STATS.get()
+
+            if stats is not None:
+                # Inside a request
+                stats.pool_wait_seconds += elapsed
+
+            if self.on_change is not None:
+                self.on_change(self)
+
+    def _do_return_conn(self, record) -> None:
+        try:
+            super()._do_return_conn(record)
+
+        finally:
+            if self.on_change is not None:
+                # Returned to the queue or closed (overflow)
+                self.on_change(self)
+
+    def recreate(self):
+        pool = super().recreate()
+
+        # Kept by pools replacing this one (e.g. on `engine.dispose()`)
+        pool.on_change = self.on_change
+
+        return pool
+
+
+def instrument_engine(engine: AsyncEngine, name: str) -> None:
+    """
+    Records latency of every SQL statement of the engine and exports its pool state.
+
+    Args:
+        engine (AsyncEngine): The engine to instrument.
+        name (str): The value of the "engine" label (e.g. "primary").
+    """
+
+    sync_engine = engine.sync_engine
+    pool = sync_engine.pool
+
+    # Resolve label children once, so checkouts don't pay for label lookups
+    checked_out = POOL_CHECKED_OUT.labels(name)
+    overflow = POOL_OVERFLOW.labels(name)
+    size = POOL_SIZE.labels(name)
+
+    def publish_pool_state(changed_pool: TimedQueuePool) -> None:
+        # Set explicitly rather than read on scrape: with several workers the scraped process
+        # is not the one owning the pool, the values are summed from files of live workers
+        checked_out.set(changed_pool.checkedout())
+        overflow.set(max(changed_pool.overflow(), 0))
+        size.set(changed_pool.size())
+
+    pool.on_change = publish_pool_state
+    publish_pool_state(pool)
+
+    # Resolve label children once, so statements don't pay for label lookups
+    select_seconds = QUERY_SECONDS.labels(name, "select")
+    insert_seconds = QUERY_SECONDS.labels(name, "insert")
+    update_seconds = QUERY_SECONDS.labels(name, "update")
+    delete_seconds = QUERY_SECONDS.labels(name, "delete")
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        context.query_started_at = perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        elapsed = perf_counter() - context.query_started_at
+
+        if context.isinsert:
+            insert_seconds.observe(elapsed)
+
+        elif context.isupdate:
+            update_seconds.observe(elapsed)
+
+        elif context.isdelete:
+            delete_seconds.observe(elapsed)
+
+        else:
+            select_seconds.observe(elapsed)
+
+        stats = REQUEST_STATS.get()
+
+        if stats is not None:
+            # Inside a request
+            stats.db_seconds += elapsed
+            stats.statements += 1
+
+            if stats.queries is not None:
+                # Statements are collected
+                stats.queries.append((statement, elapsed))
+
+
+def mark_worker_dead(pid: int | None = None) -> None:
+    """
+    Removes live gauges (e.g. pool state) of a stopped worker from the metrics shared by workers
+    (when multiprocess mode is on), so they are no longer added to those of running workers.
+    Counters & histograms of the worker are kept: they are part of the totals.
+
+    Args:
+        pid (int | None): The process ID of the worker, the current process by default.
+    """
+
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid or os.getpid())
+
+
+def get_route_path(scope: dict) -> str:
+    """
+    Returns the path template of the matched route (e.g. "/receipts/{receipt_id}"),
+    so metrics are not split per receipt ID.
+    """
+
+    route = scope.get("route")
+
+    return route.path if route is not None else "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency, DB time and number of statements of every HTTP request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            # Lifespan & websockets
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = REQUEST_STATS.set(stats)
+        started_at = perf_counter()
+
+        try:
+            await self.app(scope, receive, send)
+
+        except Exception:
+            # Count & re-raise
+            REQUEST_ERRORS.labels(scope["method"], get_route_path(scope)).inc()
+            raise
+
+        finally:
+            elapsed = perf_counter() - started_at
+            REQUEST_STATS.reset(token)
+
+            route = get_route_path(scope)
+            REQUEST_SECONDS.labels(scope["method"], route).observe(elapsed)
+            REQUEST_DB_SECONDS.labels(route).observe(stats.db_seconds)
+            REQUEST_STATEMENTS.labels(route).observe(stats.statements)
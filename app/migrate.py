@@ -0,0 +1,69 @@
+# coding=utf-8
+
+import os
+
+from alembic import command, op
+from alembic.config import Config
+from sqlalchemy import create_engine, text
+
+from .conf import DATABASE_URL
+
+
+# Defined advisory lock key of migrations (any constant shared by all instances)
+MIGRATION_LOCK_KEY = 1154277
+
+# Defined rows updated per transaction by data migrations
+BATCH_SIZE = 10000
+
+
+def run_in_batches(table: str, statement: str, batch_size: int = BATCH_SIZE) -> None:
+    """
+    Runs a data migration statement over ID ranges of the table, each batch in its own
+    transaction, so locks are short and the app keeps working during the migration.
+    Meant to be called from migrations.
+
+    Args:
+        table (str): The table whose IDs are split into batches.
+        statement (str): SQL limited to the rows of a batch by `:start` (inclusive) and `:end` (exclusive)
+            bounds of IDs. It should skip rows already migrated, so an interrupted run can be repeated.
+        batch_size (int): IDs per batch.
+    """
+
+    connection = op.get_bind()
+
+    with op.get_context().autocommit_block():
+        max_id = connection.scalar(text(f"SELECT max(id) FROM {table}")) or 0
+
+        for start in range(0, max_id + 1, batch_size):
+            connection.execute(text(statement), {"start": start, "end": start + batch_size})
+
+
+def main() -> None:
+    """
+    Upgrades the database to the latest revision.
+
+    Meant to run once per deploy as a one-shot command, before the server starts.
+    The upgrade runs under a Postgres advisory lock, so instances started at the same
+    time run migrations one after another (the later ones find nothing to do).
+    """
+
+    # Lock is held on its own (synchronous) connection for the whole upgrade
+    engine = create_engine(DATABASE_URL.replace("+asyncpg", "+psycopg2"))
+
+    # Defined alembic config
+    config = Config(os.path.join(os.path.dirname(os.path.dirname(__file__)), "alembic.ini"))
+
+    with engine.connect() as connection:
+        connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+
+        try:
+            command.upgrade(config, "head")
+
+        finally:
+            connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,3 +3,9 @@
 from app.models.user import User
 from app.models.receipt import Receipt
 from app.models.receipt_product import ReceiptProduct
+from app.models.product import Product
+from app.models.archived_receipt import ArchivedReceipt
+from app.models.receipt_daily_stats import ReceiptDailyStats
+from app.models.product_daily_stats import ProductDailyStats
+from app.models.outbox_event import OutboxEvent
+from app.models.receipt_idempotency_key import ReceiptIdempotencyKey
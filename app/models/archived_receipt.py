@@ -0,0 +1,39 @@
+# coding=utf-8
+
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    Integer,
+    String,
+    ForeignKey,
+    Index,
+)
+
+from ..db import Base
+
+
+class ArchivedReceipt(Base):
+    """
+    Model of table for find receipts moved to the cold-storage archive (see `app/archive.py`)
+
+    Attributes:
+        id (int): The ID of the archived receipt.
+        user_id (int): Foreign key to the user table, identifying the receipt creator.
+        created_at (datetime): The timestamp when the receipt was created.
+        segment (str): The file name of the archive segment holding the receipt.
+        frame_offset (int): The offset of the compressed frame holding the receipt in the segment.
+        frame_length (int): The length of the compressed frame.
+    """
+
+    __tablename__ = 'archived_receipt'
+    __table_args__ = (
+        Index("ix_archived_receipt_user_id_id", "user_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, ForeignKey("user.id"), nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    segment = Column(String, nullable=False)
+    frame_offset = Column(BigInteger, nullable=False)
+    frame_length = Column(Integer, nullable=False)
@@ -0,0 +1,47 @@
+# coding=utf-8
+
+from datetime import datetime
+
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    String,
+)
+from sqlalchemy.dialects.postgresql import JSONB
+
+from ..db import Base
+
+
+class OutboxEvent(Base):
+    """
+    Model of table for save events for downstream systems, written in the transaction of the change
+    they describe and deleted once delivered (see `app/outbox.py`)
+
+    Attributes:
+        id (int): Unique identifier for the event (sent to sinks, so consumers can skip repeats).
+        event_type (str): The type of the event (e.g. "receipt.created").
+        user_id (int): The user whose data changed.
+        payload (dict): The JSON body of the event (e.g. the created receipt).
+        created_at (datetime): The timestamp when the event was written.
+        available_at (datetime): The earliest time of the next delivery attempt.
+        attempts (int): The number of failed delivery attempts.
+        last_error (str): The error of the last failed attempt.
+    """
+
+    __tablename__ = 'outbox_event'
+    __table_args__ = (
+        # Events due for delivery, oldest first
+        Index("ix_outbox_event_available_at_id", "available_at", "id"),
+    )
+
+    id = Column(BigInteger, primary_key=True)
+    event_type = Column(String, nullable=False)
+    user_id = Column(Integer, nullable=False)
+    payload = Column(JSONB, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    available_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(String, nullable=True)
@@ -0,0 +1,32 @@
+# coding=utf-8
+
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    ForeignKey,
+    UniqueConstraint,
+)
+
+from ..db import Base
+
+
+class Product(Base):
+    """
+    Model of table for save product titles of a user (each title is stored once
+    and referenced by receipt lines)
+
+    Attributes:
+        id (int): Unique identifier for the product.
+        user_id (int): Foreign key to the user table, identifying the product owner.
+        title (str): The title of the product.
+    """
+
+    __tablename__ = 'product'
+    __table_args__ = (
+        UniqueConstraint("user_id", "title", name="uq_product_user_id_title"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("user.id"), nullable=False)
+    title = Column(String, nullable=False)
@@ -0,0 +1,36 @@
+# coding=utf-8
+
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    Date,
+    Integer,
+    Numeric,
+    ForeignKey,
+)
+
+from ..db import Base
+
+
+class ProductDailyStats(Base):
+    """
+    Model of table for save daily sales of each product of a user (a rollup of receipt lines,
+    updated in the transaction creating each receipt)
+
+    Attributes:
+        user_id (int): Foreign key to the user table, identifying the receipt creator.
+        day (date): The day the receipts were created (UTC).
+        product_id (int): Foreign key to the product table, identifying the product.
+        line_count (int): The number of receipt lines of the product.
+        quantity (int): The sum of units sold.
+        revenue (float): The sum of line totals.
+    """
+
+    __tablename__ = 'product_daily_stats'
+
+    user_id = Column(Integer, ForeignKey("user.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    product_id = Column(Integer, ForeignKey("product.id"), primary_key=True)
+    line_count = Column(Integer, nullable=False)
+    quantity = Column(BigInteger, nullable=False)
+    revenue = Column(Numeric(14, 2), nullable=False)
@@ -4,12 +4,15 @@ from typing import TYPE_CHECKING
 from datetime import datetime
 
 from sqlalchemy import (
+    BigInteger,
     Column,
     Integer,
     DateTime,
     Numeric,
     ForeignKey,
+    Index,
     String,
+    text,
 )
 from sqlalchemy.orm import relationship, Mapped
 
@@ -30,7 +33,13 @@ class Receipt(Base):
         payment_type (str): The type of payment.
         payment_amount (float): The amount paid by the user.
         rest (float): The remaining balance to be refunded to the user.
+        total_cents (int): The total amount in cents.
+        payment_amount_cents (int): The amount paid in cents.
+        rest_cents (int): The remaining balance in cents.
+        item_count (int): The number of product lines of the receipt.
+        unit_count (int): The number of units of all products (sum of quantities).
         created_at (float): The timestamp when the receipt was created.
+        xact_id (int): The ID of the transaction which inserted the receipt (0 for receipts created before it was stored).
 
     Relationships:
         user (User): The user who created the receipt.
@@ -38,6 +47,14 @@ class Receipt(Base):
     """
 
     __tablename__ = 'receipt'
+    __table_args__ = (
+        # Date-bounded lists of a user (created with the partitioned tables, see `app/partitions.py`)
+        Index("ix_receipt_user_id_created_at", "user_id", "created_at"),
+        # Pages of a user's receipts
+        Index("ix_receipt_user_id_id", "user_id", "id"),
+        # Receipts of a user after a sync token (`GET /receipts/changes`)
+        Index("ix_receipt_user_id_xact_id_id", "user_id", "xact_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("user.id"), nullable=False)
@@ -45,7 +62,13 @@ class Receipt(Base):
     payment_type = Column(String, nullable=False)
     payment_amount = Column(Numeric(10, 2), nullable=False)
     rest = Column(Numeric(10, 2), nullable=False)
+    total_cents = Column(BigInteger, nullable=True)
+    payment_amount_cents = Column(BigInteger, nullable=True)
+    rest_cents = Column(BigInteger, nullable=True)
+    item_count = Column(Integer, nullable=True)
+    unit_count = Column(Integer, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    xact_id = Column(BigInteger, nullable=False, server_default=text("(pg_current_xact_id()::text::bigint)"))
 
     # Relationship to 'User' table
     user: Mapped["User"] = relationship(
@@ -0,0 +1,38 @@
+# coding=utf-8
+
+from sqlalchemy import (
+    Column,
+    Date,
+    Integer,
+    Numeric,
+    String,
+    ForeignKey,
+)
+
+from ..db import Base
+
+
+class ReceiptDailyStats(Base):
+    """
+    Model of table for save daily sales of a user by payment type (a rollup of receipts,
+    updated in the transaction creating each receipt)
+
+    Attributes:
+        user_id (int): Foreign key to the user table, identifying the receipt creator.
+        day (date): The day the receipts were created (UTC).
+        payment_type (str): The type of payment of the receipts.
+        receipt_count (int): The number of receipts.
+        total (float): The sum of receipt totals.
+        payment_amount (float): The sum of amounts paid.
+        rest (float): The sum of balances refunded.
+    """
+
+    __tablename__ = 'receipt_daily_stats'
+
+    user_id = Column(Integer, ForeignKey("user.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    payment_type = Column(String, primary_key=True)
+    receipt_count = Column(Integer, nullable=False)
+    total = Column(Numeric(14, 2), nullable=False)
+    payment_amount = Column(Numeric(14, 2), nullable=False)
+    rest = Column(Numeric(14, 2), nullable=False)
@@ -0,0 +1,35 @@
+# coding=utf-8
+
+from datetime import datetime
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    ForeignKey,
+    Integer,
+    String,
+)
+
+from ..db import Base
+
+
+class ReceiptIdempotencyKey(Base):
+    """
+    Model of table for save `Idempotency-Key` headers of receipt creations, unique per user
+    (the primary key), so retries of a request return the receipt it created
+
+    Attributes:
+        user_id (int): Foreign key to the user table, identifying the sender of the request.
+        key (str): The `Idempotency-Key` header of the request.
+        request_hash (str): SHA-256 of the request body (a key can't be reused for another receipt).
+        receipt_id (int): The receipt created by the request.
+        created_at (datetime): The timestamp when the receipt was created.
+    """
+
+    __tablename__ = 'receipt_idempotency_key'
+
+    user_id = Column(Integer, ForeignKey("user.id"), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    request_hash = Column(String(64), nullable=False)
+    receipt_id = Column(Integer, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -4,17 +4,20 @@ from typing import TYPE_CHECKING
 
 from sqlalchemy.orm import relationship, Mapped
 from sqlalchemy import (
+    BigInteger,
     Column,
+    DateTime,
     Integer,
     String,
     Numeric,
-    ForeignKey
+    ForeignKey,
+    Index,
 )
 
 from ..db import Base
 
 if TYPE_CHECKING:
-    from ..models import Receipt
+    from ..models import Receipt, Product
 
 
 class ReceiptProduct(Base):
@@ -24,21 +27,38 @@ class ReceiptProduct(Base):
     Attributes:
         id (int): Unique identifier for the receipt item.
         receipt_id (int): Foreign key referencing the receipts table, identifying the associated receipt.
-        title (str): The title of the product being purchased.
+        product_id (int): Foreign key to the product table, identifying the title of the product.
+        stored_title (str): The title stored in the row itself by earlier versions
+            (NULL for rows referencing a product).
         price (float): The price of one unit of the product.
+        price_cents (int): The price of one unit in cents.
         quantity (int): The quantity of the product purchased.
+        line_total (float): The total price of the line (price by quantity), stored on creation.
+        line_total_cents (int): The total price of the line in cents.
+        receipt_created_at (datetime): The creation time of the receipt (the partition key of lines).
 
     Relationships:
         receipt (Receipt): The associated receipt to which this item belongs.
+        product (Product): The product (title) of the item.
     """
 
     __tablename__ = 'receipt_product'
+    __table_args__ = (
+        # Products of receipts & sums of their line totals straight from the index
+        Index("ix_receipt_product_receipt_id", "receipt_id", postgresql_include=["line_total"]),
+        Index("ix_receipt_product_product_id", "product_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     receipt_id = Column(Integer, ForeignKey('receipt.id'), nullable=False)
-    title = Column(String, nullable=False)
+    product_id = Column(Integer, ForeignKey('product.id'), nullable=True)
+    stored_title = Column("title", String, nullable=True)
     price = Column(Numeric(10, 2), nullable=False)
+    price_cents = Column(BigInteger, nullable=True)
     quantity = Column(Integer, nullable=False)
+    line_total = Column(Numeric(10, 2), nullable=True)
+    line_total_cents = Column(BigInteger, nullable=True)
+    receipt_created_at = Column(DateTime, nullable=True)
 
     # Relationship to 'Receipt' table
     receipt: Mapped["Receipt"] = relationship(
@@ -46,10 +66,28 @@ class ReceiptProduct(Base):
         back_populates="products"
     )
 
+    # Relationship to 'Product' table
+    product: Mapped["Product"] = relationship("Product")
+
+    @property
+    def title(self) -> str:
+        """
+        Returns the title of the product (the product must be loaded).
+        """
+
+        if self.product is not None:
+            return self.product.title
+
+        return self.stored_title
+
     @property
     def total(self) -> float:
         """
-        Calculates the total price for a product by multiplying the unit price by the quantity.
+        Returns the stored total price of the line
+        (calculated from the unit price & quantity for rows not backfilled yet).
         """
 
+        if self.line_total is not None:
+            return self.line_total
+
         return self.price * self.quantity
@@ -0,0 +1,61 @@
+# coding=utf-8
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from sqlalchemy import BigInteger, cast, func
+
+
+# Defined smallest money unit (as stored in `Numeric(10, 2)` columns)
+CENT = Decimal("0.01")
+
+
+def to_cents(amount: Decimal) -> int:
+    """
+    Converts an amount to integer cents, rounding half up like Postgres does for `Numeric(10, 2)`.
+
+    Args:
+        amount (Decimal): The amount (e.g. Decimal("19.99")).
+
+    Returns:
+        int: The amount in cents (e.g. 1999).
+    """
+
+    return int(amount.quantize(CENT, rounding=ROUND_HALF_UP).scaleb(2))
+
+
+def from_cents(cents: int) -> Decimal:
+    """
+    Converts integer cents to an amount with two decimal places (e.g. 1999 => Decimal("19.99")),
+    the same value a `Numeric(10, 2)` column returns.
+    """
+
+    return Decimal(cents).scaleb(-2)
+
+
+def format_cents(cents: int) -> str:
+    """
+    Formats integer cents like `format_number` formats amounts:
+    spaces as thousands separator and two decimal places (e.g. 187994 => "1 879.94").
+    """
+
+    sign = "-" if cents < 0 else ""
+    units, rest = divmod(abs(cents), 100)
+
+    return f"{sign}{units:,}.{rest:02d}".replace(",", " ")
+
+
+def cents_or_amount(cents: int | None, amount: Decimal) -> int:
+    """
+    Returns the cents of a row, or its `Numeric` amount in cents when the cents column is NULL
+    (rows written before the cents columns, or by an older version during a deploy).
+    """
+
+    return cents if cents is not None else to_cents(amount)
+
+
+def cents_column(cents, amount):
+    """
+    Returns the SQL expression of `cents_or_amount`: the cents column, or `(amount * 100)::bigint`.
+    """
+
+    return func.coalesce(cents, cast(amount * 100, BigInteger))
@@ -0,0 +1,340 @@
+# coding=utf-8
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+from datetime import datetime, timedelta
+from time import perf_counter
+
+import httpx
+from sqlalchemy import delete, update
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.future import select
+
+from .metrics import OUTBOX_EVENTS, OUTBOX_FAILURES, OUTBOX_BATCH_SECONDS, OUTBOX_LAG_SECONDS
+from .models import OutboxEvent
+from .settings import DB_SETTINGS, OUTBOX_SETTINGS, OutboxSettings
+
+
+# Defined logger
+logger = logging.getLogger("easycheck.outbox")
+
+
+def add_event(db_session: AsyncSession, event_type: str, user_id: int, payload: dict) -> None:
+    """
+    Adds an event to the outbox, in the transaction of the change it describes (the caller commits):
+    it's delivered if and only if the change is committed, and delivery never slows the change down.
+
+    Args:
+        db_session (AsyncSession): The session making the change.
+        event_type (str): The type of the event (e.g. "receipt.created").
+        user_id (int): The user whose data changed.
+        payload (dict): The JSON body of the event.
+    """
+
+    if not OUTBOX_SETTINGS.enabled:
+        # Nobody downstream
+        return
+
+    db_session.add(OutboxEvent(event_type=event_type, user_id=user_id, payload=payload))
+
+
+def event_message(event: OutboxEvent) -> dict:
+    """
+    Returns the event as sent to sinks (its ID lets consumers skip events delivered twice).
+    """
+
+    return {
+        "id": event.id,
+        "type": event.event_type,
+        "user_id": event.user_id,
+        "created_at": event.created_at.isoformat(),
+        "payload": event.payload,
+    }
+
+
+class FileSink:
+    """
+    Appends events to a JSON Lines file (one event per line), synced to disk before they are
+    removed from the outbox.
+
+    Attributes:
+        path (str): The file.
+    """
+
+    name = "file"
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def write(self, lines: bytes) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        with open(self.path, "ab") as file:
+            file.write(lines)
+            file.flush()
+            os.fsync(file.fileno())
+
+    async def send(self, messages: list[dict]) -> None:
+        """
+        Writes a batch of events (in a worker thread, the loop keeps serving requests).
+        """
+
+        lines = b"".join(json.dumps(message).encode() + b"\n" for message in messages)
+        await asyncio.to_thread(self.write, lines)
+
+    async def close(self) -> None:
+        pass
+
+
+class HttpSink:
+    """
+    Posts batches of events as JSON (`{"events": [...]}`) to an HTTP endpoint; any response
+    other than 2xx fails the batch.
+
+    Attributes:
+        url (str): The endpoint.
+    """
+
+    name = "http"
+
+    def __init__(self, url: str, timeout: float, transport: httpx.AsyncBaseTransport | None = None):
+        self.url = url
+        self.client = httpx.AsyncClient(timeout=timeout, transport=transport)
+
+    async def send(self, messages: list[dict]) -> None:
+        """
+        Posts a batch of events.
+        """
+
+        response = await self.client.post(self.url, json={"events": messages})
+        response.raise_for_status()
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def build_sinks(settings: OutboxSettings = OUTBOX_SETTINGS) -> list[FileSink | HttpSink]:
+    """
+    Creates the configured sinks.
+    """
+
+    sinks = []
+
+    for name in filter(None, (name.strip() for name in settings.sinks.split(","))):
+        if name == "file":
+            sinks.append(FileSink(settings.file_path))
+
+        elif name == "http":
+            sinks.append(HttpSink(settings.http_url, settings.http_timeout))
+
+        else:
+            raise ValueError(f"Unknown outbox sink: {name}")
+
+    return sinks
+
+
+class OutboxDispatcher:
+    """
+    Delivers outbox events to the sinks, in batches, in the background.
+
+    A batch is claimed with `FOR UPDATE SKIP LOCKED` and reserved for `claim_timeout` seconds, so any number
+    of dispatchers (e.g. one per worker) share the outbox without delivering an event twice at the same time,
+    and no transaction stays open while sinks are called. Delivered events are deleted afterwards;
+    a batch failing in any sink is retried after a backoff (exponential per event, with jitter), so a consumer
+    being down never blocks receipt creation. Delivery is at least once: a batch is sent again to all sinks
+    when one of them failed, or when its dispatcher stopped before deleting it.
+    """
+
+    def __init__(self, engine: AsyncEngine, sinks: list, settings: OutboxSettings = OUTBOX_SETTINGS):
+        self.engine = engine
+        self.sinks = sinks
+        self.settings = settings
+        self.task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        """
+        Starts the dispatching task.
+        """
+
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """
+        Stops the dispatching task (a batch being delivered is retried later) and closes the sinks.
+        """
+
+        if self.task is not None:
+            self.task.cancel()
+
+            try:
+                await self.task
+
+            except asyncio.CancelledError:
+                pass
+
+        for sink in self.sinks:
+            await sink.close()
+
+    def get_backoff(self, attempts: int) -> timedelta:
+        """
+        Returns the delay before the next attempt of an event which failed `attempts` times.
+        """
+
+        delay = min(self.settings.backoff_base * 2 ** (attempts - 1), self.settings.backoff_max)
+
+        # Events failed together are not retried all at once
+        return timedelta(seconds=random.uniform(delay / 2, delay))
+
+    async def claim(self) -> list[OutboxEvent]:
+        """
+        Claims a batch of due events: they are locked with `FOR UPDATE SKIP LOCKED` just long enough
+        to reserve them for `claim_timeout` seconds (other dispatchers skip them until then), and the
+        transaction is committed before they are sent, so a slow sink never keeps it open.
+
+        Returns:
+            list[OutboxEvent]: The claimed events, oldest first.
+        """
+
+        async with AsyncSession(self.engine, expire_on_commit=False) as db_session, db_session.begin():
+            now = datetime.utcnow()
+            events = (await db_session.execute(
+                select(
+                    OutboxEvent
+                ).where(
+                    OutboxEvent.available_at <= now,
+                ).order_by(
+                    OutboxEvent.available_at,
+                    OutboxEvent.id,
+                ).limit(
+                    self.settings.batch_size
+                ).with_for_update(
+                    skip_locked=True
+                )
+            )).scalars().all()
+
+            for event in events:
+                # Claimed again if this dispatcher dies while sending
+                event.available_at = now + timedelta(seconds=self.settings.claim_timeout)
+
+        return events
+
+    async def dispatch(self) -> int:
+        """
+        Claims & delivers one batch of due events, then deletes them (or schedules their retry)
+        in a separate short transaction.
+
+        Returns:
+            int: The number of delivered events.
+        """
+
+        events = await self.claim()
+
+        if not events:
+            # Nothing due
+            return 0
+
+        ids = [event.id for event in events]
+        messages = [event_message(event) for event in events]
+
+        for sink in self.sinks:
+            started_at = perf_counter()
+
+            try:
+                await sink.send(messages)
+
+            except Exception as error:
+                OUTBOX_FAILURES.labels(sink.name).inc(len(events))
+                logger.warning("Delivery of %d outbox events to %s failed: %r", len(events), sink.name, error)
+
+                async with AsyncSession(self.engine) as db_session, db_session.begin():
+                    now = datetime.utcnow()
+
+                    for event in events:
+                        attempts = event.attempts + 1
+                        await db_session.execute(
+                            update(
+                                OutboxEvent
+                            ).where(
+                                OutboxEvent.id == event.id
+                            ).values(
+                                attempts=attempts,
+                                available_at=now + self.get_backoff(attempts),
+                                last_error=f"{sink.name}: {error!r}"[:1000],
+                            )
+                        )
+
+                return 0
+
+            OUTBOX_BATCH_SECONDS.labels(sink.name).observe(perf_counter() - started_at)
+            OUTBOX_EVENTS.labels(sink.name).inc(len(events))
+
+        async with AsyncSession(self.engine) as db_session, db_session.begin():
+            await db_session.execute(delete(OutboxEvent).where(OutboxEvent.id.in_(ids)))
+
+        delivered_at = datetime.utcnow()
+
+        for event in events:
+            OUTBOX_LAG_SECONDS.observe((delivered_at - event.created_at).total_seconds())
+
+        return len(events)
+
+    async def run(self) -> None:
+        while True:
+            try:
+                delivered = await self.dispatch()
+
+            except Exception:
+                # Retried on the next run
+                logger.exception("Outbox dispatch failed")
+                delivered = 0
+
+            if delivered < self.settings.batch_size:
+                # Caught up (or failing), otherwise the next batch is due already
+                await asyncio.sleep(self.settings.poll_interval)
+
+
+async def dispatch_forever() -> None:
+    """
+    Runs a dispatcher until it's interrupted.
+    """
+
+    from .db import build_engine
+
+    engine = build_engine(DB_SETTINGS)
+    dispatcher = OutboxDispatcher(engine, build_sinks())
+
+    try:
+        await dispatcher.run()
+
+    finally:
+        await dispatcher.stop()
+        await engine.dispose()
+
+
+def main() -> None:
+    """
+    Delivers outbox events to the configured sinks, apart from the app (e.g. with `OUTBOX_DISPATCH=false`).
+    Any number of dispatchers can run at the same time.
+    """
+
+    parser = argparse.ArgumentParser(description="Delivers outbox events to the configured sinks.")
+    parser.parse_args()
+
+    if not build_sinks():
+        parser.error("no sinks are configured (OUTBOX_SINKS)")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    try:
+        asyncio.run(dispatch_forever())
+
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,575 @@
+# coding=utf-8
+
+import argparse
+import asyncio
+import logging
+import time
+from datetime import date, datetime
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from .conf import DATABASE_URL
+from .settings import PARTITION_SETTINGS, PartitionSettings
+
+
+# Defined logger
+logger = logging.getLogger("easycheck.partitions")
+
+# Defined advisory lock key of partition maintenance (any constant shared by all instances)
+PARTITION_LOCK_KEY = 1154278
+
+# Defined partitioned tables (referenced tables first) => partition key (range, monthly)
+PARTITION_KEYS = {
+    "receipt": "created_at",
+    "receipt_product": "receipt_created_at",
+}
+
+# Defined suffixes of the partitioned tables being filled & of the tables they replace
+SHADOW_SUFFIX = "_partitioned"
+OLD_SUFFIX = "_unpartitioned"
+
+# Defined indexes of the partitioned tables (created on every partition): table => [(name, definition)]
+PARTITIONED_INDEXES = {
+    "receipt": [
+        ("ix_receipt_id", "(id)"),
+        # Date-bounded lists of a user, within the partitions left after pruning
+        ("ix_receipt_user_id_created_at", "(user_id, created_at)"),
+        # Pages of a user's receipts
+        ("ix_receipt_user_id_id", "(user_id, id)"),
+        # Receipts of a user after a sync position
+        ("ix_receipt_user_id_xact_id_id", "(user_id, xact_id, id)"),
+    ],
+    "receipt_product": [
+        ("ix_receipt_product_id", "(id)"),
+        ("ix_receipt_product_receipt_id", "(receipt_id) INCLUDE (line_total)"),
+        ("ix_receipt_product_product_id", "(product_id)"),
+    ],
+}
+
+# Defined foreign keys of the partitioned tables (`{receipt}` is the partitioned receipt table)
+PARTITIONED_FOREIGN_KEYS = {
+    "receipt": [
+        'FOREIGN KEY (user_id) REFERENCES "user" (id)',
+    ],
+    "receipt_product": [
+        "FOREIGN KEY (receipt_id, receipt_created_at) REFERENCES {receipt} (id, created_at)",
+        "FOREIGN KEY (product_id) REFERENCES product (id)",
+    ],
+}
+
+# Defined comment of shadow tables whose existing rows are copied
+COPIED_COMMENT = "copied"
+
+# Defined trigger filling the partition key of product lines inserted without it (by earlier versions)
+FILL_FUNCTION = "receipt_product_fill_created_at"
+
+
+def add_months(month: date, months: int) -> date:
+    """
+    Returns the first day of the month `months` after the month of the date.
+    """
+
+    index = month.year * 12 + month.month - 1 + months
+
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    """
+    Returns the name of the partition of the table holding the month (e.g. "receipt_y2026m10").
+    """
+
+    return f"{table}_y{month.year}m{month.month:02d}"
+
+
+def table_exists(connection: Connection, name: str) -> bool:
+    """
+    Whether the table exists (in the search path).
+    """
+
+    return connection.scalar(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name})
+
+
+def is_partitioned(connection: Connection, name: str) -> bool:
+    """
+    Whether the table exists and is partitioned.
+    """
+
+    return connection.scalar(
+        text("SELECT EXISTS (SELECT FROM pg_partitioned_table WHERE partrelid = to_regclass(:name))"),
+        {"name": name},
+    )
+
+
+def get_comment(connection: Connection, name: str) -> str | None:
+    """
+    Returns the comment of the table.
+    """
+
+    return connection.scalar(text("SELECT obj_description(to_regclass(:name), 'pg_class')"), {"name": name})
+
+
+def get_parent(connection: Connection, table: str) -> str | None:
+    """
+    Returns the partitioned table receiving rows of the table: the table itself once it's replaced,
+    the shadow table while data is migrated, None when the table isn't partitioned.
+    """
+
+    for name in (table, table + SHADOW_SUFFIX):
+        if is_partitioned(connection, name):
+            return name
+
+    return None
+
+
+def get_columns(connection: Connection, table: str) -> list[str]:
+    """
+    Returns the column names of the table, in order.
+    """
+
+    return list(connection.scalars(
+        text(
+            "SELECT column_name FROM information_schema.columns"
+            " WHERE table_schema = current_schema() AND table_name = :table"
+            " ORDER BY ordinal_position"
+        ),
+        {"table": table},
+    ))
+
+
+def create_partitions(connection: Connection, table: str, parent: str, start: date, end: date) -> list[str]:
+    """
+    Creates monthly partitions of the parent table, from the month of `start` to the month of `end`
+    (inclusive). Existing partitions are skipped.
+
+    Args:
+        connection (Connection): The connection (the caller commits).
+        table (str): The table whose rows are partitioned (names the partitions).
+        parent (str): The partitioned table (the table itself or its shadow table).
+        start (date): A day of the first month.
+        end (date): A day of the last month.
+
+    Returns:
+        list[str]: Names of the created partitions.
+    """
+
+    created = []
+    month = date(start.year, start.month, 1)
+
+    while month <= end:
+        name = partition_name(table, month)
+
+        if not table_exists(connection, name):
+            connection.execute(text(
+                f"CREATE TABLE {name} PARTITION OF {parent}"
+                f" FOR VALUES FROM ('{month}') TO ('{add_months(month, 1)}')"
+            ))
+            created.append(name)
+
+        month = add_months(month, 1)
+
+    return created
+
+
+def create_future_partitions(connection: Connection, months_ahead: int, today: date | None = None) -> list[str]:
+    """
+    Creates partitions of the current month and of `months_ahead` next months for all partitioned tables
+    (or their shadow tables during the data migration). Runs under a transaction-level advisory lock,
+    so instances doing it at the same time don't collide. Does nothing before the migration.
+
+    Args:
+        connection (Connection): The connection (the caller commits).
+        months_ahead (int): Months to create after the current one.
+        today (date | None): The current day (UTC by default).
+
+    Returns:
+        list[str]: Names of the created partitions.
+    """
+
+    today = today or datetime.utcnow().date()
+
+    # Creating a partition locks its parent, don't queue reads behind it for long
+    connection.execute(text("SET LOCAL lock_timeout = '5s'"))
+    connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": PARTITION_LOCK_KEY})
+
+    created = []
+
+    for table in PARTITION_KEYS:
+        parent = get_parent(connection, table)
+
+        if parent is not None:
+            created += create_partitions(connection, table, parent, today, add_months(today, months_ahead))
+
+    return created
+
+
+def sync_function_sql(table: str, key: str, columns: list[str]) -> str:
+    """
+    Returns SQL of the trigger function mirroring writes to the table into its shadow table
+    (upserts by the primary key of the shadow table, so it wins over rows copied in batches).
+    """
+
+    shadow = table + SHADOW_SUFFIX
+    names = ", ".join(f'"{column}"' for column in columns)
+    values = ", ".join(f'NEW."{column}"' for column in columns)
+    updates = ", ".join(f'"{column}" = EXCLUDED."{column}"' for column in columns)
+
+    return f"""
+        CREATE OR REPLACE FUNCTION {shadow}_sync() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND OLD.{key} IS DISTINCT FROM NEW.{key}) THEN
+                DELETE FROM {shadow} WHERE id = OLD.id AND {key} = OLD.{key};
+            END IF;
+
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO {shadow} ({names}) VALUES ({values})
+                ON CONFLICT (id, {key}) DO UPDATE SET {updates};
+            END IF;
+
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """
+
+
+def create_shadow_tables(
+    connection: Connection,
+    months_ahead: int,
+    today: date | None = None,
+    indexes: dict[str, list[tuple[str, str]]] | None = None,
+) -> None:
+    """
+    Creates partitioned copies of the tables (with their indexes, a default partition and monthly
+    partitions from now to `months_ahead` months from now) and triggers mirroring every write
+    to the tables into them. Existing rows (and partitions of past months) are copied by `copy_rows`.
+    Meant to be called from migrations.
+
+    Args:
+        connection (Connection): The connection.
+        months_ahead (int): Months to create after the current one.
+        today (date | None): The current day (UTC by default).
+        indexes (dict | None): Indexes to create, `PARTITIONED_INDEXES` by default
+            (migrations pass the indexes as they were, later ones are added by later migrations).
+    """
+
+    today = today or datetime.utcnow().date()
+    indexes = PARTITIONED_INDEXES if indexes is None else indexes
+
+    # Fill the partition key of lines inserted without it (it's the foreign key to the partitioned receipt)
+    connection.execute(text(f"""
+        CREATE OR REPLACE FUNCTION {FILL_FUNCTION}() RETURNS trigger AS $$
+        BEGIN
+            IF NEW.receipt_created_at IS NULL THEN
+                SELECT created_at INTO NEW.receipt_created_at FROM receipt WHERE id = NEW.receipt_id;
+            END IF;
+
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """))
+    connection.execute(text(
+        f"CREATE TRIGGER {FILL_FUNCTION} BEFORE INSERT OR UPDATE ON receipt_product"
+        f" FOR EACH ROW EXECUTE FUNCTION {FILL_FUNCTION}()"
+    ))
+
+    for table, key in PARTITION_KEYS.items():
+        shadow = table + SHADOW_SUFFIX
+        constraints = [f"PRIMARY KEY (id, {key})"] + [
+            foreign_key.format(receipt="receipt" + SHADOW_SUFFIX)
+            for foreign_key in PARTITIONED_FOREIGN_KEYS[table]
+        ]
+
+        connection.execute(text(
+            f"CREATE TABLE {shadow} (LIKE {table} INCLUDING DEFAULTS, {', '.join(constraints)})"
+            f" PARTITION BY RANGE ({key})"
+        ))
+
+        # Rows outside of all months (e.g. a wrong clock) still have a place
+        connection.execute(text(f"CREATE TABLE {table}_default PARTITION OF {shadow} DEFAULT"))
+        create_partitions(connection, table, shadow, today, add_months(today, months_ahead))
+
+        for name, definition in indexes[table]:
+            connection.execute(text(f"CREATE INDEX {name}{SHADOW_SUFFIX} ON {shadow} {definition}"))
+
+        connection.execute(text(sync_function_sql(table, key, get_columns(connection, table))))
+        connection.execute(text(
+            f"CREATE TRIGGER {shadow}_sync AFTER INSERT OR UPDATE OR DELETE ON {table}"
+            f" FOR EACH ROW EXECUTE FUNCTION {shadow}_sync()"
+        ))
+
+
+def drop_shadow_tables(connection: Connection) -> None:
+    """
+    Drops the shadow tables (with their partitions) and the triggers filling them.
+    Meant to be called from migrations.
+    """
+
+    for table in reversed(PARTITION_KEYS):
+        shadow = table + SHADOW_SUFFIX
+
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {shadow}_sync ON {table}"))
+        connection.execute(text(f"DROP FUNCTION IF EXISTS {shadow}_sync()"))
+        connection.execute(text(f"DROP TABLE IF EXISTS {shadow}"))
+
+    connection.execute(text(f"DROP TRIGGER IF EXISTS {FILL_FUNCTION} ON receipt_product"))
+    connection.execute(text(f"DROP FUNCTION IF EXISTS {FILL_FUNCTION}()"))
+
+
+def copy_rows(
+    connection: Connection,
+    batch_size: int = PARTITION_SETTINGS.batch_size,
+    pause: float = PARTITION_SETTINGS.batch_pause,
+) -> int:
+    """
+    Copies existing rows into the shadow tables over ID ranges, each batch in its own transaction,
+    so the app keeps working. Partitions of the months of a batch are created before it's copied.
+    Rows already mirrored by the triggers are skipped (they are newer), so an interrupted copy
+    can be repeated. Rows must not be deleted while it runs.
+
+    Args:
+        connection (Connection): The connection (committed after each batch).
+        batch_size (int): IDs per batch.
+        pause (float): Seconds to sleep between batches.
+
+    Returns:
+        int: The number of copied rows.
+    """
+
+    copied = 0
+
+    for table, key in PARTITION_KEYS.items():
+        shadow = table + SHADOW_SUFFIX
+
+        if not is_partitioned(connection, shadow):
+            raise RuntimeError(f"Table {shadow} doesn't exist, upgrade the database first")
+
+        columns = ", ".join(f'"{column}"' for column in get_columns(connection, shadow))
+        max_id = connection.scalar(text(f"SELECT max(id) FROM {table}")) or 0
+        connection.commit()
+
+        for start in range(0, max_id + 1, batch_size):
+            bounds = {"start": start, "end": start + batch_size}
+
+            # Months of the batch (read by the ID index)
+            first, last = connection.execute(
+                text(f"SELECT min({key}), max({key}) FROM {table} WHERE id >= :start AND id < :end"),
+                bounds,
+            ).one()
+
+            if first is not None:
+                create_partitions(connection, table, shadow, first.date(), last.date())
+
+            result = connection.execute(
+                text(
+                    f"INSERT INTO {shadow} ({columns}) SELECT {columns} FROM {table}"
+                    f" WHERE id >= :start AND id < :end ON CONFLICT DO NOTHING"
+                ),
+                bounds,
+            )
+            connection.commit()
+
+            copied += result.rowcount
+            logger.info("%s: copied IDs up to %d of %d", table, min(start + batch_size, max_id + 1) - 1, max_id)
+
+            if pause:
+                # Spare the primary & replicas
+                time.sleep(pause)
+
+        # Marks the copy as complete for `swap_tables`
+        connection.execute(text(f"COMMENT ON TABLE {shadow} IS '{COPIED_COMMENT}'"))
+        connection.commit()
+
+    return copied
+
+
+def count_missing(connection: Connection) -> dict[str, int]:
+    """
+    Counts rows of the tables missing in their shadow tables (a full scan, doesn't lock writes).
+    """
+
+    return {
+        table: connection.scalar(text(
+            f"SELECT count(*) FROM {table} t"
+            f" WHERE NOT EXISTS (SELECT FROM {table}{SHADOW_SUFFIX} s WHERE s.id = t.id AND s.{key} = t.{key})"
+        ))
+        for table, key in PARTITION_KEYS.items()
+    }
+
+
+def swap_tables(connection: Connection) -> None:
+    """
+    Replaces the tables by their filled shadow tables in one short transaction: the tables are locked,
+    renamed to `*_unpartitioned` (kept until `drop_old_tables`), the shadow tables take their names,
+    indexes and ID sequences, and the triggers are dropped.
+
+    Args:
+        connection (Connection): The connection (committed when the tables are replaced).
+
+    Raises:
+        RuntimeError: When a shadow table is missing or `copy_rows` hasn't completed.
+    """
+
+    connection.execute(text("SET LOCAL lock_timeout = '5s'"))
+    connection.execute(text(f"LOCK TABLE {', '.join(PARTITION_KEYS)} IN ACCESS EXCLUSIVE MODE"))
+
+    for table in PARTITION_KEYS:
+        shadow = table + SHADOW_SUFFIX
+
+        if not is_partitioned(connection, shadow):
+            raise RuntimeError(f"Table {shadow} doesn't exist, upgrade the database first")
+
+        # Rows written since the copy are mirrored by the triggers, `count_missing` checks all rows
+        if get_comment(connection, shadow) != COPIED_COMMENT:
+            raise RuntimeError(f"Table {shadow} isn't filled, copy rows first")
+
+    for table in PARTITION_KEYS:
+        shadow = table + SHADOW_SUFFIX
+        sequence = connection.scalar(text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": table})
+
+        connection.execute(text(f"DROP TRIGGER {shadow}_sync ON {table}"))
+        connection.execute(text(f"DROP FUNCTION {shadow}_sync()"))
+
+        connection.execute(text(f"ALTER TABLE {table} RENAME TO {table}{OLD_SUFFIX}"))
+        connection.execute(text(f"ALTER INDEX {table}_pkey RENAME TO {table}{OLD_SUFFIX}_pkey"))
+        connection.execute(text(f"ALTER TABLE {shadow} RENAME TO {table}"))
+        connection.execute(text(f"COMMENT ON TABLE {table} IS NULL"))
+        connection.execute(text(f"ALTER INDEX {shadow}_pkey RENAME TO {table}_pkey"))
+
+        for name, _ in PARTITIONED_INDEXES[table]:
+            connection.execute(text(f"ALTER INDEX IF EXISTS {name} RENAME TO {name}{OLD_SUFFIX}"))
+            connection.execute(text(f"ALTER INDEX {name}{SHADOW_SUFFIX} RENAME TO {name}"))
+
+        if sequence is not None:
+            # Dropping the old table must not drop the sequence
+            connection.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id"))
+
+    connection.commit()
+
+    for table in PARTITION_KEYS:
+        # Autovacuum never analyzes partitioned tables themselves
+        connection.execute(text(f"ANALYZE {table}"))
+
+    connection.commit()
+
+
+def drop_old_tables(connection: Connection) -> None:
+    """
+    Drops the tables replaced by `swap_tables` (with the trigger of earlier versions).
+    """
+
+    for table in reversed(PARTITION_KEYS):
+        connection.execute(text(f"DROP TABLE IF EXISTS {table}{OLD_SUFFIX}"))
+
+    connection.execute(text(f"DROP FUNCTION IF EXISTS {FILL_FUNCTION}()"))
+    connection.commit()
+
+
+class PartitionMaintainer:
+    """
+    Creates future partitions in the background of the app: at startup, then every `interval` seconds.
+    """
+
+    def __init__(self, engine: AsyncEngine, settings: PartitionSettings = PARTITION_SETTINGS):
+        self.engine = engine
+        self.settings = settings
+        self.task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        """
+        Starts the maintenance task.
+        """
+
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """
+        Stops the maintenance task.
+        """
+
+        if self.task is not None:
+            self.task.cancel()
+
+            try:
+                await self.task
+
+            except asyncio.CancelledError:
+                pass
+
+    async def maintain(self) -> list[str]:
+        """
+        Creates missing partitions once.
+        """
+
+        async with self.engine.begin() as connection:
+            created = await connection.run_sync(create_future_partitions, self.settings.months_ahead)
+
+        if created:
+            logger.info("Created partitions: %s", ", ".join(created))
+
+        return created
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.maintain()
+
+            except Exception:
+                # Retried on the next run (partitions are created months ahead)
+                logger.exception("Partition maintenance failed")
+
+            await asyncio.sleep(self.settings.interval)
+
+
+def main() -> None:
+    """
+    Manages partitions of receipts. Data migration to partitioned tables, without downtime:
+
+        alembic upgrade (python -m app.migrate)   creates the partitioned shadow tables & triggers
+        python -m app.partitions copy             copies existing rows in batches
+        python -m app.partitions verify           counts rows not copied yet
+        python -m app.partitions swap             replaces the tables (locks them for a moment)
+        python -m app.partitions drop-old         drops the replaced tables
+
+    `python -m app.partitions maintain` creates future partitions (the app does it in the background too).
+    """
+
+    parser = argparse.ArgumentParser(description="Manages monthly partitions of receipts.")
+    parser.add_argument("command", choices=["maintain", "copy", "verify", "swap", "drop-old"])
+    parser.add_argument("--batch-size", type=int, default=PARTITION_SETTINGS.batch_size)
+    parser.add_argument("--pause", type=float, default=PARTITION_SETTINGS.batch_pause)
+    parser.add_argument("--months-ahead", type=int, default=PARTITION_SETTINGS.months_ahead)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    # Synchronous connection, like migrations
+    engine = create_engine(DATABASE_URL.replace("+asyncpg", "+psycopg2"))
+
+    with engine.connect() as connection:
+        if args.command == "maintain":
+            created = create_future_partitions(connection, args.months_ahead)
+            connection.commit()
+            logger.info("Created partitions: %s", ", ".join(created) or "none")
+
+        elif args.command == "copy":
+            logger.info("Copied %d rows", copy_rows(connection, args.batch_size, args.pause))
+
+        elif args.command == "verify":
+            for table, missing in count_missing(connection).items():
+                logger.info("%s: %d rows missing", table, missing)
+
+        elif args.command == "swap":
+            swap_tables(connection)
+            logger.info("Tables replaced by partitioned tables")
+
+        else:
+            drop_old_tables(connection)
+            logger.info("Replaced tables dropped")
+
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# coding=utf-8
+
+import asyncio
+import cProfile
+import hmac
+import json
+import os
+import random
+import re
+from datetime import datetime, UTC
+from time import perf_counter
+
+from .metrics import REQUEST_STATS, RequestStats, get_route_path
+from .settings import PROFILING_SETTINGS, ProfilingSettings
+
+
+def save_profile(
+        directory: str,
+        profile: cProfile.Profile,
+        report: dict,
+) -> str:
+    """
+    Saves the profile (`.prof`, readable with `pstats` or snakeviz) and the
+    request report (`.json`, with SQL statements & timings) to the directory.
+
+    Args:
+        directory (str): The directory to save files to.
+        profile (cProfile.Profile): The finished profile of the request.
+        report (dict): Request details, SQL statements and pool wait time.
+
+    Returns:
+        str: The path of the saved files without extension.
+    """
+
+    os.makedirs(directory, exist_ok=True)
+
+    # Defined file name: time, method & route of the request
+    route = re.sub(r"[^A-Za-z0-9]+", "_", report["route"]).strip("_") or "root"
+    timestamp = datetime.now(UTC).strftime("%Y%m%dT%H%M%S%f")
+    path = os.path.join(directory, f"{timestamp}_{report['method']}_{route}")
+
+    profile.dump_stats(f"{path}.prof")
+
+    with open(f"{path}.json", "w", encoding="utf-8") as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+
+    return path
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that runs selected requests under `cProfile`.
+
+    A request is profiled when it carries the secret token in the profiling header,
+    or when it is picked by the sampling rate. Other requests only pay for one header lookup.
+    Only one request is profiled at a time, since `cProfile` profiles the whole thread
+    (other requests served at the same moment show up in the profile as well).
+    """
+
+    def __init__(self, app, settings: ProfilingSettings = PROFILING_SETTINGS):
+        self.app = app
+        self.settings = settings
+        self.header = settings.header.encode("latin-1")
+        self.token = settings.token.encode("latin-1") if settings.token else None
+        self.busy = False
+
+    def should_profile(self, scope: dict) -> bool:
+        """
+        Whether the request is asked for (authorized token) or sampled for profiling.
+        """
+
+        if self.token is not None:
+            for name, value in scope["headers"]:
+                if name == self.header:
+                    # Header present => check token
+                    return hmac.compare_digest(value, self.token)
+
+        return self.settings.sample_rate > 0 and random.random() < self.settings.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.busy or not self.should_profile(scope):
+            # Not profiled
+            await self.app(scope, receive, send)
+            return
+
+        # Collect SQL statements of this request
+        stats = REQUEST_STATS.get()
+        token = None
+
+        if stats is None:
+            # Not measured by metrics middleware
+            stats = RequestStats()
+            token = REQUEST_STATS.set(stats)
+
+        stats.queries = []
+        status_code = None
+
+        async def send_wrapper(message):
+            nonlocal status_code
+
+            if message["type"] == "http.response.start":
+                # Remember status
+                status_code = message["status"]
+
+            await send(message)
+
+        self.busy = True
+        profile = cProfile.Profile()
+        started_at = perf_counter()
+        profile.enable()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+
+        finally:
+            profile.disable()
+            elapsed = perf_counter() - started_at
+            self.busy = False
+
+            if token is not None:
+                REQUEST_STATS.reset(token)
+
+            # Defined request report
+            report = {
+                "method": scope["method"],
+                "path": scope["path"],
+                "query_string": scope["query_string"].decode("latin-1"),
+                "route": get_route_path(scope),
+                "status_code": status_code,
+                "duration_seconds": elapsed,
+                "db_seconds": stats.db_seconds,
+                "pool_wait_seconds": stats.pool_wait_seconds,
+                "statements": [
+                    {"sql": statement, "seconds": seconds}
+                    for statement, seconds in stats.queries
+                ],
+            }
+            stats.queries = None
+
+            # Write files without blocking the event loop
+            await asyncio.to_thread(save_profile, self.settings.directory, profile, report)
@@ -0,0 +1,116 @@
+# coding=utf-8
+
+import asyncio
+from typing import Hashable
+
+from .metrics import PUBSUB_SUBSCRIBERS, PUBSUB_MESSAGES, PUBSUB_OVERFLOWS
+
+
+class Subscription:
+    """
+    Messages of a topic for one subscriber, in a bounded buffer.
+
+    Attributes:
+        topic (Hashable): The subscribed topic (e.g. a user ID).
+        overflowed (bool): Whether the subscription was closed because its buffer was full.
+    """
+
+    def __init__(self, topic: Hashable, buffer_size: int):
+        self.topic = topic
+        self.queue: asyncio.Queue[bytes | None] = asyncio.Queue(buffer_size)
+        self.overflowed = False
+
+    async def get(self) -> bytes | None:
+        """
+        Returns the next message, waiting for it (None once the subscription is closed).
+        """
+
+        return await self.queue.get()
+
+    def close(self) -> None:
+        """
+        Drops buffered messages and wakes the subscriber up with None.
+        """
+
+        while not self.queue.empty():
+            self.queue.get_nowait()
+
+        self.queue.put_nowait(None)
+
+
+class PubSub:
+    """
+    In-process publish/subscribe of byte messages by topic.
+
+    Publishing never waits for subscribers: each one has its own bounded buffer, and a subscriber
+    whose buffer is full is closed (it missed messages and should catch up another way),
+    so one slow consumer can't hold memory or delay the others.
+
+    Attributes:
+        name (str): The value of the "feed" label of metrics.
+        buffer_size (int): Messages buffered per subscription.
+    """
+
+    def __init__(self, name: str, buffer_size: int):
+        self.name = name
+        self.buffer_size = buffer_size
+        self.subscriptions: dict[Hashable, set[Subscription]] = {}
+
+    def subscribe(self, topic: Hashable) -> Subscription:
+        """
+        Returns a new subscription to the topic (to be unsubscribed when it's no longer read).
+        """
+
+        subscription = Subscription(topic, self.buffer_size)
+        self.subscriptions.setdefault(topic, set()).add(subscription)
+        PUBSUB_SUBSCRIBERS.labels(self.name).inc()
+
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """
+        Stops delivering messages to the subscription (closed ones are unsubscribed already).
+        """
+
+        subscriptions = self.subscriptions.get(subscription.topic, set())
+
+        if subscription in subscriptions:
+            subscriptions.discard(subscription)
+            PUBSUB_SUBSCRIBERS.labels(self.name).dec()
+
+            if not subscriptions:
+                # Last subscriber of the topic
+                del self.subscriptions[subscription.topic]
+
+    def has_subscribers(self, topic: Hashable) -> bool:
+        """
+        Whether anyone in this process is subscribed to the topic.
+        """
+
+        return topic in self.subscriptions
+
+    def publish(self, topic: Hashable, message: bytes) -> int:
+        """
+        Delivers the message to all subscriptions of the topic, closing those with a full buffer.
+
+        Returns:
+            int: The number of subscriptions the message was delivered to.
+        """
+
+        delivered = 0
+
+        for subscription in list(self.subscriptions.get(topic, ())):
+            try:
+                subscription.queue.put_nowait(message)
+                delivered += 1
+
+            except asyncio.QueueFull:
+                # Slow consumer
+                self.unsubscribe(subscription)
+                subscription.overflowed = True
+                subscription.close()
+                PUBSUB_OVERFLOWS.labels(self.name).inc()
+
+        PUBSUB_MESSAGES.labels(self.name).inc(delivered)
+
+        return delivered
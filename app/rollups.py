@@ -0,0 +1,142 @@
+# coding=utf-8
+
+import argparse
+import logging
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import create_engine, delete, func, insert, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.future import select
+
+from .conf import DATABASE_URL
+from .models import ArchivedReceipt, ProductDailyStats, Receipt, ReceiptDailyStats, ReceiptProduct
+from .partitions import add_months
+
+
+# Defined logger
+logger = logging.getLogger("easycheck.rollups")
+
+
+def rebuild_stats(connection: Connection, start: date, end: date) -> int:
+    """
+    Recomputes daily sales (of receipts & of products) from receipts, one month per transaction
+    (only partitions of that month are read). Days of the month are replaced at once, so readers never see a half-built month.
+    The current day is rebuilt under a lock blocking receipt creation (it waits for the upserts
+    of running transactions, and new ones wait for the rebuild), so no receipt is counted twice or lost.
+
+    Args:
+        connection (Connection): The connection (committed after each month).
+        start (date): The first day to rebuild.
+        end (date): The day after the last day to rebuild.
+
+    Returns:
+        int: The number of rollup rows written.
+    """
+
+    archived = connection.scalar(
+        select(func.count()).select_from(ArchivedReceipt).where(
+            ArchivedReceipt.created_at >= datetime.combine(start, time()),
+            ArchivedReceipt.created_at < datetime.combine(end, time()),
+        )
+    )
+
+    if archived:
+        # Receipts of these days are gone from the hot tables
+        raise RuntimeError(f"{archived} receipts of the range are archived, rebuild later days only")
+
+    written = 0
+    today = datetime.utcnow().date()
+
+    while start < end:
+        batch_end = min(add_months(start, 1), end)
+
+        if start <= today < batch_end:
+            connection.execute(text("LOCK TABLE receipt_daily_stats, product_daily_stats IN SHARE ROW EXCLUSIVE MODE"))
+
+        for table in (ReceiptDailyStats, ProductDailyStats):
+            connection.execute(delete(table).where(table.day >= start, table.day < batch_end))
+
+        day = func.date(Receipt.created_at)
+        written += connection.execute(
+            insert(ReceiptDailyStats).from_select(
+                ["user_id", "day", "payment_type", "receipt_count", "total", "payment_amount", "rest"],
+                select(
+                    Receipt.user_id,
+                    day,
+                    Receipt.payment_type,
+                    func.count(),
+                    func.sum(Receipt.total),
+                    func.sum(Receipt.payment_amount),
+                    func.sum(Receipt.rest),
+                ).where(
+                    Receipt.created_at >= datetime.combine(start, time()),
+                    Receipt.created_at < datetime.combine(batch_end, time()),
+                ).group_by(
+                    Receipt.user_id,
+                    day,
+                    Receipt.payment_type,
+                ),
+            )
+        ).rowcount
+
+        day = func.date(ReceiptProduct.receipt_created_at)
+        written += connection.execute(
+            insert(ProductDailyStats).from_select(
+                ["user_id", "day", "product_id", "line_count", "quantity", "revenue"],
+                select(
+                    Receipt.user_id,
+                    day,
+                    ReceiptProduct.product_id,
+                    func.count(),
+                    func.sum(ReceiptProduct.quantity),
+                    func.sum(func.coalesce(ReceiptProduct.line_total, ReceiptProduct.price * ReceiptProduct.quantity)),
+                ).join(
+                    Receipt,
+                    Receipt.id == ReceiptProduct.receipt_id,
+                ).where(
+                    ReceiptProduct.receipt_created_at >= datetime.combine(start, time()),
+                    ReceiptProduct.receipt_created_at < datetime.combine(batch_end, time()),
+                    Receipt.created_at >= datetime.combine(start, time()),
+                    Receipt.created_at < datetime.combine(batch_end, time()),
+                    ReceiptProduct.product_id.is_not(None),
+                ).group_by(
+                    Receipt.user_id,
+                    day,
+                    ReceiptProduct.product_id,
+                ),
+            )
+        ).rowcount
+        connection.commit()
+
+        logger.info("Rebuilt daily sales from %s to %s", start, batch_end)
+        start = batch_end
+
+    return written
+
+
+def main() -> None:
+    """
+    Rebuilds daily sales of a date range from receipts (backfills, or repairs after manual changes).
+    """
+
+    parser = argparse.ArgumentParser(description="Maintains rollups of receipts.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    rebuild = subparsers.add_parser("rebuild", help="Recomputes daily sales of a date range.")
+    rebuild.add_argument("--start", type=date.fromisoformat, required=True)
+    rebuild.add_argument("--end", type=date.fromisoformat, help="The last day (included), today by default.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    # Synchronous connection, like migrations
+    engine = create_engine(DATABASE_URL.replace("+asyncpg", "+psycopg2"))
+    end = (args.end or datetime.utcnow().date()) + timedelta(days=1)
+
+    with engine.connect() as connection:
+        logger.info("Wrote %d rows of daily sales", rebuild_stats(connection, args.start, end))
+
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
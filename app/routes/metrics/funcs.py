@@ -0,0 +1,73 @@
+# coding=utf-8
+
+import glob
+import os
+import re
+
+from fastapi import APIRouter, Response
+from prometheus_client import generate_latest, CollectorRegistry, CONTENT_TYPE_LATEST
+from prometheus_client.multiprocess import MultiProcessCollector
+
+from app.metrics import mark_worker_dead
+
+
+metrics_router = APIRouter(
+    tags=["metrics"],
+)
+
+# Defined files of live gauges of a worker (e.g. "gauge_livesum_1234.db")
+LIVE_GAUGE_FILE = re.compile(r"gauge_live\w+?_(\d+)\.db$")
+
+
+def remove_dead_workers(directory: str) -> None:
+    """
+    Removes live gauges of workers which exited without cleaning up (e.g. killed or crashed),
+    so the pool state of a dead worker is not added to that of the running ones.
+    """
+
+    for path in glob.glob(os.path.join(directory, "gauge_live*.db")):
+        match = LIVE_GAUGE_FILE.search(os.path.basename(path))
+
+        if match is None:
+            continue
+
+        pid = int(match.group(1))
+
+        try:
+            # Signal 0 only checks the process exists
+            os.kill(pid, 0)
+
+        except ProcessLookupError:
+            mark_worker_dead(pid)
+
+        except PermissionError:
+            # Alive, owned by another user
+            pass
+
+
+@metrics_router.get(
+    "/metrics",
+    include_in_schema=False,
+)
+async def get_metrics() -> Response:
+    """
+    Endpoint for Prometheus to scrape the application metrics.
+    With several workers (`PROMETHEUS_MULTIPROC_DIR` set), metrics of all workers are merged.
+    """
+
+    directory = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+    if directory:
+        # Multiprocess mode
+        remove_dead_workers(directory)
+        registry = CollectorRegistry()
+        MultiProcessCollector(registry)
+        content = generate_latest(registry)
+
+    else:
+        content = generate_latest()
+
+    return Response(
+        content=content,
+        media_type=CONTENT_TYPE_LATEST,
+    )
@@ -0,0 +1,217 @@
+# coding=utf-8
+
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Callable, Literal
+
+import cbor2
+import msgpack
+from fastapi import HTTPException, Request, Response
+from fastapi.routing import APIRoute
+from pydantic import TypeAdapter
+
+
+# Defined media types
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+CBOR = "application/cbor"
+
+# Defined binary media types (with common aliases) => format
+BINARY_MEDIA_TYPES = {
+    MSGPACK: MSGPACK,
+    "application/x-msgpack": MSGPACK,
+    "application/vnd.msgpack": MSGPACK,
+    CBOR: CBOR,
+}
+
+# Defined binary encoders & decoders, by format
+ENCODERS: dict[str, Callable[[Any], bytes]] = {
+    MSGPACK: msgpack.packb,
+    CBOR: cbor2.dumps,
+}
+DECODERS: dict[str, Callable[[bytes], Any]] = {
+    MSGPACK: msgpack.unpackb,
+    CBOR: cbor2.loads,
+}
+
+
+def parse_media_type(value: str | None) -> str:
+    """
+    Returns the media type of a `Content-Type` value, without parameters.
+    """
+
+    return (value or "").partition(";")[0].strip().lower()
+
+
+def choose_media_type(accept: str | None) -> str:
+    """
+    Chooses the response media type from the `Accept` header: JSON or a binary format,
+    whichever has the highest q-value (the first listed wins ties). JSON is the default.
+
+    Args:
+        accept (str | None): Value of the `Accept` header.
+
+    Returns:
+        str: The media type of the response.
+    """
+
+    best = JSON
+    best_quality = 0.0
+
+    for item in (accept or "").split(","):
+        media_type, _, params = item.partition(";")
+        media_type = media_type.strip().lower()
+        quality = 1.0
+
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+
+            if key == "q":
+                try:
+                    quality = float(value)
+
+                except ValueError:
+                    # Invalid q-value
+                    quality = 0.0
+
+        if (media_type == JSON or media_type in BINARY_MEDIA_TYPES) and quality > best_quality:
+            best, best_quality = media_type, quality
+
+    return best
+
+
+def get_media_type(request: Request) -> str:
+    """
+    Dependency returning the response media type negotiated by the `Accept` header.
+    """
+
+    return choose_media_type(request.headers.get("accept"))
+
+
+def encode_cents(value: Any) -> Any:
+    """
+    Converts a value the binary encoders can't write: Decimals to integer cents
+    (e.g. Decimal("19.99") => 1999), datetimes to ISO 8601 strings (as in JSON).
+    """
+
+    if isinstance(value, Decimal):
+        return int(value.scaleb(2))
+
+    if isinstance(value, datetime):
+        return value.isoformat()
+
+    raise TypeError(f"Can't encode {type(value).__name__}")
+
+
+def money_to_cents(value: Any) -> Any:
+    """
+    Converts Decimals & datetimes of a dumped model by `encode_cents`
+    (for CBOR, which writes Decimals as decimal fractions by itself).
+    """
+
+    if isinstance(value, dict):
+        return {key: money_to_cents(item) for key, item in value.items()}
+
+    if isinstance(value, list):
+        return [money_to_cents(item) for item in value]
+
+    if isinstance(value, (Decimal, datetime)):
+        return encode_cents(value)
+
+    return value
+
+
+# Defined binary encoders writing money in cents, by format (of dumped models with Decimals)
+CENTS_ENCODERS: dict[str, Callable[[Any], bytes]] = {
+    MSGPACK: lambda content: msgpack.packb(content, default=encode_cents),
+    CBOR: lambda content: cbor2.dumps(money_to_cents(content)),
+}
+
+
+def negotiated_response(content: bytes, media_type: str = JSON) -> Response:
+    """
+    Returns a response of the negotiated media type, marked as varying with `Accept`
+    (so shared caches never serve a binary body to a JSON client, or the reverse).
+    """
+
+    return Response(content=content, media_type=media_type, headers={"Vary": "Accept"})
+
+
+def render(
+    adapter: TypeAdapter,
+    value: Any,
+    media_type: str = JSON,
+    money: Literal["cents", "string"] = "string",
+) -> Response:
+    """
+    Serializes an already built response model in the negotiated media type.
+
+    Args:
+        adapter (TypeAdapter): Precompiled serializer of the response model.
+        value (Any): The response model (or a value of the adapter's type).
+        media_type (str): The negotiated media type (see `get_media_type`).
+        money (str): How Decimals are written to binary formats: "cents" or "string".
+
+    Returns:
+        Response: The serialized response.
+    """
+
+    binary_format = BINARY_MEDIA_TYPES.get(media_type)
+
+    if binary_format is None:
+        # JSON
+        return negotiated_response(adapter.dump_json(value))
+
+    if money == "cents":
+        content = CENTS_ENCODERS[binary_format](adapter.dump_python(value))
+
+    else:
+        # Decimals & datetimes as strings, exactly as in JSON
+        content = ENCODERS[binary_format](adapter.dump_python(value, mode="json"))
+
+    return negotiated_response(content, media_type)
+
+
+class BinaryBodyRequest(Request):
+    """
+    Request with a MessagePack/CBOR body, decoded where FastAPI expects a JSON body.
+    """
+
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            binary_format = self.scope["body_format"]
+
+            try:
+                self._json = DECODERS[binary_format](await self.body())
+
+            except Exception:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Invalid {binary_format} body"
+                )
+
+        return self._json
+
+
+class NegotiatedRoute(APIRoute):
+    """
+    Route accepting request bodies as JSON, MessagePack or CBOR (by `Content-Type`).
+    Bodies are validated against the same schemas, whatever the format.
+    """
+
+    def get_route_handler(self) -> Callable:
+        route_handler = super().get_route_handler()
+
+        async def negotiated_route_handler(request: Request) -> Response:
+            binary_format = BINARY_MEDIA_TYPES.get(parse_media_type(request.headers.get("content-type")))
+
+            if binary_format is not None:
+                # Without `Content-Type` FastAPI reads the body by `Request.json()`
+                scope = dict(request.scope)
+                scope["headers"] = [(name, value) for name, value in request.scope["headers"] if name != b"content-type"]
+                scope["body_format"] = binary_format
+                request = BinaryBodyRequest(scope, request.receive)
+
+            return await route_handler(request)
+
+        return negotiated_route_handler
@@ -1,18 +1,33 @@
 # coding=utf-8
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
+import app.funcs.receipt.cache as cache
+import app.funcs.receipt.feed as feed
 import app.funcs.receipt.funcs as funcs
+import app.funcs.receipt.stats as stats
+import app.funcs.receipt.sync as sync
 from app.funcs.user.funcs import get_user_id
-from app.db import get_session
+from app.db import get_session, get_read_session
+from app.routes.negotiation import NegotiatedRoute, get_media_type, render
 
 from .schema import *
+from .serialize import (
+    TEXT_ADAPTER,
+    render_changes,
+    render_receipt,
+    render_receipts,
+    render_stats,
+    render_top_products,
+)
 
 
 receipt_router = APIRouter(
     prefix="/receipts",
     tags=["receipts"],
+    route_class=NegotiatedRoute,
 )
 
 
@@ -24,15 +39,109 @@ async def create_receipt(
     receipt_data: ReceiptRequestSchema,
     db_session: AsyncSession = Depends(get_session),
     user_id: int = Depends(get_user_id),
-) -> dict:
+    media_type: str = Depends(get_media_type),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key", min_length=1, max_length=255),
+) -> Response:
     """
     Endpoint for create a new receipt based on the provided data.
+    Retries with the same `Idempotency-Key` header return the receipt created by the first request.
     """
 
-    return await funcs.create_receipt(
+    return render_receipt(await funcs.create_receipt(
         user_id=user_id,
         db_session=db_session,
         receipt_data=receipt_data,
+        idempotency_key=idempotency_key,
+    ), media_type)
+
+
+@receipt_router.get(
+    "/stats",
+    response_model=ReceiptStatsResponseSchema,
+)
+async def get_receipt_stats(
+    db_session: AsyncSession = Depends(get_read_session),
+    user_id: int = Depends(get_user_id),
+    filters_data: ReceiptStatsRequestSchema = Depends(),
+    media_type: str = Depends(get_media_type),
+) -> Response:
+    """
+    Endpoint for retrieve sales by day or month and payment type, for any date range.
+    """
+
+    return render_stats(await stats.get_receipt_stats(
+        db_session=db_session,
+        user_id=user_id,
+        start_date=filters_data.start_date,
+        end_date=filters_data.end_date,
+        period=filters_data.period,
+        payment_type=filters_data.payment_type,
+    ), media_type)
+
+
+@receipt_router.get(
+    "/stats/products",
+    response_model=ReceiptTopProductsResponseSchema,
+)
+async def get_top_products(
+    db_session: AsyncSession = Depends(get_read_session),
+    user_id: int = Depends(get_user_id),
+    filters_data: ReceiptTopProductsRequestSchema = Depends(),
+    media_type: str = Depends(get_media_type),
+) -> Response:
+    """
+    Endpoint for retrieve best selling products by revenue or units sold, for any date range.
+    """
+
+    return render_top_products(await stats.get_top_products(
+        db_session=db_session,
+        user_id=user_id,
+        start_date=filters_data.start_date,
+        end_date=filters_data.end_date,
+        order_by=filters_data.order_by,
+        limit=filters_data.limit,
+    ), media_type)
+
+
+@receipt_router.get(
+    "/changes",
+    response_model=ReceiptChangesResponseSchema,
+)
+async def get_receipt_changes(
+    db_session: AsyncSession = Depends(get_session),
+    user_id: int = Depends(get_user_id),
+    filters_data: ReceiptChangesRequestSchema = Depends(),
+    media_type: str = Depends(get_media_type),
+) -> Response:
+    """
+    Endpoint for retrieve receipts created after a sync token, with the next token (for clients keeping local copies).
+    """
+
+    return render_changes(await sync.get_receipt_changes(
+        db_session=db_session,
+        user_id=user_id,
+        since=filters_data.since,
+        limit=filters_data.limit,
+    ), media_type)
+
+
+@receipt_router.get(
+    "/feed",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}}},
+)
+async def get_receipt_feed(
+    user_id: int = Depends(get_user_id),
+) -> StreamingResponse:
+    """
+    Endpoint for stream newly created receipts of the user as Server-Sent Events (`event: receipt`, the ID of
+    the receipt as event ID & its JSON as data). Receipts missed while disconnected are read by `GET /receipts/changes`.
+    """
+
+    return StreamingResponse(
+        feed.stream_receipts(user_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
@@ -43,17 +152,18 @@ async def create_receipt(
 async def get_receipt_by_id(
     receipt_id: int,
     user_id: int = Depends(get_user_id),
-    db_session: AsyncSession = Depends(get_session),
-) -> dict:
+    db_session: AsyncSession = Depends(get_read_session),
+    media_type: str = Depends(get_media_type),
+) -> Response:
     """
     Endpoint for retrieve a receipt by its unique ID, including associated products and payment details.
     """
 
-    return await funcs.get_receipt(
+    return render_receipt(await cache.get_receipt(
         db_session=db_session,
         receipt_id=receipt_id,
         user_id=user_id,
-    )
+    ), media_type)
 
 
 @receipt_router.get(
@@ -61,25 +171,27 @@ async def get_receipt_by_id(
     response_model=ReceiptsResponseSchema,
 )
 async def get_receipts(
-    db_session: AsyncSession = Depends(get_session),
+    db_session: AsyncSession = Depends(cache.get_list_session),
     user_id: int = Depends(get_user_id),
     filters_data: ReceiptsRequestSchema = Depends(),
-
-) -> dict:
+    media_type: str = Depends(get_media_type),
+) -> Response:
     """
     Endpoint for retrieve a list of receipts, including associated products and payment details.
     """
 
-    return await funcs.get_receipts(
+    return render_receipts(await cache.get_receipts(
         user_id=user_id,
         db_session=db_session,
         start_date=filters_data.start_date,
         end_date=filters_data.end_date,
         total=filters_data.total,
         payment_type=filters_data.payment_type,
+        product_query=filters_data.product_query,
         page=filters_data.page,
         on_page=filters_data.on_page,
-    )
+        aggregates=filters_data.aggregates,
+    ), media_type)
 
 
 @receipt_router.get(
@@ -89,14 +201,15 @@ async def get_receipts(
 async def get_receipt_text(
     receipt_id: int,
     filters_data: ReceiptTextRequestSchema = Depends(),
-    db_session: AsyncSession = Depends(get_session),
-) -> dict:
+    db_session: AsyncSession = Depends(get_read_session),
+    media_type: str = Depends(get_media_type),
+) -> Response:
     """
     Endpoint for retrieve the textual representation of a receipt.
     """
 
-    return await funcs.get_receipt_text(
+    return render(TEXT_ADAPTER, await cache.get_receipt_text(
         receipt_id=receipt_id,
         db_session=db_session,
         width=filters_data.width
-    )
+    ), media_type)
@@ -2,7 +2,8 @@
 
 from typing import Literal
 from decimal import Decimal
-from datetime import datetime
+import datetime as dt
+from datetime import date, datetime
 
 from pydantic import BaseModel, Field
 
@@ -155,6 +156,13 @@ class ReceiptsRequestSchema(BaseModel):
         description="Optional filter to get receipts based on payment type.",
         examples=["cash"]
     )
+    product_query: str | None = Field(
+        None,
+        min_length=3,
+        max_length=100,
+        description="Optional filter to get receipts containing a product whose title contains this text (case-insensitive).",
+        examples=["Phone Case"]
+    )
     page: int = Field(
         0,
         description="Page number for pagination. Default is 0.",
@@ -165,6 +173,42 @@ class ReceiptsRequestSchema(BaseModel):
         description="Number of records to display per page. Default is 10.",
         examples=[10]
     )
+    aggregates: str | None = Field(
+        None,
+        pattern=r"^(sum|avg|by_payment_type)(,(sum|avg|by_payment_type))*$",
+        description="Optional comma-separated aggregates of all filtered receipts: sum, avg, by_payment_type.",
+        examples=["sum,avg,by_payment_type"]
+    )
+
+
+class ReceiptsPaymentTypeAggregateSchema(BaseModel):
+    receipts: int = Field(
+        ...,
+        description="The number of filtered receipts of the payment type.",
+        examples=[42]
+    )
+    sum: Decimal = Field(
+        ...,
+        description="The sum of totals of filtered receipts of the payment type.",
+        examples=[1879.94]
+    )
+
+
+class ReceiptsAggregatesSchema(BaseModel):
+    sum: Decimal | None = Field(
+        None,
+        description="The sum of totals of all filtered receipts (when requested).",
+        examples=[2879.94]
+    )
+    avg: Decimal | None = Field(
+        None,
+        description="The average total of filtered receipts, null when there are none (when requested).",
+        examples=[28.80]
+    )
+    by_payment_type: dict[Literal["cash", "card"], ReceiptsPaymentTypeAggregateSchema] | None = Field(
+        None,
+        description="Receipts & sums of totals of filtered receipts by payment type (when requested).",
+    )
 
 
 class ReceiptsResponseSchema(BaseModel):
@@ -189,6 +233,10 @@ class ReceiptsResponseSchema(BaseModel):
         examples=[2]
     )
     results: list[ReceiptResponseSchema]
+    aggregates: ReceiptsAggregatesSchema | None = Field(
+        None,
+        description="Aggregates of all filtered receipts (not only of the page), when requested.",
+    )
 
     class Config:
         from_attributes = True
@@ -231,3 +279,164 @@ class ReceiptTextResponseSchema(BaseModel):
             "      Дякуємо за покупку!"
         ]
     )
+
+
+class ReceiptStatsRequestSchema(BaseModel):
+    start_date: date | None = Field(
+        None,
+        description="Optional first day of the range (UTC).",
+        examples=["2025-01-01"]
+    )
+    end_date: date | None = Field(
+        None,
+        description="Optional last day of the range (UTC), included.",
+        examples=["2025-12-31"]
+    )
+    period: Literal["day", "month"] = Field(
+        "day",
+        description="Sales are summed by day or by month.",
+        examples=["month"]
+    )
+    payment_type: Literal["cash", "card"] | None = Field(
+        None,
+        description="Optional filter to get sales of one payment type.",
+        examples=["cash"]
+    )
+
+
+class ReceiptStatsItemSchema(BaseModel):
+    date: dt.date = Field(
+        ...,
+        description="The day, or the first day of the month.",
+        examples=["2025-01-01"]
+    )
+    payment_type: Literal["cash", "card"] = Field(
+        ...,
+        description="The type of payment of the receipts.",
+        examples=["cash"]
+    )
+    receipts: int = Field(
+        ...,
+        description="The number of receipts.",
+        examples=[42]
+    )
+    total: Decimal = Field(
+        ...,
+        description="The sum of receipt totals.",
+        examples=[1879.94]
+    )
+    payment_amount: Decimal = Field(
+        ...,
+        description="The sum of amounts paid.",
+        examples=[2000.00]
+    )
+    rest: Decimal = Field(
+        ...,
+        description="The sum of balances refunded.",
+        examples=[120.06]
+    )
+
+
+class ReceiptStatsResponseSchema(BaseModel):
+    period: Literal["day", "month"] = Field(
+        ...,
+        description="Sales are summed by day or by month.",
+        examples=["day"]
+    )
+    results: list[ReceiptStatsItemSchema] = Field(
+        ...,
+        description="Sales of each period & payment type with receipts, in order of dates."
+    )
+
+
+class ReceiptTopProductsRequestSchema(BaseModel):
+    start_date: date | None = Field(
+        None,
+        description="Optional first day of the range (UTC).",
+        examples=["2025-01-01"]
+    )
+    end_date: date | None = Field(
+        None,
+        description="Optional last day of the range (UTC), included.",
+        examples=["2025-12-31"]
+    )
+    order_by: Literal["revenue", "quantity"] = Field(
+        "revenue",
+        description="Products are ranked by revenue or by units sold.",
+        examples=["quantity"]
+    )
+    limit: int = Field(
+        10,
+        ge=1,
+        le=100,
+        description="The number of products to return.",
+        examples=[10]
+    )
+
+
+class ReceiptTopProductItemSchema(BaseModel):
+    title: str = Field(
+        ...,
+        description="The title of the product.",
+        examples=["Coffee"]
+    )
+    lines: int = Field(
+        ...,
+        description="The number of receipt lines of the product.",
+        examples=[120]
+    )
+    quantity: int = Field(
+        ...,
+        description="The number of units sold.",
+        examples=[150]
+    )
+    revenue: Decimal = Field(
+        ...,
+        description="The sum of line totals.",
+        examples=[375.00]
+    )
+
+
+class ReceiptTopProductsResponseSchema(BaseModel):
+    order_by: Literal["revenue", "quantity"] = Field(
+        ...,
+        description="Products are ranked by revenue or by units sold.",
+        examples=["revenue"]
+    )
+    results: list[ReceiptTopProductItemSchema] = Field(
+        ...,
+        description="Best selling products of the range, best first."
+    )
+
+
+class ReceiptChangesRequestSchema(BaseModel):
+    since: str = Field(
+        "0",
+        pattern=r"^\d{1,19}(-\d{1,19})?$",
+        description="The sync token of the previous response (0 for the first sync).",
+        examples=["8841207-1042"]
+    )
+    limit: int = Field(
+        100,
+        ge=1,
+        le=1000,
+        description="The maximum number of receipts to return.",
+        examples=[100]
+    )
+
+
+class ReceiptChangesResponseSchema(BaseModel):
+    token: str = Field(
+        ...,
+        description="The sync token to send as `since` next time (the same one when nothing is new).",
+        examples=["8841395-1142"]
+    )
+    has_more: bool = Field(
+        ...,
+        description="Whether more new receipts are ready (the client should sync again right away).",
+        examples=[False]
+    )
+    results: list[ReceiptResponseSchema] = Field(
+        ...,
+        description="Receipts created after the token, in order of their transactions."
+    )
@@ -0,0 +1,85 @@
+# coding=utf-8
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+from app.settings import RECEIPT_SETTINGS
+from app.routes.negotiation import JSON, negotiated_response, render
+
+from .schema import (
+    ReceiptChangesResponseSchema,
+    ReceiptResponseSchema,
+    ReceiptsResponseSchema,
+    ReceiptStatsResponseSchema,
+    ReceiptTopProductsResponseSchema,
+)
+
+
+# Defined precompiled serializers of the hot endpoints
+RECEIPT_ADAPTER = TypeAdapter(ReceiptResponseSchema)
+RECEIPTS_ADAPTER = TypeAdapter(ReceiptsResponseSchema)
+TEXT_ADAPTER = TypeAdapter(str)
+STATS_ADAPTER = TypeAdapter(ReceiptStatsResponseSchema)
+TOP_PRODUCTS_ADAPTER = TypeAdapter(ReceiptTopProductsResponseSchema)
+CHANGES_ADAPTER = TypeAdapter(ReceiptChangesResponseSchema)
+
+
+def render_receipt(receipt: ReceiptResponseSchema | bytes, media_type: str = JSON) -> Response:
+    """
+    Serializes an already built receipt model to a response in the negotiated media type.
+    FastAPI would validate the returned value against `response_model` again
+    and encode it twice (to Python objects, then to JSON), this writes JSON once.
+    JSON assembled by Postgres (bytes) is sent as is.
+    """
+
+    if isinstance(receipt, bytes):
+        if media_type == JSON:
+            # Ready to be sent
+            return negotiated_response(receipt)
+
+        receipt = RECEIPT_ADAPTER.validate_json(receipt)
+
+    return render(RECEIPT_ADAPTER, receipt, media_type, RECEIPT_SETTINGS.binary_money)
+
+
+def render_receipts(receipts: dict | bytes, media_type: str = JSON) -> Response:
+    """
+    Serializes a page of already built receipt models to a response in the negotiated media type.
+    JSON assembled by Postgres (bytes) is sent as is.
+    """
+
+    if isinstance(receipts, bytes):
+        if media_type == JSON:
+            # Ready to be sent
+            return negotiated_response(receipts)
+
+        page = RECEIPTS_ADAPTER.validate_json(receipts)
+
+    else:
+        page = ReceiptsResponseSchema.model_construct(**receipts)
+
+    return render(RECEIPTS_ADAPTER, page, media_type, RECEIPT_SETTINGS.binary_money)
+
+
+def render_stats(stats: ReceiptStatsResponseSchema, media_type: str = JSON) -> Response:
+    """
+    Serializes already built sales statistics to a response in the negotiated media type.
+    """
+
+    return render(STATS_ADAPTER, stats, media_type, RECEIPT_SETTINGS.binary_money)
+
+
+def render_top_products(products: ReceiptTopProductsResponseSchema, media_type: str = JSON) -> Response:
+    """
+    Serializes already built best selling products to a response in the negotiated media type.
+    """
+
+    return render(TOP_PRODUCTS_ADAPTER, products, media_type, RECEIPT_SETTINGS.binary_money)
+
+
+def render_changes(changes: ReceiptChangesResponseSchema, media_type: str = JSON) -> Response:
+    """
+    Serializes already built receipt changes to a response in the negotiated media type.
+    """
+
+    return render(CHANGES_ADAPTER, changes, media_type, RECEIPT_SETTINGS.binary_money)
@@ -1,10 +1,12 @@
 # coding=utf-8
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
 
 import app.funcs.user.funcs as funcs
 from app.db import get_session
+from app.routes.negotiation import NegotiatedRoute, get_media_type, render
 
 from .schema import *
 
@@ -12,8 +14,13 @@ from .schema import *
 user_router = APIRouter(
     prefix="/users",
     tags=["users"],
+    route_class=NegotiatedRoute,
 )
 
+# Defined serializers of responses
+REGISTER_ADAPTER = TypeAdapter(UserResponseRegisterSchema)
+LOGIN_ADAPTER = TypeAdapter(UserResponseLoginSchema)
+
 
 @user_router.post(
     "/register",
@@ -21,13 +28,14 @@ user_router = APIRouter(
 )
 async def create_user(
     user: UserRequestRegisterSchema,
-    db_session: AsyncSession = Depends(get_session)
-) -> dict:
+    db_session: AsyncSession = Depends(get_session),
+    media_type: str = Depends(get_media_type),
+) -> Response:
     """
     Endpoint for user registration.
     """
 
-    return await funcs.create_user(
+    new_user = await funcs.create_user(
         db_session=db_session,
         first_name=user.first_name,
         last_name=user.last_name,
@@ -35,6 +43,8 @@ async def create_user(
         password=user.password
     )
 
+    return render(REGISTER_ADAPTER, REGISTER_ADAPTER.validate_python(new_user, from_attributes=True), media_type)
+
 
 @user_router.post(
     "/login",
@@ -42,14 +52,17 @@ async def create_user(
 )
 async def login_user(
     user: UserRequestLoginSchema,
-    db_session: AsyncSession = Depends(get_session)
-) -> dict:
+    db_session: AsyncSession = Depends(get_session),
+    media_type: str = Depends(get_media_type),
+) -> Response:
     """
     Endpoint for user sing in.
     """
 
-    return await funcs.login_user(
+    tokens = await funcs.login_user(
         db_session=db_session,
         login=user.login,
         password=user.password
     )
+
+    return render(LOGIN_ADAPTER, LOGIN_ADAPTER.validate_python(tokens), media_type)
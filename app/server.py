@@ -0,0 +1,90 @@
+# coding=utf-8
+
+import os
+import random
+import shutil
+import socket
+
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+
+from .settings import ServerSettings
+
+
+def prepare_metrics_directory() -> None:
+    """
+    Cleans the directory shared by the workers for Prometheus metrics (when multiprocess mode is on),
+    so values of workers from a previous run are not reported.
+    """
+
+    directory = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+    if not directory:
+        # Single process metrics
+        return
+
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+
+
+class RecyclingServer(uvicorn.Server):
+    """
+    Server of a worker, replaced after `limit_max_requests` plus up to `max_requests_jitter` requests
+    (drawn in each worker process, so workers started together are not all replaced at once).
+
+    Attributes:
+        max_requests_jitter (int): Maximum number of requests added at random.
+    """
+
+    def __init__(self, config: uvicorn.Config, max_requests_jitter: int):
+        super().__init__(config)
+        self.max_requests_jitter = max_requests_jitter
+
+    def run(self, sockets: list[socket.socket] | None = None) -> None:
+        if self.config.limit_max_requests:
+            # In the worker process (the server is copied to each one)
+            self.config.limit_max_requests += random.randint(0, self.max_requests_jitter)
+
+        super().run(sockets=sockets)
+
+
+def main() -> None:
+    """
+    Runs the production server.
+
+    Starts `workers` processes serving `app.main:app` with uvloop & httptools.
+    On SIGTERM, workers stop accepting connections and finish in-flight requests
+    (for at most `graceful_timeout` seconds). A worker that has served `max_requests`
+    requests (plus up to `max_requests_jitter`) exits and is replaced by a new one,
+    which limits memory growth. Database migrations are not run here, see `app.migrate`.
+    """
+
+    settings = ServerSettings.from_env()
+    prepare_metrics_directory()
+
+    config = uvicorn.Config(
+        "app.main:app",
+        host=settings.host,
+        port=settings.port,
+        workers=settings.workers,
+        loop="uvloop",
+        http="httptools",
+        limit_max_requests=settings.max_requests or None,
+        timeout_graceful_shutdown=settings.graceful_timeout,
+        timeout_keep_alive=settings.keep_alive,
+        backlog=settings.backlog,
+        proxy_headers=True,
+        access_log=False,
+    )
+    server = RecyclingServer(config, settings.max_requests_jitter)
+
+    if config.workers > 1:
+        # Same as `uvicorn.run`, with the jittered server in each worker
+        Multiprocess(config, target=server.run, sockets=[config.bind_socket()]).run()
+
+    else:
+        server.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,630 @@
+# coding=utf-8
+
+import os
+from typing import Literal
+from dataclasses import dataclass, field
+
+from .conf import DATABASE_URL
+
+
+def get_env_int(name: str, default: int) -> int:
+    """
+    Reads an integer value from the environment, falling back to the default.
+    """
+
+    value = os.getenv(name)
+
+    return int(value) if value not in (None, "") else default
+
+
+def get_env_float(name: str, default: float | None) -> float | None:
+    """
+    Reads a float value from the environment, falling back to the default.
+    """
+
+    value = os.getenv(name)
+
+    return float(value) if value not in (None, "") else default
+
+
+def get_env_bool(name: str, default: bool) -> bool:
+    """
+    Reads a boolean flag ("1", "true", "yes", "on") from the environment, falling back to the default.
+    """
+
+    value = os.getenv(name)
+
+    if value in (None, ""):
+        # Not set
+        return default
+
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def get_env_list(name: str) -> tuple[str, ...]:
+    """
+    Reads a comma-separated list of values from the environment.
+    """
+
+    value = os.getenv(name) or ""
+
+    return tuple(item.strip() for item in value.split(",") if item.strip())
+
+
+def get_env_mapping(name: str, default: dict[str, int]) -> dict[str, int]:
+    """
+    Reads a "key:value,key:value" mapping of integers from the environment, falling back to the default.
+    """
+
+    value = os.getenv(name)
+
+    if value in (None, ""):
+        # Not set
+        return dict(default)
+
+    mapping: dict[str, int] = {}
+
+    for item in value.split(","):
+        if not item.strip():
+            # Skip empty items (e.g. trailing comma)
+            continue
+
+        key, _, number = item.partition(":")
+        mapping[key.strip()] = int(number)
+
+    return mapping
+
+
+@dataclass(frozen=True)
+class DatabaseSettings:
+    """
+    Engine, pool and driver settings of the database connection.
+
+    Defaults are tuned for production; every value can be overridden with
+    the environment variable named in brackets.
+
+    Attributes:
+        url (str): Database URL of the primary (`DATABASE_*`).
+        echo (bool): Log every SQL statement, for local debugging only (`DATABASE_ECHO`).
+        pool_size (int): Connections kept open in the pool (`DATABASE_POOL_SIZE`).
+        max_overflow (int): Extra connections opened above `pool_size` under load (`DATABASE_MAX_OVERFLOW`).
+        pool_timeout (float): Seconds to wait for a free connection before failing (`DATABASE_POOL_TIMEOUT`).
+        pool_recycle (int): Seconds after which a connection is replaced, -1 disables (`DATABASE_POOL_RECYCLE`).
+        pool_pre_ping (bool): Check connections for liveness on checkout (`DATABASE_POOL_PRE_PING`).
+        prepared_statement_cache_size (int): Prepared statements cached per asyncpg connection
+            (`DATABASE_PREPARED_STATEMENT_CACHE_SIZE`).
+        command_timeout (float | None): Client-side timeout of one asyncpg command in seconds
+            (`DATABASE_COMMAND_TIMEOUT`).
+        statement_timeout (int): Server-side `statement_timeout` in milliseconds, 0 disables
+            (`DATABASE_STATEMENT_TIMEOUT`).
+        statement_timeouts (dict[str, int]): Per-endpoint `statement_timeout` overrides in milliseconds,
+            keyed by endpoint function name (`DATABASE_STATEMENT_TIMEOUTS`, e.g. "get_receipts:5000").
+        application_name (str): Name reported to Postgres in `pg_stat_activity` (`DATABASE_APPLICATION_NAME`).
+        replica_urls (tuple[str, ...]): Database URLs of read-only replicas, reads use the primary
+            when empty (`DATABASE_REPLICA_URLS`, comma-separated).
+        read_your_writes_window (float): Seconds after a write during which the same client keeps
+            reading from the primary (`DATABASE_READ_YOUR_WRITES_WINDOW`).
+    """
+
+    url: str = DATABASE_URL
+    echo: bool = False
+    pool_size: int = 10
+    max_overflow: int = 5
+    pool_timeout: float = 10.0
+    pool_recycle: int = 1800
+    pool_pre_ping: bool = True
+    prepared_statement_cache_size: int = 256
+    command_timeout: float | None = 30.0
+    statement_timeout: int = 15000
+    statement_timeouts: dict[str, int] = field(default_factory=lambda: {
+        "get_receipts": 5000,
+        "get_receipt_text": 2000,
+    })
+    application_name: str = "easycheck"
+    replica_urls: tuple[str, ...] = ()
+    read_your_writes_window: float = 5.0
+
+    @classmethod
+    def from_env(cls) -> "DatabaseSettings":
+        """
+        Builds settings from the environment, using class defaults for unset values.
+        """
+
+        defaults = cls()
+
+        return cls(
+            url=DATABASE_URL,
+            echo=get_env_bool("DATABASE_ECHO", defaults.echo),
+            pool_size=get_env_int("DATABASE_POOL_SIZE", defaults.pool_size),
+            max_overflow=get_env_int("DATABASE_MAX_OVERFLOW", defaults.max_overflow),
+            pool_timeout=get_env_float("DATABASE_POOL_TIMEOUT", defaults.pool_timeout),
+            pool_recycle=get_env_int("DATABASE_POOL_RECYCLE", defaults.pool_recycle),
+            pool_pre_ping=get_env_bool("DATABASE_POOL_PRE_PING", defaults.pool_pre_ping),
+            prepared_statement_cache_size=get_env_int(
+                "DATABASE_PREPARED_STATEMENT_CACHE_SIZE",
+                defaults.prepared_statement_cache_size,
+            ),
+            command_timeout=get_env_float("DATABASE_COMMAND_TIMEOUT", defaults.command_timeout),
+            statement_timeout=get_env_int("DATABASE_STATEMENT_TIMEOUT", defaults.statement_timeout),
+            statement_timeouts=get_env_mapping("DATABASE_STATEMENT_TIMEOUTS", defaults.statement_timeouts),
+            application_name=os.getenv("DATABASE_APPLICATION_NAME") or defaults.application_name,
+            replica_urls=get_env_list("DATABASE_REPLICA_URLS"),
+            read_your_writes_window=get_env_float(
+                "DATABASE_READ_YOUR_WRITES_WINDOW",
+                defaults.read_your_writes_window,
+            ),
+        )
+
+    def statement_timeout_for(self, endpoint: str | None) -> int | None:
+        """
+        Returns the `statement_timeout` override of the endpoint,
+        or None when the endpoint runs with the connection default.
+        """
+
+        if endpoint is None:
+            # Not called from a route
+            return None
+
+        timeout = self.statement_timeouts.get(endpoint)
+
+        if timeout is None or timeout == self.statement_timeout:
+            # Nothing to override
+            return None
+
+        return timeout
+
+
+# Defined database settings
+DB_SETTINGS = DatabaseSettings.from_env()
+
+
+@dataclass(frozen=True)
+class ReceiptSettings:
+    """
+    Settings of the receipt endpoints.
+
+    Attributes:
+        read_engine (str): How `get_receipt`/`get_receipts` build responses (`RECEIPT_READ_ENGINE`):
+            "orm" loads rows and serializes them in Python, "postgres" assembles the JSON in Postgres.
+        binary_money (str): How money is written to MessagePack/CBOR responses (`RECEIPT_BINARY_MONEY`):
+            "cents" as integer cents (e.g. 1999), "string" as decimal strings like in JSON (e.g. "19.99").
+        money_mode (str): How money is computed & read (`RECEIPT_MONEY_MODE`): "numeric" uses `Decimal`
+            arithmetic and `Numeric` columns, "cents" integer arithmetic and `BIGINT` cents columns
+            (converted to `Decimal` only in responses). Both columns are always written.
+        product_cache_size (int): Product IDs (by user & title) cached per process (`RECEIPT_PRODUCT_CACHE_SIZE`).
+        idempotency_cache_size (int): `Idempotency-Key` headers (by user) of recent receipts cached
+            per process (`RECEIPT_IDEMPOTENCY_CACHE_SIZE`).
+    """
+
+    read_engine: Literal["orm", "postgres"] = "orm"
+    binary_money: Literal["cents", "string"] = "cents"
+    money_mode: Literal["numeric", "cents"] = "numeric"
+    product_cache_size: int = 10000
+    idempotency_cache_size: int = 10000
+
+    @classmethod
+    def from_env(cls) -> "ReceiptSettings":
+        """
+        Builds settings from the environment, using class defaults for unset values.
+        """
+
+        defaults = cls()
+
+        return cls(
+            read_engine=os.getenv("RECEIPT_READ_ENGINE") or defaults.read_engine,
+            binary_money=os.getenv("RECEIPT_BINARY_MONEY") or defaults.binary_money,
+            money_mode=os.getenv("RECEIPT_MONEY_MODE") or defaults.money_mode,
+            product_cache_size=get_env_int("RECEIPT_PRODUCT_CACHE_SIZE", defaults.product_cache_size),
+            idempotency_cache_size=get_env_int("RECEIPT_IDEMPOTENCY_CACHE_SIZE", defaults.idempotency_cache_size),
+        )
+
+
+# Defined receipt settings
+RECEIPT_SETTINGS = ReceiptSettings.from_env()
+
+
+@dataclass(frozen=True)
+class PartitionSettings:
+    """
+    Settings of monthly partitions of `receipt` & `receipt_product` (see `app/partitions.py`).
+
+    Attributes:
+        maintenance (bool): Create future partitions in the background of the app (`PARTITION_MAINTENANCE`).
+        interval (float): Seconds between two maintenance runs (`PARTITION_MAINTENANCE_INTERVAL`).
+        months_ahead (int): Months created in advance, after the current one (`PARTITION_MONTHS_AHEAD`).
+        batch_size (int): Rows copied per transaction by the data migration tool (`PARTITION_BATCH_SIZE`).
+        batch_pause (float): Seconds to sleep between two batches, to spare the primary (`PARTITION_BATCH_PAUSE`).
+    """
+
+    maintenance: bool = True
+    interval: float = 86400.0
+    months_ahead: int = 3
+    batch_size: int = 10000
+    batch_pause: float = 0.0
+
+    @classmethod
+    def from_env(cls) -> "PartitionSettings":
+        """
+        Builds settings from the environment, using class defaults for unset values.
+        """
+
+        defaults = cls()
+
+        return cls(
+            maintenance=get_env_bool("PARTITION_MAINTENANCE", defaults.maintenance),
+            interval=get_env_float("PARTITION_MAINTENANCE_INTERVAL", defaults.interval),
+            months_ahead=get_env_int("PARTITION_MONTHS_AHEAD", defaults.months_ahead),
+            batch_size=get_env_int("PARTITION_BATCH_SIZE", defaults.batch_size),
+            batch_pause=get_env_float("PARTITION_BATCH_PAUSE", defaults.batch_pause),
+        )
+
+
+# Defined partition settings
+PARTITION_SETTINGS = PartitionSettings.from_env()
+
+
+@dataclass(frozen=True)
+class ArchiveSettings:
+    """
+    Settings of the cold-storage archive of old receipts (see `app/archive.py`).
+
+    Attributes:
+        directory (str): Directory of archive segments, shared by the job & the app (`ARCHIVE_DIR`).
+        retention_months (int): Receipts older than this many months are archived (`ARCHIVE_RETENTION_MONTHS`).
+        batch_size (int): Receipts per segment, moved in one transaction (`ARCHIVE_BATCH_SIZE`).
+        frame_size (int): Receipts per compressed frame, the unit read to serve one receipt (`ARCHIVE_FRAME_SIZE`).
+        level (int): zstd compression level of segments (`ARCHIVE_LEVEL`).
+    """
+
+    directory: str = "archive"
+    retention_months: int = 24
+    batch_size: int = 10000
+    frame_size: int = 100
+    level: int = 10
+
+    @classmethod
+    def from_env(cls) -> "ArchiveSettings":
+        """
+        Builds settings from the environment, using class defaults for unset values.
+        """
+
+        defaults = cls()
+
+        return cls(
+            directory=os.getenv("ARCHIVE_DIR") or defaults.directory,
+            retention_months=get_env_int("ARCHIVE_RETENTION_MONTHS", defaults.retention_months),
+            batch_size=get_env_int("ARCHIVE_BATCH_SIZE", defaults.batch_size),
+            frame_size=get_env_int("ARCHIVE_FRAME_SIZE", defaults.frame_size),
+            level=get_env_int("ARCHIVE_LEVEL", defaults.level),
+        )
+
+
+# Defined archive settings
+ARCHIVE_SETTINGS = ArchiveSettings.from_env()
+
+
+@dataclass(frozen=True)
+class CacheSettings:
+    """
+    Settings of the receipt response cache (see `app/cache.py`).
+
+    Attributes:
+        backend (str): Where responses are cached (`CACHE_BACKEND`): "memory" in an LRU of each process
+            (receipts only when `SERVER_WORKERS` is above 1), "redis" in a Redis-compatible server shared
+            by all workers, "off" (default) disables the cache.
+        max_bytes (int): Size of cached responses kept by the "memory" backend (`CACHE_MAX_BYTES`).
+        receipt_ttl (int): Seconds a receipt is cached, 0 until evicted (`CACHE_RECEIPT_TTL`).
+        list_ttl (int): Seconds a page of the list is cached, 0 until evicted (`CACHE_LIST_TTL`).
+        redis_url (str): URL of the "redis" backend (`CACHE_REDIS_URL`).
+        single_flight (bool): Identical concurrent reads of receipts, lists & texts share one computation
+            (`CACHE_SINGLE_FLIGHT`), also when responses are not cached.
+    """
+
+    backend: Literal["off", "memory", "redis"] = "off"
+    max_bytes: int = 64 * 1024 * 1024
+    receipt_ttl: int = 3600
+    list_ttl: int = 10
+    redis_url: str = "redis://localhost:6379/0"
+    single_flight: bool = True
+
+    @classmethod
+    def from_env(cls) -> "CacheSettings":
+        """
+        Builds settings from the environment, using class defaults for unset values.
+        """
+
+        defaults = cls()
+
+        return cls(
+            backend=os.getenv("CACHE_BACKEND") or defaults.backend,
+            max_bytes=get_env_int("CACHE_MAX_BYTES", defaults.max_bytes),
+            receipt_ttl=get_env_int("CACHE_RECEIPT_TTL", defaults.receipt_ttl),
+            list_ttl=get_env_int("CACHE_LIST_TTL", defaults.list_ttl),
+            redis_url=os.getenv("CACHE_REDIS_URL") or defaults.redis_url,
+            single_flight=get_env_bool("CACHE_SINGLE_FLIGHT", defaults.single_flight),
+        )
+
+
+# Defined cache settings
+CACHE_SETTINGS = CacheSettings.from_env()
+
+
+@dataclass(frozen=True)
+class FeedSettings:
+    """
+    Settings of the live feed of new receipts (`GET /receipts/feed`, see `app/funcs/receipt/feed.py`).
+
+    Attributes:
+        notify (bool): Receipts are announced to all workers & instances by Postgres `NOTIFY` (`FEED_NOTIFY`),
+            otherwise only subscribers of the worker creating a receipt receive it.
+        channel (str): The `LISTEN/NOTIFY` channel (`FEED_CHANNEL`).
+        buffer_size (int): Events buffered per connection (`FEED_BUFFER_SIZE`): a slower client is disconnected.
+        keepalive (float): Seconds between comments sent to idle connections (`FEED_KEEPALIVE`).
+        reconnect_delay (float): Seconds before listening again after the connection was lost, doubled up to
+            a minute while it keeps failing (`FEED_RECONNECT_DELAY`).
+    """
+
+    notify: bool = True
+    channel: str = "easycheck_receipts"
+    buffer_size: int = 100
+    keepalive: float = 15.0
+    reconnect_delay: float = 1.0
+
+    @classmethod
+    def from_env(cls) -> "FeedSettings":
+        """
+        Builds settings from the environment, using class defaults for unset values.
+        """
+
+        defaults = cls()
+
+        return cls(
+            notify=get_env_bool("FEED_NOTIFY", defaults.notify),
+            channel=os.getenv("FEED_CHANNEL") or defaults.channel,
+            buffer_size=get_env_int("FEED_BUFFER_SIZE", defaults.buffer_size),
+            keepalive=get_env_float("FEED_KEEPALIVE", defaults.keepalive),
+            reconnect_delay=get_env_float("FEED_RECONNECT_DELAY", defaults.reconnect_delay),
+        )
+
+
+# Defined live feed settings
+FEED_SETTINGS = FeedSettings.from_env()
+
+
+@dataclass(frozen=True)
+class OutboxSettings:
+    """
+    Settings of the outbox of receipt events for downstream systems (see `app/outbox.py`).
+
+    Attributes:
+        enabled (bool): `create_receipt` writes a "receipt.created" event with each receipt (`OUTBOX`).
+        dispatch (bool): Workers of the app deliver events in the background when sinks are configured
+            (`OUTBOX_DISPATCH`), otherwise `python -m app.outbox` does.
+        sinks (str): Comma-separated sinks every event is delivered to (`OUTBOX_SINKS`): "file", "http",
+            none by default (nothing is delivered).
+        file_path (str): JSON Lines file of the "file" sink (`OUTBOX_FILE`).
+        http_url (str): URL the "http" sink posts batches of events to (`OUTBOX_HTTP_URL`).
+        http_timeout (float): Seconds a batch may take to be accepted by the "http" sink (`OUTBOX_HTTP_TIMEOUT`).
+        batch_size (int): Events claimed & delivered at once (`OUTBOX_BATCH_SIZE`).
+        claim_timeout (float): Seconds a claimed batch is reserved for its dispatcher, longer than sending it
+            to all sinks; it's claimed again afterwards (e.g. when the dispatcher stopped) (`OUTBOX_CLAIM_TIMEOUT`).
+        poll_interval (float): Seconds between two checks of an empty outbox (`OUTBOX_POLL_INTERVAL`).
+        backoff_base (float): Seconds before the first retry of a failed batch, doubled on each further
+            failure of the event (`OUTBOX_BACKOFF_BASE`).
+        backoff_max (float): Longest delay between two retries (`OUTBOX_BACKOFF_MAX`).
+    """
+
+    enabled: bool = False
+    dispatch: bool = True
+    sinks: str = ""
+    file_path: str = "outbox/receipts.jsonl"
+    http_url: str = "http://localhost:8081/events"
+    http_timeout: float = 5.0
+    batch_size: int = 100
+    claim_timeout: float = 60.0
+    poll_interval: float = 1.0
+    backoff_base: float = 1.0
+    backoff_max: float = 300.0
+
+    @classmethod
+    def from_env(cls) -> "OutboxSettings":
+        """
+        Builds settings from the environment, using class defaults for unset values.
+        """
+
+        defaults = cls()
+
+        return cls(
+            enabled=get_env_bool("OUTBOX", defaults.enabled),
+            dispatch=get_env_bool("OUTBOX_DISPATCH", defaults.dispatch),
+            sinks=os.getenv("OUTBOX_SINKS") or defaults.sinks,
+            file_path=os.getenv("OUTBOX_FILE") or defaults.file_path,
+            http_url=os.getenv("OUTBOX_HTTP_URL") or defaults.http_url,
+            http_timeout=get_env_float("OUTBOX_HTTP_TIMEOUT", defaults.http_timeout),
+            batch_size=get_env_int("OUTBOX_BATCH_SIZE", defaults.batch_size),
+            claim_timeout=get_env_float("OUTBOX_CLAIM_TIMEOUT", defaults.claim_timeout),
+            poll_interval=get_env_float("OUTBOX_POLL_INTERVAL", defaults.poll_interval),
+            backoff_base=get_env_float("OUTBOX_BACKOFF_BASE", defaults.backoff_base),
+            backoff_max=get_env_float("OUTBOX_BACKOFF_MAX", defaults.backoff_max),
+        )
+
+
+# Defined outbox settings
+OUTBOX_SETTINGS = OutboxSettings.from_env()
+
+
+@dataclass(frozen=True)
+class CompressionSettings:
+    """
+    Settings of response compression.
+
+    Attributes:
+        enabled (bool): Compress responses for clients that accept it (`COMPRESSION`).
+        minimum_size (int): Responses smaller than this (bytes) are sent as is (`COMPRESSION_MINIMUM_SIZE`).
+        offload_size (int): Bodies (or chunks) larger than this (bytes) are compressed in a worker
+            thread, so the event loop is not blocked (`COMPRESSION_OFFLOAD_SIZE`).
+        gzip_level (int): Default gzip level, 1-9 (`COMPRESSION_GZIP_LEVEL`).
+        brotli_level (int): Default brotli quality, 0-11 (`COMPRESSION_BROTLI_LEVEL`).
+        zstd_level (int): Default zstd level, 1-22 (`COMPRESSION_ZSTD_LEVEL`).
+        route_levels (dict[str, int]): Per-route levels, keyed by route path (`COMPRESSION_ROUTE_LEVELS`,
+            e.g. "/receipts/:9"). The level is used for any codec, limited to the codec's range.
+    """
+
+    enabled: bool = True
+    minimum_size: int = 1024
+    offload_size: int = 256 * 1024
+    gzip_level: int = 6
+    brotli_level: int = 4
+    zstd_level: int = 3
+    route_levels: dict[str, int] = field(default_factory=dict)
+
+    @classmethod
+    def from_env(cls) -> "CompressionSettings":
+        """
+        Builds settings from the environment, using class defaults for unset values.
+        """
+
+        defaults = cls()
+
+        return cls(
+            enabled=get_env_bool("COMPRESSION", defaults.enabled),
+            minimum_size=get_env_int("COMPRESSION_MINIMUM_SIZE", defaults.minimum_size),
+            offload_size=get_env_int("COMPRESSION_OFFLOAD_SIZE", defaults.offload_size),
+            gzip_level=get_env_int("COMPRESSION_GZIP_LEVEL", defaults.gzip_level),
+            brotli_level=get_env_int("COMPRESSION_BROTLI_LEVEL", defaults.brotli_level),
+            zstd_level=get_env_int("COMPRESSION_ZSTD_LEVEL", defaults.zstd_level),
+            route_levels=get_env_mapping("COMPRESSION_ROUTE_LEVELS", defaults.route_levels),
+        )
+
+
+# Defined compression settings
+COMPRESSION_SETTINGS = CompressionSettings.from_env()
+
+
+@dataclass(frozen=True)
+class ProfilingSettings:
+    """
+    Settings of the opt-in per-request profiler.
+
+    Attributes:
+        token (str | None): Secret that enables profiling of a request sent with it
+            in the `header` header, profiling on demand is off when not set (`PROFILE_TOKEN`).
+        header (str): Name of the header carrying the token (`PROFILE_HEADER`).
+        sample_rate (float): Share of all requests (0-1) profiled at random (`PROFILE_SAMPLE_RATE`).
+        directory (str): Directory where profiles are saved (`PROFILE_DIR`).
+    """
+
+    token: str | None = None
+    header: str = "x-profile"
+    sample_rate: float = 0.0
+    directory: str = "profiles"
+
+    @classmethod
+    def from_env(cls) -> "ProfilingSettings":
+        """
+        Builds settings from the environment, using class defaults for unset values.
+        """
+
+        defaults = cls()
+
+        return cls(
+            token=os.getenv("PROFILE_TOKEN") or None,
+            header=(os.getenv("PROFILE_HEADER") or defaults.header).lower(),
+            sample_rate=get_env_float("PROFILE_SAMPLE_RATE", defaults.sample_rate),
+            directory=os.getenv("PROFILE_DIR") or defaults.directory,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        """
+        Whether any request can be profiled at all.
+        """
+
+        return self.token is not None or self.sample_rate > 0
+
+
+# Defined profiling settings
+PROFILING_SETTINGS = ProfilingSettings.from_env()
+
+
+@dataclass(frozen=True)
+class WatchdogSettings:
+    """
+    Settings of the event-loop blocking detector.
+
+    Attributes:
+        enabled (bool): Run the watchdog (`LOOP_WATCHDOG`).
+        interval (float): Seconds between two heartbeats of the loop (`LOOP_WATCHDOG_INTERVAL`).
+        threshold (float): Seconds the loop may be blocked before it is reported (`LOOP_WATCHDOG_THRESHOLD`).
+        max_samples (int): Stack samples taken during one blocked period (`LOOP_WATCHDOG_MAX_SAMPLES`).
+    """
+
+    enabled: bool = False
+    interval: float = 0.05
+    threshold: float = 0.1
+    max_samples: int = 10
+
+    @classmethod
+    def from_env(cls) -> "WatchdogSettings":
+        """
+        Builds settings from the environment, using class defaults for unset values.
+        """
+
+        defaults = cls()
+
+        return cls(
+            enabled=get_env_bool("LOOP_WATCHDOG", defaults.enabled),
+            interval=get_env_float("LOOP_WATCHDOG_INTERVAL", defaults.interval),
+            threshold=get_env_float("LOOP_WATCHDOG_THRESHOLD", defaults.threshold),
+            max_samples=get_env_int("LOOP_WATCHDOG_MAX_SAMPLES", defaults.max_samples),
+        )
+
+
+# Defined watchdog settings
+WATCHDOG_SETTINGS = WatchdogSettings.from_env()
+
+
+@dataclass(frozen=True)
+class ServerSettings:
+    """
+    Settings of the production server launcher.
+
+    Attributes:
+        host (str): Interface to bind (`SERVER_HOST`).
+        port (int): Port to bind (`SERVER_PORT`).
+        workers (int): Number of worker processes, one per CPU core by default (`SERVER_WORKERS`).
+        max_requests (int): Requests served by a worker before it is replaced, 0 disables (`SERVER_MAX_REQUESTS`).
+        max_requests_jitter (int): Up to this many requests are added to `max_requests` at random for each worker
+            (`SERVER_MAX_REQUESTS_JITTER`), so workers started together are not all replaced at once.
+        graceful_timeout (int): Seconds given to in-flight requests to finish on SIGTERM (`SERVER_GRACEFUL_TIMEOUT`).
+        keep_alive (int): Seconds an idle keep-alive connection is kept open (`SERVER_KEEP_ALIVE`).
+        backlog (int): Maximum number of pending connections (`SERVER_BACKLOG`).
+    """
+
+    host: str = "0.0.0.0"
+    port: int = 80
+    workers: int = field(default_factory=lambda: os.cpu_count() or 1)
+    max_requests: int = 10000
+    max_requests_jitter: int = 1000
+    graceful_timeout: int = 30
+    keep_alive: int = 5
+    backlog: int = 2048
+
+    @classmethod
+    def from_env(cls) -> "ServerSettings":
+        """
+        Builds settings from the environment, using class defaults for unset values.
+        """
+
+        defaults = cls()
+
+        return cls(
+            host=os.getenv("SERVER_HOST") or defaults.host,
+            port=get_env_int("SERVER_PORT", defaults.port),
+            workers=get_env_int("SERVER_WORKERS", defaults.workers),
+            max_requests=get_env_int("SERVER_MAX_REQUESTS", defaults.max_requests),
+            max_requests_jitter=get_env_int("SERVER_MAX_REQUESTS_JITTER", defaults.max_requests_jitter),
+            graceful_timeout=get_env_int("SERVER_GRACEFUL_TIMEOUT", defaults.graceful_timeout),
+            keep_alive=get_env_int("SERVER_KEEP_ALIVE", defaults.keep_alive),
+            backlog=get_env_int("SERVER_BACKLOG", defaults.backlog),
+        )
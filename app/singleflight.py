@@ -0,0 +1,72 @@
+# coding=utf-8
+
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+from .metrics import COALESCED_REQUESTS
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls: while a call with a key is in flight, callers with
+    the same key await its result (or its exception) instead of running their own.
+
+    The first caller runs the call itself (with its own database session), so nothing outlives
+    its request. If it's cancelled (e.g. the client went away), waiting callers don't fail:
+    the next of them runs the call again.
+
+    Attributes:
+        name (str): The value of the "operation" label of metrics.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.flights: dict[Hashable, asyncio.Future] = {}
+
+    async def run(self, key: Hashable, function: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Returns the result of `function()`, shared by all concurrent callers of the key.
+
+        Args:
+            key (Hashable): Identifies equal calls (everything the result depends on).
+            function (Callable[[], Awaitable[Any]]): Runs the call (only by the first caller).
+
+        Returns:
+            Any: The result (the same object for all callers, it must not be changed).
+        """
+
+        while (flight := self.flights.get(key)) is not None:
+            COALESCED_REQUESTS.labels(self.name).inc()
+
+            try:
+                return await asyncio.shield(flight)
+
+            except asyncio.CancelledError:
+                if flight.cancelled() and not asyncio.current_task().cancelling():
+                    # The first caller was cancelled, not this one
+                    continue
+
+                raise
+
+        flight = asyncio.get_running_loop().create_future()
+        # Exceptions nobody waited for are not reported as "never retrieved"
+        flight.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self.flights[key] = flight
+
+        try:
+            result = await function()
+
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+
+        except BaseException as error:
+            flight.set_exception(error)
+            raise
+
+        else:
+            flight.set_result(result)
+            return result
+
+        finally:
+            del self.flights[key]
@@ -10,7 +10,7 @@ from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, Asyn
 from httpx import ASGITransport, AsyncClient
 
 from app.main import app
-from app.db import Base, get_session
+from app.db import Base, get_session, get_read_session
 from app.conf import TEST_DATABASE_URL
 
 
@@ -77,6 +77,7 @@ async def override_get_session(db_session):
             yield session
 
     app.dependency_overrides[get_session] = get_test_db  # noqa
+    app.dependency_overrides[get_read_session] = get_test_db  # noqa
     yield
     app.dependency_overrides.clear()  # noqa
 
@@ -0,0 +1,80 @@
+# coding=utf-8
+
+import os
+from datetime import datetime
+
+from sqlalchemy import update
+from sqlalchemy.future import select
+
+from app.archive import RECEIPT_ARCHIVE, get_cutoff
+from app.cache import RESPONSE_CACHE
+from app.models import Receipt, ReceiptProduct
+
+from ..base import *
+from .get_receipts import register_and_login
+
+
+@pytest.mark.asyncio
+async def test_archived_receipts_are_read_transparently(
+    client: AsyncClient,
+    db_session: AsyncSession,
+    tmp_path,
+    monkeypatch,
+):
+    """
+    Tests that receipts moved to the archive are returned like receipts of the hot tables.
+    """
+
+    monkeypatch.setattr(RECEIPT_ARCHIVE, "directory", str(tmp_path))
+
+    auth_headers = await register_and_login(client)
+    receipt_data = {
+        "products": [
+            {"title": "Coffee", "price": 2.50, "quantity": 2},
+            {"title": "Croissant", "price": 1.85, "quantity": 3},
+        ],
+        "payment": {"type": "card", "amount": 10.55},
+    }
+
+    receipt_ids = []
+
+    for _ in range(3):
+        response = await client.post("/receipts/", json=receipt_data, headers=auth_headers)
+        assert response.status_code == 200, f"Receipt creation failed: {response.json()}"
+        receipt_ids.append(response.json()["id"])
+
+    receipt = (await client.get(f"/receipts/{receipt_ids[0]}", headers=auth_headers)).json()
+    receipt_text = (await client.get(f"/receipts/{receipt_ids[0]}/text", params={"width": 40})).json()
+
+    # Two receipts are old enough
+    created_at = datetime(2020, 1, 15, 12, 30)
+    await db_session.execute(update(Receipt).where(Receipt.id.in_(receipt_ids[:2])).values(created_at=created_at))
+    await db_session.execute(
+        update(ReceiptProduct).where(ReceiptProduct.receipt_id.in_(receipt_ids[:2])).values(receipt_created_at=created_at)
+    )
+    await db_session.commit()
+    await RESPONSE_CACHE.clear()
+
+    async with TEST_ENGINE.connect() as connection:
+        assert await connection.run_sync(RECEIPT_ARCHIVE.archive, get_cutoff(24)) == 2
+
+    assert len(os.listdir(tmp_path)) == 1, "One segment must be written!"
+    assert await db_session.scalar(select(Receipt.id).where(Receipt.id.in_(receipt_ids[:2]))) is None
+
+    response = await client.get(f"/receipts/{receipt_ids[0]}", headers=auth_headers)
+    assert response.status_code == 200, f"Failed to retrieve archived receipt: {response.json()}"
+    assert response.json() == {**receipt, "created_at": created_at.isoformat()}
+
+    response = await client.get(f"/receipts/{receipt_ids[0]}/text", params={"width": 40})
+    assert response.status_code == 200, f"Failed to retrieve archived receipt text: {response.json()}"
+    printed_at = datetime.fromisoformat(receipt["created_at"]).strftime("%d.%m.%Y %H:%M")
+    assert response.json() == receipt_text.replace(printed_at, "15.01.2020 12:30"), \
+        "Archived receipts must be printed the same way!"
+
+    # Owner only
+    response = await client.get(f"/receipts/{receipt_ids[0]}", headers=await register_and_login(client))
+    assert response.status_code == 404
+
+    # Hot receipts are not touched
+    response = await client.get(f"/receipts/{receipt_ids[2]}", headers=auth_headers)
+    assert response.status_code == 200
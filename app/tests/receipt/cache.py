@@ -0,0 +1,192 @@
+# coding=utf-8
+
+import asyncio
+from dataclasses import replace
+
+from prometheus_client import REGISTRY
+from sqlalchemy import event
+
+import app.funcs.receipt.funcs as funcs
+from app.cache import MemoryCache, RESPONSE_CACHE, ResponseCache
+from app.settings import CACHE_SETTINGS
+
+from ..base import *
+from .get_receipts import register_and_login
+
+
+# Defined receipt of the tests
+RECEIPT_DATA = {
+    "products": [{"title": "Coffee", "price": 2.50, "quantity": 2}],
+    "payment": {"type": "cash", "amount": 10},
+}
+
+
+@pytest.mark.asyncio
+async def test_memory_cache():
+    """
+    Tests size-based LRU eviction, expiry and counters of the in-process backend.
+    """
+
+    cache = MemoryCache(max_bytes=10)
+
+    await cache.set("a", b"aaaa")
+    await cache.set("b", b"bbbb")
+    assert await cache.get("a") == b"aaaa"
+
+    # "b" is the least recently used
+    await cache.set("c", b"cccc")
+    assert await cache.get("b") is None
+    assert await cache.get("a") == b"aaaa" and await cache.get("c") == b"cccc"
+    assert cache.size == 8
+
+    await cache.set("big", b"x" * 11)
+    assert await cache.get("big") is None and cache.size == 8, "Values above the size must not be cached!"
+
+    await cache.set("short", b"s", ttl=0.01)
+    await asyncio.sleep(0.02)
+    assert await cache.get("short") is None, "Expired values must not be returned!"
+
+    assert await cache.get_counter("generation:1") == 0
+    assert await cache.incr("generation:1") == 1
+    await cache.clear()
+    assert cache.size == 0 and await cache.get("a") is None
+
+
+def use_memory_cache(monkeypatch, workers: int) -> None:
+    """
+    Switches the response cache of the app to a new memory backend, as in a server with `workers` processes.
+    """
+
+    monkeypatch.setattr(RESPONSE_CACHE, "settings", replace(CACHE_SETTINGS, backend="memory"))
+    monkeypatch.setattr(RESPONSE_CACHE, "backend", MemoryCache(CACHE_SETTINGS.max_bytes))
+    monkeypatch.setattr(RESPONSE_CACHE, "workers", workers)
+
+
+@pytest.mark.asyncio
+async def test_cached_responses(client: AsyncClient, db_session: AsyncSession, monkeypatch):
+    """
+    Tests that receipts & pages of the list are served from the cache, and pages are invalidated by new receipts.
+    """
+
+    use_memory_cache(monkeypatch, workers=1)
+    calls = {"get_receipt": 0, "get_receipts": 0}
+
+    for name in calls:
+        def counted(function, name=name):
+            async def wrapper(**kwargs):
+                calls[name] += 1
+                return await function(**kwargs)
+
+            return wrapper
+
+        monkeypatch.setattr(funcs, name, counted(getattr(funcs, name)))
+
+    auth_headers = await register_and_login(client)
+    response = await client.post("/receipts/", json=RECEIPT_DATA, headers=auth_headers)
+    assert response.status_code == 200, f"Receipt creation failed: {response.json()}"
+    receipt = response.json()
+
+    def hits(cache: str) -> float:
+        return REGISTRY.get_sample_value("easycheck_cache_requests_total", {"cache": cache, "result": "hit"}) or 0
+
+    # Receipt
+    hits_before = hits("receipt")
+    calls["get_receipt"] = 0
+
+    for _ in range(3):
+        response = await client.get(f"/receipts/{receipt['id']}", headers=auth_headers)
+        assert response.status_code == 200 and response.json() == receipt
+        assert response.headers["vary"] == "Accept", "Cached JSON must vary with Accept too!"
+
+    assert calls["get_receipt"] == 1, "Receipt must be read from the database once!"
+    assert hits("receipt") == hits_before + 2
+
+    response = await client.get(f"/receipts/{receipt['id']}", headers={**auth_headers, "Accept": "application/msgpack"})
+    assert response.status_code == 200 and response.headers["content-type"] == "application/msgpack"
+
+    # Other users don't get it from the cache
+    response = await client.get(f"/receipts/{receipt['id']}", headers=await register_and_login(client))
+    assert response.status_code == 404
+
+    # Pages of the list (equal filters share the page)
+    for params in ({"total": "5", "aggregates": "sum,avg"}, {"total": "5.00", "aggregates": "avg,sum"}):
+        response = await client.get("/receipts/", params=params, headers=auth_headers)
+        assert response.status_code == 200 and response.json()["total"] == 1
+
+    assert calls["get_receipts"] == 1, "Page must be read from the database once!"
+
+    # New receipts start a new generation
+    response = await client.post("/receipts/", json=RECEIPT_DATA, headers=auth_headers)
+    assert response.status_code == 200, f"Receipt creation failed: {response.json()}"
+
+    response = await client.get("/receipts/", params={"total": "5"}, headers=auth_headers)
+    assert response.json()["total"] == 2, "Pages cached before a new receipt must not be returned!"
+    assert calls["get_receipts"] == 2
+    assert REGISTRY.get_sample_value("easycheck_cache_hit_ratio", {"cache": "receipts"}) is not None
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_workers(client: AsyncClient, db_session: AsyncSession, monkeypatch):
+    """
+    Tests that with several workers the memory backend caches receipts but not pages of the list,
+    which other workers couldn't invalidate.
+    """
+
+    assert not ResponseCache(replace(CACHE_SETTINGS, backend="memory"), workers=4).lists_enabled
+    assert ResponseCache(replace(CACHE_SETTINGS, backend="memory"), workers=1).lists_enabled
+    assert not ResponseCache(replace(CACHE_SETTINGS, backend="off"), workers=1).lists_enabled
+
+    use_memory_cache(monkeypatch, workers=4)
+    calls = {"get_receipt": 0, "get_receipts": 0}
+
+    for name in calls:
+        def counted(function, name=name):
+            async def wrapper(**kwargs):
+                calls[name] += 1
+                return await function(**kwargs)
+
+            return wrapper
+
+        monkeypatch.setattr(funcs, name, counted(getattr(funcs, name)))
+
+    auth_headers = await register_and_login(client)
+    response = await client.post("/receipts/", json=RECEIPT_DATA, headers=auth_headers)
+    assert response.status_code == 200, f"Receipt creation failed: {response.json()}"
+    receipt_id = response.json()["id"]
+    calls["get_receipt"] = 0
+
+    for _ in range(2):
+        assert (await client.get(f"/receipts/{receipt_id}", headers=auth_headers)).status_code == 200
+        assert (await client.get("/receipts/", headers=auth_headers)).json()["total"] == 1
+
+    assert calls["get_receipt"] == 1, "Receipts must be cached!"
+    assert calls["get_receipts"] == 2, "Pages must be read from the database with several workers!"
+
+
+@pytest.mark.asyncio
+async def test_cached_lists_read_primary(client: AsyncClient, db_session: AsyncSession, monkeypatch):
+    """
+    Tests that pages are read from the primary when they are cached (a lagging replica would cache
+    a page without the new receipt under its new generation), and from replicas otherwise.
+    """
+
+    replica_reads = []
+
+    async def get_replica_session():
+        async with TestingSessionLocal() as session:
+            # Counted when queried, sessions of both kinds are opened for every page
+            event.listen(session.sync_session, "after_begin", lambda *args: replica_reads.append(1))
+            yield session
+
+    monkeypatch.setitem(app.dependency_overrides, get_read_session, get_replica_session)
+    auth_headers = await register_and_login(client)
+
+    use_memory_cache(monkeypatch, workers=1)
+    response = await client.get("/receipts/", params={"on_page": 3}, headers=auth_headers)
+    assert response.status_code == 200
+    assert replica_reads == [], "Cached pages must be read from the primary!"
+
+    use_memory_cache(monkeypatch, workers=4)
+    response = await client.get("/receipts/", params={"on_page": 3}, headers=auth_headers)
+    assert response.status_code == 200
+    assert replica_reads == [1], "Pages which are not cached must be read from replicas!"
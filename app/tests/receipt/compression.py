@@ -0,0 +1,84 @@
+# coding=utf-8
+
+import gzip
+
+import brotli
+import zstandard
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse, PlainTextResponse
+
+from app.compression import CompressionMiddleware, choose_codec
+from app.settings import CompressionSettings
+
+from ..base import *
+
+
+# Defined app with compressed responses
+compressed_app = FastAPI()
+compressed_app.add_middleware(CompressionMiddleware, settings=CompressionSettings(minimum_size=100))
+
+BODY = "receipt line\n" * 100
+
+
+@compressed_app.get("/text")
+async def get_text():
+    return PlainTextResponse(BODY)
+
+
+@compressed_app.get("/small")
+async def get_small():
+    return PlainTextResponse("small")
+
+
+@compressed_app.get("/stream")
+async def get_stream():
+    async def lines():
+        for _ in range(100):
+            yield "receipt line\n"
+
+    return StreamingResponse(lines(), media_type="text/plain")
+
+
+def test_choose_codec():
+    """
+    Tests negotiation of the content coding by `Accept-Encoding`.
+    """
+
+    assert choose_codec("gzip, deflate, br, zstd") == "zstd"
+    assert choose_codec("gzip, br") == "br"
+    assert choose_codec("gzip;q=1.0, br;q=0.5") == "gzip"
+    assert choose_codec("zstd;q=0, gzip") == "gzip"
+    assert choose_codec("*") == "zstd"
+    assert choose_codec("identity") is None
+    assert choose_codec("") is None
+
+
+@pytest.mark.asyncio
+async def test_compressed_responses():
+    """
+    Tests that whole & streaming responses are compressed as negotiated, small ones are sent as is.
+    """
+
+    decompress = {
+        "gzip": gzip.decompress,
+        "br": brotli.decompress,
+        "zstd": lambda data: zstandard.ZstdDecompressor().decompressobj().decompress(data),
+    }
+
+    async with AsyncClient(transport=ASGITransport(app=compressed_app), base_url="http://test") as client:
+        for codec, func in decompress.items():
+            for path in ("/text", "/stream"):
+                async with client.stream("GET", path, headers={"Accept-Encoding": codec}) as response:
+                    raw = b"".join([chunk async for chunk in response.aiter_raw()])
+
+                assert response.headers["content-encoding"] == codec
+                assert response.headers["vary"] == "Accept-Encoding"
+                assert func(raw).decode() == BODY, f"{codec} body of {path} differs!"
+
+        response = await client.get("/small", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+        assert response.text == "small"
+
+        response = await client.get("/text", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in response.headers
+        assert response.text == BODY
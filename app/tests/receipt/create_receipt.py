@@ -1,5 +1,7 @@
 # coding=utf-8
 
+from decimal import Decimal
+
 from app.models import Receipt
 
 from ..base import *
@@ -64,3 +66,8 @@ async def test_create_receipt(client: AsyncClient, db_session: AsyncSession, rec
         # Retrieve the receipt from the database
         db_receipt: Receipt | None = await db_session.get(Receipt, receipt_id)
         assert db_receipt is not None, f"Receipt with ID {receipt_id} was not found in the database!"
+
+        # Stored aggregates
+        assert db_receipt.item_count == len(receipt_data["products"]), "Item count must be stored!"
+        assert db_receipt.unit_count == sum(product["quantity"] for product in receipt_data["products"])
+        assert db_receipt.total_cents == int(Decimal(json_response["total"]) * 100), "Total in cents must be stored!"
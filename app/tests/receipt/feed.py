@@ -0,0 +1,172 @@
+# coding=utf-8
+
+import asyncio
+import json
+
+from sqlalchemy import func, select, text
+
+from app.models import Receipt
+from app.funcs.receipt.feed import INSTANCE_ID, RECEIPT_FEED, FeedBridge
+from app.pubsub import PubSub
+from app.settings import FEED_SETTINGS
+
+from ..base import *
+from .get_receipts import register_and_login
+
+
+# Defined receipt of the tests
+RECEIPT_DATA = {"products": [{"title": "Coffee", "price": 2.50, "quantity": 2}], "payment": {"type": "cash", "amount": 10}}
+
+
+def parse_event(event: bytes) -> dict:
+    """
+    Returns fields of a Server-Sent Event.
+    """
+
+    return dict(line.split(": ", 1) for line in event.decode().strip().split("\n"))
+
+
+async def open_feed(headers: dict) -> tuple[asyncio.Task, asyncio.Queue, asyncio.Event]:
+    """
+    Calls `GET /receipts/feed` on the app directly (the test client reads whole responses only)
+    and returns the running request, its sent messages & the event disconnecting the client.
+    """
+
+    messages = asyncio.Queue()
+    disconnected = asyncio.Event()
+
+    async def receive():
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/receipts/feed",
+        "raw_path": b"/receipts/feed",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+        "client": ("test", 1),
+        "server": ("test", 80),
+    }
+
+    return asyncio.create_task(app(scope, receive, messages.put)), messages, disconnected
+
+
+@pytest.mark.asyncio
+async def test_pubsub():
+    """
+    Tests delivery of messages by topic, and that a subscriber with a full buffer is closed without affecting others.
+    """
+
+    pubsub = PubSub("test", buffer_size=2)
+    slow, fast, other = pubsub.subscribe(1), pubsub.subscribe(1), pubsub.subscribe(2)
+
+    assert pubsub.publish(1, b"a") == 2
+    assert await fast.get() == b"a"
+    assert pubsub.publish(1, b"b") == 2
+    assert await fast.get() == b"b"
+
+    # Third message of the slow subscriber
+    assert pubsub.publish(1, b"c") == 1
+    assert slow.overflowed and await slow.get() is None
+    assert await fast.get() == b"c" and not fast.overflowed
+    assert other.queue.empty()
+
+    pubsub.unsubscribe(slow)
+    pubsub.unsubscribe(fast)
+    assert not pubsub.has_subscribers(1) and pubsub.has_subscribers(2)
+    assert pubsub.publish(1, b"d") == 0
+
+
+@pytest.mark.asyncio
+async def test_receipt_feed(client: AsyncClient, db_session: AsyncSession):
+    """
+    Tests that new receipts of the user (only) are streamed as Server-Sent Events until the client goes away.
+    """
+
+    auth_headers = await register_and_login(client)
+    subscribed = set(RECEIPT_FEED.subscriptions)
+
+    request, messages, disconnected = await open_feed(auth_headers)
+    start = await asyncio.wait_for(messages.get(), 5)
+    assert start["status"] == 200
+    assert dict(start["headers"])[b"content-type"].startswith(b"text/event-stream")
+    assert (await asyncio.wait_for(messages.get(), 5))["body"] == b"retry: %d\n\n" % int(FEED_SETTINGS.reconnect_delay * 1000)
+
+    (user_id,) = set(RECEIPT_FEED.subscriptions) - subscribed
+
+    response = await client.post("/receipts/", json=RECEIPT_DATA, headers=auth_headers)
+    assert response.status_code == 200, f"Receipt creation failed: {response.json()}"
+
+    event = parse_event((await asyncio.wait_for(messages.get(), 5))["body"])
+    assert event["id"] == str(response.json()["id"]) and event["event"] == "receipt"
+    assert json.loads(event["data"]) == response.json()
+
+    # Receipts of other users are not streamed
+    response = await client.post("/receipts/", json=RECEIPT_DATA, headers=await register_and_login(client))
+    assert response.status_code == 200
+    await asyncio.sleep(0.1)
+    assert messages.empty()
+
+    disconnected.set()
+    await asyncio.wait_for(request, 5)
+    assert not RECEIPT_FEED.has_subscribers(user_id)
+
+
+@pytest.mark.asyncio
+async def test_feed_bridge(client: AsyncClient, db_session: AsyncSession):
+    """
+    Tests that receipts announced by other workers (NOTIFY) are loaded & published to subscribers of this one.
+    """
+
+    auth_headers = await register_and_login(client)
+    response = await client.post("/receipts/", json=RECEIPT_DATA, headers=auth_headers)
+    assert response.status_code == 200, f"Receipt creation failed: {response.json()}"
+    receipt = response.json()
+
+    user_id = await db_session.scalar(select(Receipt.user_id).where(Receipt.id == receipt["id"]))
+    subscription = RECEIPT_FEED.subscribe(user_id)
+    bridge = FeedBridge(TEST_ENGINE)
+
+    try:
+        await bridge.start()
+        await asyncio.wait_for(bridge.listening.wait(), 5)
+
+        for instance in (INSTANCE_ID, "other worker"):
+            payload = json.dumps({"user_id": user_id, "id": receipt["id"], "instance": instance})
+            await db_session.execute(select(func.pg_notify(FEED_SETTINGS.channel, payload)))
+            await db_session.commit()
+
+        event = parse_event(await asyncio.wait_for(subscription.get(), 5))
+        assert event["id"] == str(receipt["id"])
+        assert json.loads(event["data"]) == receipt
+
+        # Own notifications are skipped (published by this process already)
+        await asyncio.sleep(0.1)
+        assert subscription.queue.empty()
+
+        # Listens again once the connection is lost
+        await db_session.execute(text(
+            "SELECT pg_terminate_backend(pid) FROM pg_stat_activity WHERE query LIKE :query AND pid <> pg_backend_pid()"
+        ), {"query": f"LISTEN%{FEED_SETTINGS.channel}%"})
+        await db_session.commit()
+
+        for _ in range(100):
+            if not bridge.listening.is_set():
+                break
+
+            await asyncio.sleep(0.05)
+
+        await asyncio.wait_for(bridge.listening.wait(), 10)
+        await db_session.execute(select(func.pg_notify(FEED_SETTINGS.channel, payload)))
+        await db_session.commit()
+        assert parse_event(await asyncio.wait_for(subscription.get(), 5))["id"] == str(receipt["id"])
+
+    finally:
+        RECEIPT_FEED.unsubscribe(subscription)
+        await bridge.stop()
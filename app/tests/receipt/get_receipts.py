@@ -0,0 +1,125 @@
+# coding=utf-8
+
+from decimal import Decimal
+
+from ..base import *
+from .cases import RECEIPT_CREATION_TEST_CASES
+
+
+async def register_and_login(client: AsyncClient) -> dict:
+    """
+    Registers a new user, logs in and returns authorization headers.
+    """
+
+    user_data = {
+        "first_name": "Test",
+        "last_name": "User",
+        "login": generate_random_username(),
+        "password": "TestPassword123!"
+    }
+
+    reg_response = await client.post("/users/register", json=user_data)
+    assert reg_response.status_code == 200, f"User registration failed: {reg_response.json()}"
+
+    login_response = await client.post("/users/login", json={
+        "login": user_data["login"],
+        "password": user_data["password"]
+    })
+    assert login_response.status_code == 200, f"User login failed: {login_response.json()}"
+
+    return {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+
+
+@pytest.mark.asyncio
+async def test_get_receipts(client: AsyncClient, db_session: AsyncSession):
+    """
+    Tests the receipt list: pagination, filters, and that list items equal the created receipts.
+    """
+
+    auth_headers = await register_and_login(client)
+
+    # Create receipts
+    created = []
+
+    for receipt_data in RECEIPT_CREATION_TEST_CASES:
+        if receipt_data["expected_status"] != 200:
+            # Skip invalid cases
+            continue
+
+        response = await client.post(
+            "/receipts/",
+            json={"products": receipt_data["products"], "payment": receipt_data["payment"]},
+            headers=auth_headers
+        )
+        assert response.status_code == 200, f"Receipt creation failed: {response.json()}"
+        created.append(response.json())
+
+    # First page
+    response = await client.get("/receipts/", params={"on_page": 1}, headers=auth_headers)
+    assert response.status_code == 200, f"Failed to retrieve receipts: {response.json()}"
+
+    json_response = response.json()
+    assert json_response["total"] == len(created), "Total must count all receipts of the user!"
+    assert json_response["next_page"] == 1, "Next page must be set while receipts are left!"
+    assert json_response["results"] == [created[0]], "List item must equal the created receipt!"
+
+    # Last page
+    response = await client.get("/receipts/", params={"on_page": 1, "page": 1}, headers=auth_headers)
+    json_response = response.json()
+    assert json_response["next_page"] is None, "Next page must be null on the last page!"
+    assert json_response["results"] == [created[1]], "List item must equal the created receipt!"
+
+    # Filter by payment type
+    response = await client.get("/receipts/", params={"payment_type": "card"}, headers=auth_headers)
+    json_response = response.json()
+    assert json_response["total"] == 1, "Only card receipts must be returned!"
+    assert all(receipt["payment"]["type"] == "card" for receipt in json_response["results"])
+
+    # Filter by total
+    response = await client.get("/receipts/", params={"total": 100}, headers=auth_headers)
+    json_response = response.json()
+    assert [receipt["id"] for receipt in json_response["results"]] == [created[0]["id"]], (
+        "Only receipts with total above the filter must be returned!"
+    )
+
+    # Aggregates of all filtered receipts, not of the page
+    response = await client.get(
+        "/receipts/",
+        params={"on_page": 1, "aggregates": "sum,avg,by_payment_type"},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200, f"Failed to retrieve receipts: {response.json()}"
+
+    totals = {payment_type: [
+        Decimal(receipt["total"]) for receipt in created if receipt["payment"]["type"] == payment_type
+    ] for payment_type in ("cash", "card")}
+    aggregates = response.json()["aggregates"]
+    assert Decimal(aggregates["sum"]) == sum(totals["cash"] + totals["card"])
+    assert Decimal(aggregates["avg"]) == round(sum(totals["cash"] + totals["card"]) / len(created), 2)
+    assert {
+        payment_type: (item["receipts"], Decimal(item["sum"]))
+        for payment_type, item in aggregates["by_payment_type"].items()
+    } == {payment_type: (len(values), sum(values)) for payment_type, values in totals.items()}
+
+    response = await client.get("/receipts/", params={"aggregates": "sum", "payment_type": "card"}, headers=auth_headers)
+    aggregates = response.json()["aggregates"]
+    assert Decimal(aggregates["sum"]) == sum(totals["card"]), "Aggregates must be of filtered receipts!"
+    assert aggregates["avg"] is None and aggregates["by_payment_type"] is None, "Only requested aggregates must be set!"
+
+    # Empty sums are amounts too
+    response = await client.get(
+        "/receipts/",
+        params={"aggregates": "sum,by_payment_type", "payment_type": "card"},
+        headers=auth_headers,
+    )
+    assert response.json()["aggregates"]["by_payment_type"]["cash"] == {"receipts": 0, "sum": "0.00"}
+
+    response = await client.get("/receipts/", params={"aggregates": "sum", "total": 1000000}, headers=auth_headers)
+    assert response.json()["aggregates"]["sum"] == "0.00", "Sum of no receipts must be 0.00!"
+
+    # Not requested
+    response = await client.get("/receipts/", headers=auth_headers)
+    assert response.json()["aggregates"] is None
+
+    response = await client.get("/receipts/", params={"aggregates": "median"}, headers=auth_headers)
+    assert response.status_code == 422, "Unknown aggregates must be rejected!"
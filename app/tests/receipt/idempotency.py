@@ -0,0 +1,138 @@
+# coding=utf-8
+
+import asyncio
+from dataclasses import replace
+
+from sqlalchemy import func, select
+
+import app.outbox as outbox
+from app.models import OutboxEvent, Receipt, ReceiptIdempotencyKey
+from app.funcs.receipt.idempotency import IDEMPOTENCY_KEYS
+from app.settings import OUTBOX_SETTINGS
+
+from ..base import *
+from .get_receipts import register_and_login
+
+
+# Defined receipt of the tests
+RECEIPT_DATA = {"products": [{"title": "Coffee", "price": 2.50, "quantity": 2}], "payment": {"type": "cash", "amount": 10}}
+
+
+async def count_receipts(db_session: AsyncSession, receipt_id: int) -> tuple[int, int]:
+    """
+    Returns the number of receipts & outbox events of the user of a receipt.
+    """
+
+    user_id = await db_session.scalar(select(Receipt.user_id).where(Receipt.id == receipt_id))
+    receipts = await db_session.scalar(select(func.count()).select_from(Receipt).where(Receipt.user_id == user_id))
+    events = await db_session.scalar(select(func.count()).select_from(OutboxEvent).where(OutboxEvent.user_id == user_id))
+
+    return receipts, events
+
+
+def enable_outbox(monkeypatch) -> None:
+    """
+    Writes outbox events with receipts, so duplicated events would be counted.
+    """
+
+    monkeypatch.setattr(outbox, "OUTBOX_SETTINGS", replace(OUTBOX_SETTINGS, enabled=True))
+
+
+@pytest.mark.asyncio
+async def test_idempotent_retry(client: AsyncClient, db_session: AsyncSession, monkeypatch):
+    """
+    Tests that retries with the same Idempotency-Key return the first receipt without creating another one.
+    """
+
+    enable_outbox(monkeypatch)
+
+    auth_headers = await register_and_login(client)
+    headers = {**auth_headers, "Idempotency-Key": "terminal-1:0001"}
+
+    response = await client.post("/receipts/", json=RECEIPT_DATA, headers=headers)
+    assert response.status_code == 200, f"Receipt creation failed: {response.json()}"
+    receipt = response.json()
+
+    # Answered from the recent keys of the process
+    retry = await client.post("/receipts/", json=RECEIPT_DATA, headers=headers)
+    assert retry.status_code == 200 and retry.json() == receipt
+
+    # Answered from the table (e.g. by another worker)
+    IDEMPOTENCY_KEYS.keys.clear()
+    retry = await client.post("/receipts/", json=RECEIPT_DATA, headers=headers)
+    assert retry.status_code == 200 and retry.json() == receipt
+
+    assert await count_receipts(db_session, receipt["id"]) == (1, 1), "Retries must not create receipts!"
+
+    # Same key for another receipt
+    response = await client.post("/receipts/", json={**RECEIPT_DATA, "payment": {"type": "card", "amount": 5}}, headers=headers)
+    assert response.status_code == 422
+
+    # Keys are per user, requests without a key are never deduplicated
+    other_headers = {**await register_and_login(client), "Idempotency-Key": "terminal-1:0001"}
+    response = await client.post("/receipts/", json=RECEIPT_DATA, headers=other_headers)
+    assert response.status_code == 200 and response.json()["id"] != receipt["id"]
+
+    response = await client.post("/receipts/", json=RECEIPT_DATA, headers=auth_headers)
+    assert response.status_code == 200 and response.json()["id"] != receipt["id"]
+    assert await count_receipts(db_session, receipt["id"]) == (2, 2)
+
+    response = await client.post("/receipts/", json=RECEIPT_DATA, headers={**auth_headers, "Idempotency-Key": "k" * 256})
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_idempotent_concurrent_duplicates(client: AsyncClient, db_session: AsyncSession, monkeypatch):
+    """
+    Tests that concurrent requests with the same key are settled by the primary key: one creates the receipt,
+    the others roll back and return it.
+    """
+
+    enable_outbox(monkeypatch)
+
+    auth_headers = await register_and_login(client)
+    headers = {**auth_headers, "Idempotency-Key": "terminal-2:0001"}
+    size = 5
+
+    # Product exists (concurrent inserts of a new title wait for each other before the key)
+    response = await client.post("/receipts/", json=RECEIPT_DATA, headers=auth_headers)
+    assert response.status_code == 200
+
+    claims = []
+    arrived = asyncio.Event()
+    claim = IDEMPOTENCY_KEYS.claim
+
+    async def claim_together(*args):
+        # All requests hold a receipt being created before any of them saves the key
+        claims.append(None)
+
+        if len(claims) == size:
+            arrived.set()
+
+        await asyncio.wait_for(arrived.wait(), 5)
+        claimed = await claim(*args)
+        claims.append(claimed)
+
+        return claimed
+
+    monkeypatch.setattr(IDEMPOTENCY_KEYS, "claim", claim_together)
+
+    async def get_own_session():
+        # Concurrent requests can't share the session of the test
+        async with TestingSessionLocal() as session:
+            yield session
+
+    monkeypatch.setitem(app.dependency_overrides, get_session, get_own_session)
+    monkeypatch.setitem(app.dependency_overrides, get_read_session, get_own_session)
+
+    responses = await asyncio.gather(*(client.post("/receipts/", json=RECEIPT_DATA, headers=headers) for _ in range(size)))
+    assert all(response.status_code == 200 for response in responses), [response.json() for response in responses]
+    assert len({response.json()["id"] for response in responses}) == 1
+    assert [claimed for claimed in claims if claimed is not None].count(True) == 1
+    assert claims.count(False) == size - 1
+
+    receipt_id = responses[0].json()["id"]
+    assert await count_receipts(db_session, receipt_id) == (2, 2), "Duplicates must be rolled back!"
+    assert await db_session.scalar(
+        select(ReceiptIdempotencyKey.receipt_id).where(ReceiptIdempotencyKey.key == "terminal-2:0001")
+    ) == receipt_id
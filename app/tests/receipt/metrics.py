@@ -0,0 +1,156 @@
+# coding=utf-8
+
+import os
+import subprocess
+import sys
+import textwrap
+
+from prometheus_client import REGISTRY
+from sqlalchemy import text
+
+from app.conf import TEST_DATABASE_URL
+from app.metrics import TimedQueuePool, instrument_engine
+
+from ..base import *
+from .get_receipts import register_and_login
+
+
+# Defined receipt of the tests
+RECEIPT_DATA = {"products": [{"title": "Coffee", "price": 2.50, "quantity": 2}], "payment": {"type": "cash", "amount": 10}}
+
+# Defined worker of the multiprocess test: publishes its pool state, then checks the merged metrics
+MULTIPROCESS_WORKER = textwrap.dedent("""
+    import asyncio, os, shutil, sys
+
+    from prometheus_client import CollectorRegistry
+    from prometheus_client.multiprocess import MultiProcessCollector
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    from app.metrics import TimedQueuePool, instrument_engine
+    from app.routes.metrics.funcs import remove_dead_workers
+
+
+    def checked_out():
+        registry = CollectorRegistry()
+        MultiProcessCollector(registry)
+        return registry.get_sample_value("easycheck_db_pool_checked_out", {"engine": "worker"})
+
+
+    async def main():
+        directory = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+        engine = create_async_engine(sys.argv[1], poolclass=TimedQueuePool)
+        instrument_engine(engine, "worker")
+
+        async with engine.connect():
+            assert checked_out() == 1, checked_out()
+
+        assert checked_out() == 0, checked_out()
+
+        async with engine.connect():
+            # Files of a killed worker (no such process) holding a connection
+            for name in os.listdir(directory):
+                if name.startswith("gauge_livesum_"):
+                    shutil.copy(os.path.join(directory, name), os.path.join(directory, "gauge_livesum_999999999.db"))
+
+            assert checked_out() == 2, checked_out()
+            remove_dead_workers(directory)
+            assert checked_out() == 1, checked_out()
+
+        await engine.dispose()
+
+
+    asyncio.run(main())
+""")
+
+
+@pytest.mark.asyncio
+async def test_pool_gauges(test_db):
+    """
+    Tests that pool gauges follow checkouts & returns of connections (published, not read on scrape).
+    """
+
+    engine = create_async_engine(TEST_DATABASE_URL, poolclass=TimedQueuePool, pool_size=2, max_overflow=1)
+    instrument_engine(engine, "test")
+
+    def sample(name: str) -> float:
+        return REGISTRY.get_sample_value(name, {"engine": "test"})
+
+    assert sample("easycheck_db_pool_size") == 2 and sample("easycheck_db_pool_checked_out") == 0
+
+    async with engine.connect() as first, engine.connect() as second, engine.connect() as third:
+        for connection in (first, second, third):
+            await connection.execute(text("SELECT 1"))
+
+        assert sample("easycheck_db_pool_checked_out") == 3
+        assert sample("easycheck_db_pool_overflow") == 1
+
+    assert sample("easycheck_db_pool_checked_out") == 0
+    assert sample("easycheck_db_pool_overflow") == 0, "Overflow connections are closed when returned!"
+
+    # Pools replacing the disposed one keep publishing
+    await engine.dispose()
+
+    async with engine.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+        assert sample("easycheck_db_pool_checked_out") == 1
+
+    await engine.dispose()
+
+
+def test_multiprocess_pool_gauges(tmp_path):
+    """
+    Tests that with several workers (`PROMETHEUS_MULTIPROC_DIR`) pool gauges are summed from live workers only.
+    """
+
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+    result = subprocess.run(
+        [sys.executable, "-c", MULTIPROCESS_WORKER, TEST_DATABASE_URL],
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+
+    assert result.returncode == 0, result.stderr
+
+
+@pytest.mark.asyncio
+async def test_request_metrics(client: AsyncClient, db_session: AsyncSession):
+    """
+    Tests that a request records its latency & number of SQL statements under its route template,
+    and that `/metrics` serves them.
+    """
+
+    # Statements of the test engine are counted like those of the app's engines
+    instrument_engine(TEST_ENGINE, "tests")
+
+    auth_headers = await register_and_login(client)
+    response = await client.post("/receipts/", json=RECEIPT_DATA, headers=auth_headers)
+    assert response.status_code == 200, f"Receipt creation failed: {response.json()}"
+    receipt_id = response.json()["id"]
+
+    route = {"route": "/receipts/{receipt_id}"}
+
+    def sample(name: str, labels: dict) -> float:
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    requests = sample("easycheck_request_duration_seconds_count", {"method": "GET", **route})
+    statements = sample("easycheck_request_statements_count", route)
+    statements_sum = sample("easycheck_request_statements_sum", route)
+
+    response = await client.get(f"/receipts/{receipt_id}", headers=auth_headers)
+    assert response.status_code == 200
+
+    assert sample("easycheck_request_duration_seconds_count", {"method": "GET", **route}) == requests + 1
+    assert sample("easycheck_request_duration_seconds_sum", {"method": "GET", **route}) > 0
+    assert sample("easycheck_request_statements_count", route) == statements + 1
+    assert sample("easycheck_request_statements_sum", route) >= statements_sum + 1, "Statements must be counted!"
+
+    # Routes are labeled by template, not by receipt ID
+    assert REGISTRY.get_sample_value("easycheck_request_statements_count", {"route": f"/receipts/{receipt_id}"}) is None
+
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'easycheck_request_duration_seconds_count{method="GET",route="/receipts/{receipt_id}"}' in response.text
+    assert 'easycheck_request_statements_bucket{le="1.0",route="/receipts/{receipt_id}"}' in response.text
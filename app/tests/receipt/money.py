@@ -0,0 +1,86 @@
+# coding=utf-8
+
+from dataclasses import replace
+from decimal import Decimal
+
+from sqlalchemy import update
+
+import app.funcs.receipt.aggregates as aggregates
+import app.funcs.receipt.funcs as funcs
+import app.funcs.receipt.pg_json as pg_json
+from app.funcs.receipt.funcs import format_number
+from app.models import Receipt, ReceiptProduct
+from app.money import to_cents, from_cents, format_cents, cents_or_amount
+from app.settings import RECEIPT_SETTINGS
+
+from ..base import *
+from .get_receipts import register_and_login
+
+
+def test_cents_round_trip():
+    """
+    Tests conversion between amounts and integer cents.
+    """
+
+    assert to_cents(Decimal("19.99")) == 1999
+    assert to_cents(Decimal("0.1")) == 10
+    assert to_cents(Decimal("19.995")) == 2000, "Cents must be rounded half up like Numeric(10, 2)!"
+    assert from_cents(1999) == Decimal("19.99")
+    assert str(from_cents(100)) == "1.00", "Amounts must keep two decimal places!"
+
+
+def test_format_cents():
+    """
+    Tests that cents are formatted exactly like Decimal amounts in text receipts.
+    """
+
+    for cents in (0, 7, 99, 100, 187994, 123456789, -12103):
+        assert format_cents(cents) == format_number(from_cents(cents))
+
+
+def test_cents_or_amount():
+    """
+    Tests that NULL cents fall back to the Numeric amount.
+    """
+
+    assert cents_or_amount(1999, Decimal("0")) == 1999
+    assert cents_or_amount(None, Decimal("19.99")) == 1999
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("read_engine", ["orm", "postgres"])
+async def test_cents_mode_null_cents(client: AsyncClient, db_session: AsyncSession, monkeypatch, read_engine: str):
+    """
+    Tests that in "cents" money mode receipts whose cents columns are NULL (written before them)
+    are read, rendered & aggregated from their Numeric columns.
+    """
+
+    settings = replace(RECEIPT_SETTINGS, money_mode="cents", read_engine=read_engine)
+
+    for module in (funcs, pg_json, aggregates):
+        monkeypatch.setattr(module, "RECEIPT_SETTINGS", settings)
+
+    auth_headers = await register_and_login(client)
+    data = {"products": [{"title": "Tea", "price": "1.25", "quantity": 3}], "payment": {"type": "card", "amount": "5"}}
+    created = [(await client.post("/receipts/", json=data, headers=auth_headers)).json() for _ in range(2)]
+
+    # First receipt as written before the cents columns
+    await db_session.execute(update(Receipt).where(Receipt.id == created[0]["id"]).values(
+        total_cents=None, payment_amount_cents=None, rest_cents=None,
+    ))
+    await db_session.execute(update(ReceiptProduct).where(ReceiptProduct.receipt_id == created[0]["id"]).values(
+        price_cents=None, line_total_cents=None,
+    ))
+    await db_session.commit()
+
+    response = await client.get(f"/receipts/{created[0]['id']}", headers=auth_headers)
+    assert response.status_code == 200 and response.json() == created[1] | {"id": created[0]["id"], "created_at": created[0]["created_at"]}
+
+    response = await client.get("/receipts/", params={"aggregates": "sum,by_payment_type", "total": "3.75"}, headers=auth_headers)
+    body = response.json()
+    assert body["total"] == 2, "Receipts without cents must match filters!"
+    assert body["aggregates"]["sum"] == "7.50", "Receipts without cents must be summed!"
+    assert body["aggregates"]["by_payment_type"]["card"] == {"receipts": 2, "sum": "7.50"}
+
+    response = await client.get(f"/receipts/{created[0]['id']}/text")
+    assert response.status_code == 200 and "3.75" in response.text
@@ -0,0 +1,80 @@
+# coding=utf-8
+
+import cbor2
+import msgpack
+
+from app.routes.negotiation import choose_media_type
+
+from ..base import *
+from .cases import RECEIPT_CREATION_TEST_CASES
+
+
+def test_choose_media_type():
+    """
+    Tests negotiation of the response media type by `Accept`.
+    """
+
+    assert choose_media_type(None) == "application/json"
+    assert choose_media_type("*/*") == "application/json"
+    assert choose_media_type("application/msgpack") == "application/msgpack"
+    assert choose_media_type("application/x-msgpack, */*;q=0.1") == "application/x-msgpack"
+    assert choose_media_type("application/json, application/cbor") == "application/json"
+    assert choose_media_type("application/json;q=0.5, application/cbor") == "application/cbor"
+
+
+@pytest.mark.asyncio
+async def test_binary_receipts(client: AsyncClient, db_session: AsyncSession):
+    """
+    Tests that users & receipts endpoints accept and return MessagePack/CBOR with the JSON schemas.
+    """
+
+    user_data = {
+        "first_name": "Test",
+        "last_name": "User",
+        "login": generate_random_username(),
+        "password": "TestPassword123!"
+    }
+
+    # Register & log in with MessagePack
+    msgpack_headers = {"Content-Type": "application/msgpack", "Accept": "application/msgpack"}
+
+    response = await client.post("/users/register", content=msgpack.packb(user_data), headers=msgpack_headers)
+    assert response.status_code == 200, f"User registration failed: {response.text}"
+    assert response.headers["content-type"] == "application/msgpack"
+    assert msgpack.unpackb(response.content)["login"] == user_data["login"]
+
+    response = await client.post("/users/login", content=msgpack.packb({
+        "login": user_data["login"],
+        "password": user_data["password"]
+    }), headers=msgpack_headers)
+    assert response.status_code == 200, f"User login failed: {response.text}"
+
+    auth_headers = {"Authorization": f"Bearer {msgpack.unpackb(response.content)['access_token']}"}
+
+    # Create a receipt with CBOR, money is returned in cents
+    receipt_data = RECEIPT_CREATION_TEST_CASES[0]
+    response = await client.post(
+        "/receipts/",
+        content=cbor2.dumps({"products": receipt_data["products"], "payment": receipt_data["payment"]}),
+        headers={**auth_headers, "Content-Type": "application/cbor", "Accept": "application/cbor"},
+    )
+    assert response.status_code == 200, f"Receipt creation failed: {response.text}"
+    assert response.headers["content-type"] == "application/cbor"
+
+    receipt = cbor2.loads(response.content)
+    assert receipt["total"] == 93997, "Total must be written in cents!"
+    assert receipt["products"][1] == {"title": "Phone Case", "price": 1999, "quantity": 2, "total": 3998}
+
+    # Same receipt in the list, as MessagePack
+    response = await client.get("/receipts/", headers={**auth_headers, "Accept": "application/msgpack"})
+    assert msgpack.unpackb(response.content)["results"] == [receipt], "List item must equal the created receipt!"
+    assert response.headers["vary"] == "Accept", "Shared caches must key responses by Accept!"
+
+    # JSON stays the default
+    response = await client.get(f"/receipts/{receipt['id']}", headers=auth_headers)
+    assert response.json()["total"] == "939.97"
+    assert response.headers["vary"] == "Accept"
+
+    # Invalid body
+    response = await client.post("/receipts/", content=b"\xc1", headers={**auth_headers, **msgpack_headers})
+    assert response.status_code == 400
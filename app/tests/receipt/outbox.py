@@ -0,0 +1,288 @@
+# coding=utf-8
+
+import asyncio
+import json
+from dataclasses import replace
+from datetime import datetime
+
+import httpx
+from sqlalchemy import delete, select
+
+import app.outbox as outbox
+from app.models import OutboxEvent
+from app.outbox import FileSink, HttpSink, OutboxDispatcher, build_sinks
+from app.settings import OUTBOX_SETTINGS, OutboxSettings
+
+from ..base import *
+from .get_receipts import register_and_login
+
+
+# Defined receipt of the tests
+RECEIPT_DATA = {"products": [{"title": "Coffee", "price": 2.50, "quantity": 2}], "payment": {"type": "cash", "amount": 10}}
+
+# Defined settings of the tests (small batches)
+SETTINGS = replace(OUTBOX_SETTINGS, batch_size=2, poll_interval=0.05, backoff_base=60.0)
+
+
+class RecordingSink:
+    """
+    Sink keeping delivered batches, failing while `error` is set or waiting while `gate` is closed.
+    """
+
+    name = "recording"
+
+    def __init__(self):
+        self.batches: list[list[dict]] = []
+        self.error: Exception | None = None
+        self.gate = asyncio.Event()
+        self.gate.set()
+        self.entered = asyncio.Event()
+
+    async def send(self, messages: list[dict]) -> None:
+        self.entered.set()
+        await self.gate.wait()
+
+        if self.error is not None:
+            raise self.error
+
+        self.batches.append(messages)
+
+    async def close(self) -> None:
+        pass
+
+
+async def add_events(db_session: AsyncSession, count: int) -> list[int]:
+    """
+    Empties the outbox (events of receipts of other tests) and adds `count` events, returning their IDs.
+    """
+
+    await db_session.execute(delete(OutboxEvent))
+    events = [OutboxEvent(event_type="test", user_id=1, payload={"n": n}) for n in range(count)]
+    db_session.add_all(events)
+    await db_session.commit()
+
+    return [event.id for event in events]
+
+
+async def outbox_ids(db_session: AsyncSession) -> list[int]:
+    db_session.expire_all()
+    return list((await db_session.scalars(select(OutboxEvent.id).order_by(OutboxEvent.id))).all())
+
+
+@pytest.mark.asyncio
+async def test_outbox_written_with_receipt(client: AsyncClient, db_session: AsyncSession, monkeypatch):
+    """
+    Tests that creating a receipt writes a "receipt.created" event with the receipt as returned by the API.
+    """
+
+    monkeypatch.setattr(outbox, "OUTBOX_SETTINGS", replace(OUTBOX_SETTINGS, enabled=True))
+
+    auth_headers = await register_and_login(client)
+    response = await client.post("/receipts/", json=RECEIPT_DATA, headers=auth_headers)
+    assert response.status_code == 200, f"Receipt creation failed: {response.json()}"
+    receipt = response.json()
+
+    event = await db_session.scalar(select(OutboxEvent).where(OutboxEvent.payload["id"].as_integer() == receipt["id"]))
+    assert event is not None and event.event_type == "receipt.created"
+    assert event.payload == receipt
+    assert event.attempts == 0 and event.available_at <= datetime.utcnow()
+
+
+@pytest.mark.asyncio
+async def test_outbox_file_sink(db_session: AsyncSession, tmp_path):
+    """
+    Tests that due events are delivered to a JSON Lines file in batches, oldest first, and removed from the outbox.
+    """
+
+    ids = await add_events(db_session, 3)
+    path = tmp_path / "events" / "receipts.jsonl"
+    dispatcher = OutboxDispatcher(TEST_ENGINE, build_sinks(replace(SETTINGS, sinks="file", file_path=str(path))), SETTINGS)
+
+    assert await dispatcher.dispatch() == 2
+    assert await dispatcher.dispatch() == 1
+    assert await dispatcher.dispatch() == 0
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["id"] for line in lines] == ids
+    assert [line["payload"] for line in lines] == [{"n": 0}, {"n": 1}, {"n": 2}]
+    assert lines[0]["type"] == "test" and lines[0]["user_id"] == 1
+    assert await outbox_ids(db_session) == []
+
+    await dispatcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_outbox_backoff(db_session: AsyncSession):
+    """
+    Tests that a failed batch stays in the outbox and is not retried before its backoff expired.
+    """
+
+    ids = await add_events(db_session, 2)
+    sink = RecordingSink()
+    sink.error = ConnectionError("consumer down")
+    dispatcher = OutboxDispatcher(TEST_ENGINE, [sink], SETTINGS)
+
+    started_at = datetime.utcnow()
+    assert await dispatcher.dispatch() == 0
+    assert await outbox_ids(db_session) == ids
+
+    events = (await db_session.scalars(select(OutboxEvent).order_by(OutboxEvent.id))).all()
+
+    for event in events:
+        assert event.attempts == 1
+        assert "consumer down" in event.last_error
+
+        # Between half & all of the base backoff (jitter)
+        delay = (event.available_at - started_at).total_seconds()
+        assert SETTINGS.backoff_base / 2 - 1 <= delay <= SETTINGS.backoff_base + 1
+
+    # Not due yet
+    sink.error = None
+    assert await dispatcher.dispatch() == 0 and sink.batches == []
+
+    # Second failure doubles the backoff
+    assert dispatcher.get_backoff(2).total_seconds() <= SETTINGS.backoff_base * 2
+    assert dispatcher.get_backoff(100).total_seconds() <= SETTINGS.backoff_max
+
+    await db_session.execute(OutboxEvent.__table__.update().values(available_at=datetime.utcnow()))
+    await db_session.commit()
+    assert await dispatcher.dispatch() == 2
+    assert [message["id"] for message in sink.batches[0]] == ids
+
+
+@pytest.mark.asyncio
+async def test_outbox_skip_locked(db_session: AsyncSession):
+    """
+    Tests that concurrent dispatchers claim disjoint batches (a claimed batch is skipped, not waited for).
+    """
+
+    ids = await add_events(db_session, 4)
+    slow, fast = RecordingSink(), RecordingSink()
+    slow.gate.clear()
+
+    first = asyncio.create_task(OutboxDispatcher(TEST_ENGINE, [slow], SETTINGS).dispatch())
+    await asyncio.wait_for(slow.entered.wait(), 5)
+
+    # No lock is held while sinks are called, the claimed batch is reserved instead
+    async with TestingSessionLocal() as other_session:
+        claimed = (await other_session.scalars(
+            select(OutboxEvent).where(OutboxEvent.id.in_(ids[:2])).with_for_update(nowait=True)
+        )).all()
+        assert all(event.available_at > datetime.utcnow() for event in claimed)
+
+    # Claimed while the first batch is still being delivered
+    assert await asyncio.wait_for(OutboxDispatcher(TEST_ENGINE, [fast], SETTINGS).dispatch(), 5) == 2
+
+    slow.gate.set()
+    assert await asyncio.wait_for(first, 5) == 2
+
+    slow_ids = [message["id"] for message in slow.batches[0]]
+    fast_ids = [message["id"] for message in fast.batches[0]]
+    assert slow_ids == ids[:2] and fast_ids == ids[2:]
+    assert await outbox_ids(db_session) == []
+
+
+@pytest.mark.asyncio
+async def test_outbox_http_sink(db_session: AsyncSession):
+    """
+    Tests delivery of batches to an HTTP endpoint (a local stub), and that error responses fail the batch.
+    """
+
+    received = []
+    status = 500
+
+    async def stub(scope, receive, send):
+        body = b""
+
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+
+            if not message.get("more_body"):
+                break
+
+        if status == 200:
+            received.append((scope["path"], json.loads(body)))
+
+        await send({"type": "http.response.start", "status": status, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    ids = await add_events(db_session, 2)
+    sink = HttpSink("http://consumer/events", timeout=5.0, transport=httpx.ASGITransport(app=stub))
+    dispatcher = OutboxDispatcher(TEST_ENGINE, [sink], SETTINGS)
+
+    assert await dispatcher.dispatch() == 0
+    assert await outbox_ids(db_session) == ids and received == []
+
+    status = 200
+    await db_session.execute(OutboxEvent.__table__.update().values(available_at=datetime.utcnow()))
+    await db_session.commit()
+    assert await dispatcher.dispatch() == 2
+
+    ((path, body),) = received
+    assert path == "/events"
+    assert [event["id"] for event in body["events"]] == ids
+    assert await outbox_ids(db_session) == []
+
+    await dispatcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_outbox_dispatcher_task(db_session: AsyncSession, tmp_path):
+    """
+    Tests that a started dispatcher delivers events added while it runs, until it's stopped.
+    """
+
+    await add_events(db_session, 0)
+    path = tmp_path / "receipts.jsonl"
+    dispatcher = OutboxDispatcher(TEST_ENGINE, [FileSink(str(path))], SETTINGS)
+    await dispatcher.start()
+
+    try:
+        ids = []
+
+        for n in range(3):
+            event = OutboxEvent(event_type="test", user_id=1, payload={"n": n})
+            db_session.add(event)
+            await db_session.commit()
+            ids.append(event.id)
+
+        for _ in range(100):
+            if not await outbox_ids(db_session):
+                break
+
+            await asyncio.sleep(0.05)
+
+        assert [json.loads(line)["id"] for line in path.read_text().splitlines()] == ids
+
+    finally:
+        await dispatcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_outbox_claim_expires(db_session: AsyncSession):
+    """
+    Tests that a batch claimed by a dispatcher which never finished is delivered by another one once its claim expired.
+    """
+
+    ids = await add_events(db_session, 2)
+    sink = RecordingSink()
+
+    # Stopped between its claim & the delivery
+    assert [event.id for event in await OutboxDispatcher(TEST_ENGINE, [sink], SETTINGS).claim()] == ids
+    assert await OutboxDispatcher(TEST_ENGINE, [sink], SETTINGS).dispatch() == 0
+
+    await db_session.execute(OutboxEvent.__table__.update().values(available_at=datetime.utcnow()))
+    await db_session.commit()
+    assert await OutboxDispatcher(TEST_ENGINE, [sink], SETTINGS).dispatch() == 2
+    assert [message["id"] for message in sink.batches[0]] == ids
+    assert await outbox_ids(db_session) == []
+
+
+def test_outbox_off_by_default():
+    """
+    Tests that nothing is written nor delivered (e.g. to a file nobody reads) until the outbox is configured.
+    """
+
+    settings = OutboxSettings()
+    assert settings.enabled is False and build_sinks(settings) == []
@@ -0,0 +1,120 @@
+# coding=utf-8
+
+import json
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.future import select
+
+from app.funcs.receipt import pg_json
+from app.funcs.receipt.funcs import as_utc, receipt_filters
+from app.models import Receipt
+from app.partitions import (
+    add_months,
+    partition_name,
+    create_shadow_tables,
+    copy_rows,
+    count_missing,
+    swap_tables,
+    drop_shadow_tables,
+    drop_old_tables,
+    create_future_partitions,
+)
+
+from ..base import *
+from .get_receipts import register_and_login
+
+
+# Defined receipt of the tests
+RECEIPT_DATA = {
+    "products": [
+        {"title": "Coffee", "price": 2.50, "quantity": 2},
+        {"title": "Croissant", "price": 1.80, "quantity": 1},
+    ],
+    "payment": {"type": "cash", "amount": 10},
+}
+
+
+def test_partition_months():
+    """
+    Tests month arithmetic & partition names.
+    """
+
+    assert add_months(date(2026, 11, 15), 1) == date(2026, 12, 1)
+    assert add_months(date(2026, 11, 15), 2) == date(2027, 1, 1)
+    assert add_months(date(2026, 1, 31), -1) == date(2025, 12, 1)
+    assert partition_name("receipt", date(2026, 3, 1)) == "receipt_y2026m03"
+
+    aware = datetime(2026, 3, 1, 2, 30, tzinfo=timezone(timedelta(hours=2)))
+    assert as_utc(aware) == datetime(2026, 3, 1, 0, 30), "Filters must compare naive UTC values!"
+
+
+@pytest.mark.asyncio
+async def test_migration_to_partitioned_tables(client: AsyncClient, db_session: AsyncSession):
+    """
+    Tests the data migration (shadow tables, copy, swap) while receipts are created,
+    and that date filters of the list scan only partitions of their months.
+    """
+
+    auth_headers = await register_and_login(client)
+
+    response = await client.post("/receipts/", json=RECEIPT_DATA, headers=auth_headers)
+    assert response.status_code == 200, f"Receipt creation failed: {response.json()}"
+    user_id = await db_session.scalar(select(Receipt.user_id).where(Receipt.id == response.json()["id"]))
+
+    try:
+        async with TEST_ENGINE.begin() as connection:
+            await connection.run_sync(create_shadow_tables, 3)
+
+        # Mirrored by the triggers
+        response = await client.post("/receipts/", json=RECEIPT_DATA, headers=auth_headers)
+        assert response.status_code == 200, f"Receipt creation failed: {response.json()}"
+
+        async with TEST_ENGINE.connect() as connection:
+            assert await connection.run_sync(copy_rows, 1) > 0
+            assert await connection.run_sync(copy_rows, 1) == 0, "Copied rows must be skipped!"
+            assert await connection.run_sync(count_missing) == {"receipt": 0, "receipt_product": 0}
+
+            await connection.run_sync(swap_tables)
+
+            # Existing partitions are skipped
+            assert await connection.run_sync(create_future_partitions, 3) == []
+            await connection.commit()
+
+        # IDs continue
+        response = await client.post("/receipts/", json=RECEIPT_DATA, headers=auth_headers)
+        assert response.status_code == 200, f"Receipt creation failed: {response.json()}"
+
+        # Date filters of the current month
+        now = datetime.now(timezone.utc)
+        start_date = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        end_date = add_months(start_date.date(), 1) - timedelta(days=1)
+        params = {"start_date": start_date.isoformat(), "end_date": f"{end_date}T23:59:59Z"}
+
+        response = await client.get("/receipts/", params=params, headers=auth_headers)
+        assert response.status_code == 200, f"Failed to retrieve receipts: {response.json()}"
+        assert response.json()["total"] == 3
+        assert all(len(receipt["products"]) == 2 for receipt in response.json()["results"])
+
+        conditions = receipt_filters(user_id=user_id, start_date=start_date, end_date=now)
+        page = json.loads(await pg_json.get_receipts_json(db_session=db_session, conditions=conditions))
+        assert page["total"] == 3 and all(len(receipt["products"]) == 2 for receipt in page["results"])
+
+        # Only the partition of the month is scanned
+        query = select(Receipt.id).where(*conditions).compile(
+            dialect=postgresql.dialect(),
+            compile_kwargs={"literal_binds": True},
+        )
+        plan = "\n".join(await db_session.scalars(text(f"EXPLAIN {query}")))
+        assert partition_name("receipt", start_date.date()) in plan
+        assert "receipt_default" not in plan and partition_name("receipt", add_months(now.date(), 1)) not in plan
+
+    finally:
+        await db_session.rollback()
+
+        async with TEST_ENGINE.connect() as connection:
+            await connection.run_sync(drop_old_tables)
+
+        async with TEST_ENGINE.begin() as connection:
+            await connection.run_sync(drop_shadow_tables)
@@ -0,0 +1,128 @@
+# coding=utf-8
+
+import json
+
+from sqlalchemy import event
+from sqlalchemy.future import select
+
+from app.funcs.receipt import pg_json
+from app.funcs.receipt.aggregates import parse_aggregates
+from app.funcs.receipt.funcs import get_receipt, get_receipts, receipt_filters
+from app.models import Receipt
+from app.routes.receipt.serialize import RECEIPT_ADAPTER, RECEIPTS_ADAPTER
+from app.routes.receipt.schema import ReceiptsResponseSchema
+
+from ..base import *
+from .cases import RECEIPT_CREATION_TEST_CASES
+from .get_receipts import register_and_login
+
+
+@pytest.mark.asyncio
+async def test_pg_json_matches_orm(client: AsyncClient, db_session: AsyncSession):
+    """
+    Tests that JSON assembled by Postgres equals JSON of the ORM read engine.
+    """
+
+    auth_headers = await register_and_login(client)
+
+    # Create receipts
+    receipt_ids = []
+
+    for receipt_data in RECEIPT_CREATION_TEST_CASES:
+        if receipt_data["expected_status"] != 200:
+            # Skip invalid cases
+            continue
+
+        response = await client.post(
+            "/receipts/",
+            json={"products": receipt_data["products"], "payment": receipt_data["payment"]},
+            headers=auth_headers
+        )
+        assert response.status_code == 200, f"Receipt creation failed: {response.json()}"
+        receipt_ids.append(response.json()["id"])
+
+    user_id = await db_session.scalar(select(Receipt.user_id).where(Receipt.id == receipt_ids[0]))
+
+    # Single receipt
+    for receipt_id in receipt_ids:
+        orm_json = RECEIPT_ADAPTER.dump_json(await get_receipt(
+            receipt_id=receipt_id,
+            user_id=user_id,
+            db_session=db_session,
+        ))
+        postgres_json = await pg_json.get_receipt_json(
+            db_session=db_session,
+            conditions=[Receipt.id == receipt_id, Receipt.user_id == user_id],
+        )
+
+        assert json.loads(postgres_json) == json.loads(orm_json), "Receipt JSON differs between engines!"
+
+    # Missing receipt
+    assert await pg_json.get_receipt_json(
+        db_session=db_session,
+        conditions=[Receipt.id == max(receipt_ids) + 1000, Receipt.user_id == user_id],
+    ) is None
+
+    # Pages & filters
+    for filters in ({}, {"payment_type": "card"}, {"total": 100}, {"payment_type": "card", "total": 100}):
+        for page, on_page, aggregates in ((0, 1, None), (1, 1, "sum"), (0, 10, "avg,by_payment_type"), (5, 10, "sum,avg")):
+            orm_json = RECEIPTS_ADAPTER.dump_json(ReceiptsResponseSchema.model_construct(**await get_receipts(
+                db_session=db_session,
+                user_id=user_id,
+                page=page,
+                on_page=on_page,
+                aggregates=aggregates,
+                **filters,
+            )))
+            postgres_json = await pg_json.get_receipts_json(
+                db_session=db_session,
+                conditions=receipt_filters(user_id=user_id, **filters),
+                page=page,
+                on_page=on_page,
+                aggregates=parse_aggregates(aggregates),
+            )
+
+            assert json.loads(postgres_json) == json.loads(orm_json), (
+                f"List JSON differs between engines for {filters}, page {page}, on page {on_page}!"
+            )
+
+
+@pytest.mark.asyncio
+async def test_pg_json_page_not_materialized(client: AsyncClient, db_session: AsyncSession):
+    """
+    Tests that filtered receipts are not materialized for both the page & the count,
+    so the page is read by the index and stops after `on_page` rows.
+    """
+
+    auth_headers = await register_and_login(client)
+    response = await client.post(
+        "/receipts/",
+        json={"products": [{"title": "Coffee", "price": 2.50, "quantity": 1}], "payment": {"type": "card", "amount": 5}},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200, f"Receipt creation failed: {response.json()}"
+    user_id = await db_session.scalar(select(Receipt.user_id).where(Receipt.id == response.json()["id"]))
+
+    statements = []
+
+    def capture(_connection, _cursor, statement, parameters, _context, _executemany):
+        statements.append((statement, parameters))
+
+    event.listen(TEST_ENGINE.sync_engine, "before_cursor_execute", capture)
+
+    try:
+        await pg_json.get_receipts_json(
+            db_session=db_session,
+            conditions=receipt_filters(user_id=user_id),
+            aggregates=parse_aggregates("sum"),
+        )
+
+    finally:
+        event.remove(TEST_ENGINE.sync_engine, "before_cursor_execute", capture)
+
+    (statement, parameters), = statements
+    assert "filtered AS NOT MATERIALIZED" in statement
+
+    connection = await db_session.connection()
+    plan = "\n".join((await connection.exec_driver_sql(f"EXPLAIN {statement}", parameters)).scalars())
+    assert "CTE Scan on filtered" not in plan, plan
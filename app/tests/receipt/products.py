@@ -0,0 +1,42 @@
+# coding=utf-8
+
+from sqlalchemy import func
+from sqlalchemy.future import select
+
+from app.models import Product, Receipt
+
+from ..base import *
+from .get_receipts import register_and_login
+
+
+@pytest.mark.asyncio
+async def test_product_titles_are_stored_once(client: AsyncClient, db_session: AsyncSession):
+    """
+    Tests that repeated titles of a user reference one product, and titles are kept in responses.
+    """
+
+    auth_headers = await register_and_login(client)
+    receipt_data = {
+        "products": [
+            {"title": "Coffee", "price": 2.50, "quantity": 2},
+            {"title": "Croissant", "price": 1.80, "quantity": 1},
+        ],
+        "payment": {"type": "cash", "amount": 10},
+    }
+
+    receipt_ids = []
+
+    for _ in range(3):
+        response = await client.post("/receipts/", json=receipt_data, headers=auth_headers)
+        assert response.status_code == 200, f"Receipt creation failed: {response.json()}"
+        assert [product["title"] for product in response.json()["products"]] == ["Coffee", "Croissant"]
+        receipt_ids.append(response.json()["id"])
+
+    user_id = await db_session.scalar(select(Receipt.user_id).where(Receipt.id == receipt_ids[0]))
+    products = await db_session.scalar(select(func.count()).select_from(Product).where(Product.user_id == user_id))
+    assert products == 2, "Each title must be stored once per user!"
+
+    # Text receipt
+    response = await client.get(f"/receipts/{receipt_ids[0]}/text", params={"width": 40})
+    assert response.status_code == 200, f"Failed to retrieve receipt text: {response.json()}"
+    assert "Coffee" in response.json() and "Croissant" in response.json()
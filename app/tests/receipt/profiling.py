@@ -0,0 +1,88 @@
+# coding=utf-8
+
+import json
+import pstats
+
+from starlette.middleware import Middleware
+
+from app.metrics import MetricsMiddleware, instrument_engine
+from app.profiling import ProfilingMiddleware
+from app.settings import ProfilingSettings
+
+from ..base import *
+from .get_receipts import register_and_login
+
+
+# Defined receipt of the tests
+RECEIPT_DATA = {"products": [{"title": "Coffee", "price": 2.50, "quantity": 2}], "payment": {"type": "cash", "amount": 10}}
+
+
+def use_profiler(monkeypatch, settings: ProfilingSettings) -> None:
+    """
+    Adds the profiler to the app where `app.main` puts it when enabled (right inside the metrics middleware).
+    """
+
+    assert app.user_middleware[0].cls is MetricsMiddleware
+
+    monkeypatch.setattr(app, "user_middleware", [
+        app.user_middleware[0],
+        Middleware(ProfilingMiddleware, settings=settings),
+        *app.user_middleware[1:],
+    ])
+    monkeypatch.setattr(app, "middleware_stack", None)
+
+
+@pytest.mark.asyncio
+async def test_profiling(client: AsyncClient, db_session: AsyncSession, monkeypatch, tmp_path):
+    """
+    Tests that a request with the authorized token is profiled to a `.prof` & a `.json` report
+    (with its SQL statements & pool wait time), and that other requests are not.
+    """
+
+    # Statements of the test engine are collected like those of the app's engines
+    instrument_engine(TEST_ENGINE, "tests")
+
+    auth_headers = await register_and_login(client)
+    response = await client.post("/receipts/", json=RECEIPT_DATA, headers=auth_headers)
+    assert response.status_code == 200, f"Receipt creation failed: {response.json()}"
+    receipt_id = response.json()["id"]
+
+    settings = ProfilingSettings(token="secret", directory=str(tmp_path))
+    use_profiler(monkeypatch, settings)
+
+    # Unsampled, wrong token
+    for headers in (auth_headers, {**auth_headers, settings.header: "wrong"}):
+        response = await client.get(f"/receipts/{receipt_id}", headers=headers)
+        assert response.status_code == 200
+
+    assert list(tmp_path.iterdir()) == [], "Requests without the token must not be profiled!"
+
+    response = await client.get(f"/receipts/{receipt_id}", headers={**auth_headers, settings.header: "secret"})
+    assert response.status_code == 200
+
+    (profile,) = tmp_path.glob("*.prof")
+    (report_path,) = tmp_path.glob("*.json")
+    assert profile.stem == report_path.stem and profile.stem.endswith("_GET_receipts_receipt_id")
+    assert pstats.Stats(str(profile)).total_calls > 0
+
+    report = json.loads(report_path.read_text())
+    assert report["route"] == "/receipts/{receipt_id}" and report["status_code"] == 200
+    assert report["pool_wait_seconds"] >= 0 and report["duration_seconds"] > 0
+    assert report["statements"], "SQL statements of the request must be reported!"
+    assert any("FROM receipt" in statement["sql"] for statement in report["statements"])
+    assert all(statement["seconds"] >= 0 for statement in report["statements"])
+
+
+@pytest.mark.asyncio
+async def test_profiling_sampled(client: AsyncClient, db_session: AsyncSession, monkeypatch, tmp_path):
+    """
+    Tests that sampled requests are profiled without the token.
+    """
+
+    use_profiler(monkeypatch, ProfilingSettings(sample_rate=1.0, directory=str(tmp_path)))
+
+    response = await client.post("/users/login", json={"login": "nobody", "password": "wrong"})
+    assert response.status_code != 200
+
+    assert len(list(tmp_path.glob("*_POST_users_login.prof"))) == 1
+    assert len(list(tmp_path.glob("*_POST_users_login.json"))) == 1
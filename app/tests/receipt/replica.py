@@ -0,0 +1,186 @@
+# coding=utf-8
+
+import asyncio
+import time
+from dataclasses import replace
+
+import pytest_asyncio
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import sessionmaker
+
+from app import db
+from app.conf import TEST_DATABASE_REPLICA_URL
+from app.db import ReplicaRouter, build_engine
+from app.models.receipt import Receipt
+from app.settings import DatabaseSettings
+
+from ..base import *
+from .get_receipts import register_and_login
+
+
+PRIMARY = "primary"
+REPLICAS = ["replica_1", "replica_2"]
+
+# Defined receipt of the integration tests
+RECEIPT_DATA = {"products": [{"title": "Coffee", "price": 2.50, "quantity": 2}], "payment": {"type": "cash", "amount": 10}}
+
+# Defined read-your-writes window of the integration tests
+WINDOW = 0.2
+
+# Defined marker of tests needing a second database
+requires_replica = pytest.mark.skipif(
+    TEST_DATABASE_REPLICA_URL is None,
+    reason="TEST_DATABASE_REPLICA_URL is not set",
+)
+
+
+def test_reads_without_replicas_use_primary():
+    """
+    Tests that all reads go to the primary when no replicas are configured.
+    """
+
+    router = ReplicaRouter(primary=PRIMARY, replicas=[], window=5)  # noqa
+    router.mark_write("Bearer token")
+
+    assert router.choose() == PRIMARY
+    assert router.choose("Bearer token") == PRIMARY
+
+
+def test_reads_are_spread_round_robin():
+    """
+    Tests that reads are spread over all replicas in turn.
+    """
+
+    router = ReplicaRouter(primary=PRIMARY, replicas=REPLICAS, window=5)  # noqa
+
+    chosen = [router.choose("Bearer token") for _ in range(4)]
+
+    assert chosen == ["replica_1", "replica_2", "replica_1", "replica_2"]
+
+
+def test_read_your_writes_window():
+    """
+    Tests that a client reads from the primary right after its write,
+    while other clients keep using the replicas.
+    """
+
+    router = ReplicaRouter(primary=PRIMARY, replicas=REPLICAS, window=0.05)  # noqa
+    router.mark_write("Bearer writer")
+
+    assert router.choose("Bearer writer") == PRIMARY, "Writer must read its own writes from the primary!"
+    assert router.choose("Bearer reader") in REPLICAS, "Other clients must keep reading from replicas!"
+    assert router.choose(None) in REPLICAS, "Anonymous reads must use replicas!"
+
+    # Wait until the window is over
+    time.sleep(0.06)
+
+    assert router.choose("Bearer writer") in REPLICAS, "Writer must go back to replicas after the window!"
+
+
+async def replicate() -> None:
+    """
+    Copies all rows of the test database to the replica database, like a replica catching up.
+    """
+
+    replica_engine = create_async_engine(TEST_DATABASE_REPLICA_URL)
+
+    async with TEST_ENGINE.connect() as primary, replica_engine.begin() as replica:
+        await replica.run_sync(Base.metadata.drop_all)
+        await replica.run_sync(Base.metadata.create_all)
+
+        for table in Base.metadata.sorted_tables:
+            rows = (await primary.execute(select(table))).mappings().all()
+
+            if rows:
+                await replica.execute(insert(table), [dict(row) for row in rows])
+
+    await replica_engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def replica_router(client: AsyncClient, monkeypatch) -> ReplicaRouter:
+    """
+    Routes reads of the app to the replica database configured by `DATABASE_REPLICA_URLS`,
+    with the real `get_session` & `get_read_session` (on the test database as the primary).
+    """
+
+    monkeypatch.setenv("DATABASE_REPLICA_URLS", TEST_DATABASE_REPLICA_URL)
+    monkeypatch.setenv("DATABASE_READ_YOUR_WRITES_WINDOW", str(WINDOW))
+    settings = DatabaseSettings.from_env()
+
+    replica_engines = [build_engine(replace(settings, url=url), read_only=True) for url in settings.replica_urls]
+    router = ReplicaRouter(
+        primary=TestingSessionLocal,
+        replicas=[
+            sessionmaker(bind=replica_engine, class_=AsyncSession, autoflush=False, autocommit=False)
+            for replica_engine in replica_engines
+        ],
+        window=settings.read_your_writes_window,
+    )
+
+    monkeypatch.setattr(db, "SessionLocal", TestingSessionLocal)
+    monkeypatch.setattr(db, "read_router", router)
+    monkeypatch.delitem(app.dependency_overrides, get_session)
+    monkeypatch.delitem(app.dependency_overrides, get_read_session)
+
+    yield router
+
+    for replica_engine in replica_engines:
+        await replica_engine.dispose()
+
+
+@requires_replica
+@pytest.mark.asyncio
+async def test_reads_use_replica(client: AsyncClient, replica_router: ReplicaRouter):
+    """
+    Tests that GET handlers read through `get_read_session` from the replica,
+    except for a client within its read-your-writes window.
+    """
+
+    auth_headers = await register_and_login(client)
+
+    response = await client.post("/receipts/", json=RECEIPT_DATA, headers=auth_headers)
+    assert response.status_code == 200, f"Receipt creation failed: {response.json()}"
+    replicated = response.json()
+
+    await replicate()
+
+    # Not replicated yet
+    response = await client.post("/receipts/", json=RECEIPT_DATA, headers=auth_headers)
+    assert response.status_code == 200, f"Receipt creation failed: {response.json()}"
+    lagging = response.json()
+
+    response = await client.get(f"/receipts/{lagging['id']}", headers=auth_headers)
+    assert response.status_code == 200, "Writer must read its own writes from the primary!"
+
+    # Window is over
+    await asyncio.sleep(WINDOW + 0.05)
+
+    response = await client.get("/receipts/", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["total"] == 1, "List must be read from the replica!"
+    assert response.json()["results"] == [replicated]
+
+    response = await client.get(f"/receipts/{replicated['id']}", headers=auth_headers)
+    assert response.status_code == 200 and response.json() == replicated
+
+    response = await client.get(f"/receipts/{lagging['id']}", headers=auth_headers)
+    assert response.status_code == 404, "Receipt missing on the replica must not be found!"
+
+
+@requires_replica
+@pytest.mark.asyncio
+async def test_replica_rejects_writes(replica_router: ReplicaRouter):
+    """
+    Tests that sessions of replica engines are read-only (`default_transaction_read_only`).
+    """
+
+    await replicate()
+
+    async with replica_router.replicas[0]() as session:
+        # Reads work
+        await session.execute(select(Receipt.id).limit(1))
+
+        with pytest.raises(DBAPIError, match="read-only transaction"):
+            await session.execute(update(Receipt).values(total=0))
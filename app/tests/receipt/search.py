@@ -0,0 +1,102 @@
+# coding=utf-8
+
+from sqlalchemy import text
+from sqlalchemy.future import select
+
+from app.funcs.receipt.funcs import receipt_filters
+from app.funcs.receipt.search import TITLE_INDEX, create_title_index, trigram_available
+from app.models import Receipt
+
+from ..base import *
+from .get_receipts import register_and_login
+
+
+async def create_receipts(client: AsyncClient, auth_headers: dict, titles: list[list[str]]) -> list[int]:
+    """
+    Creates a receipt of every list of product titles and returns their IDs.
+    """
+
+    receipt_ids = []
+
+    for receipt_titles in titles:
+        response = await client.post(
+            "/receipts/",
+            json={
+                "products": [{"title": title, "price": 5, "quantity": 1} for title in receipt_titles],
+                "payment": {"type": "cash", "amount": 100},
+            },
+            headers=auth_headers,
+        )
+        assert response.status_code == 200, f"Receipt creation failed: {response.json()}"
+        receipt_ids.append(response.json()["id"])
+
+    return receipt_ids
+
+
+@pytest.mark.asyncio
+async def test_product_query(client: AsyncClient, db_session: AsyncSession):
+    """
+    Tests the receipt list filtered by product titles.
+    """
+
+    auth_headers = await register_and_login(client)
+    receipt_ids = await create_receipts(client, auth_headers, [
+        ["Phone Case Black", "Charger"],
+        ["Charger"],
+        ["USB Cable", "phone case red"],
+        ["100% Cotton Bag"],
+    ])
+
+    # Another merchant sells the same product
+    await create_receipts(client, await register_and_login(client), [["Phone Case Black"]])
+
+    response = await client.get("/receipts/", params={"product_query": "PHONE case"}, headers=auth_headers)
+    assert response.status_code == 200, f"Failed to retrieve receipts: {response.json()}"
+    assert [receipt["id"] for receipt in response.json()["results"]] == [receipt_ids[0], receipt_ids[2]]
+    assert response.json()["results"][0]["products"][1]["title"] == "Charger", "All products must be returned!"
+
+    # Wildcards are matched literally
+    response = await client.get("/receipts/", params={"product_query": "0% C"}, headers=auth_headers)
+    assert [receipt["id"] for receipt in response.json()["results"]] == [receipt_ids[3]]
+    response = await client.get("/receipts/", params={"product_query": "C_ble"}, headers=auth_headers)
+    assert response.json()["total"] == 0
+    response = await client.get("/receipts/", params={"product_query": "g/x"}, headers=auth_headers)
+    assert response.json()["total"] == 0
+
+    # Combined with other filters
+    response = await client.get(
+        "/receipts/",
+        params={"product_query": "charger", "payment_type": "card"},
+        headers=auth_headers,
+    )
+    assert response.json()["total"] == 0
+
+    response = await client.get("/receipts/", params={"product_query": "ph"}, headers=auth_headers)
+    assert response.status_code == 422, "Too short searches must be rejected!"
+
+
+@pytest.mark.asyncio
+async def test_product_query_uses_trigram_index(db_session: AsyncSession):
+    """
+    Tests that titles are searched through the trigram index, and lines of matched products only are read.
+    """
+
+    async with TEST_ENGINE.connect() as connection:
+        if not await connection.run_sync(trigram_available):
+            pytest.skip("pg_trgm is not available")
+
+        await connection.run_sync(create_title_index)
+        await connection.commit()
+
+    query = select(Receipt.id).where(*receipt_filters(user_id=1, product_query="Phone Case")).compile(
+        dialect=TEST_ENGINE.dialect,
+        compile_kwargs={"literal_binds": True},
+    )
+
+    # Tables of the tests are tiny, sequential scans would win
+    await db_session.execute(text("SET LOCAL enable_seqscan = off"))
+    plan = "\n".join(await db_session.scalars(text(f"EXPLAIN {query}")))
+    await db_session.rollback()
+
+    assert TITLE_INDEX in plan, f"Titles must be searched by the trigram index!\n{plan}"
+    assert "ix_receipt_product_product_id" in plan, f"Lines must be found by product!\n{plan}"
@@ -0,0 +1,128 @@
+# coding=utf-8
+
+import asyncio
+
+from prometheus_client import REGISTRY
+
+import app.funcs.receipt.funcs as funcs
+from app.cache import RESPONSE_CACHE
+from app.singleflight import SingleFlight
+
+from ..base import *
+from .get_receipts import register_and_login
+
+
+@pytest.mark.asyncio
+async def test_single_flight():
+    """
+    Tests that concurrent calls with a key share one call, its exceptions, and survive its cancellation.
+    """
+
+    flights = SingleFlight("test")
+    calls = []
+
+    async def slow(result):
+        calls.append(result)
+        await asyncio.sleep(0.05)
+
+        if isinstance(result, Exception):
+            raise result
+
+        return result
+
+    results = await asyncio.gather(*(flights.run("a", lambda: slow("A")) for _ in range(10)), flights.run("b", lambda: slow("B")))
+    assert results == ["A"] * 10 + ["B"] and calls == ["A", "B"], "Calls with a key must run once!"
+    assert flights.flights == {}
+
+    # Later calls run again
+    assert await flights.run("a", lambda: slow("A2")) == "A2"
+
+    # Exceptions are shared
+    error = ValueError("failed")
+    results = await asyncio.gather(*(flights.run("c", lambda: slow(error)) for _ in range(3)), return_exceptions=True)
+    assert results == [error] * 3 and calls.count(error) == 1
+
+    # A cancelled first caller doesn't fail the others
+    calls.clear()
+    first = asyncio.create_task(flights.run("d", lambda: slow("D")))
+    await asyncio.sleep(0.01)
+    second = asyncio.create_task(flights.run("d", lambda: slow("D")))
+    await asyncio.sleep(0.01)
+    first.cancel()
+
+    assert await second == "D" and calls == ["D", "D"]
+    assert first.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_coalesced_requests(client: AsyncClient, db_session: AsyncSession, monkeypatch):
+    """
+    Tests that identical concurrent requests of a receipt text & of a list are served by one read.
+    """
+
+    if not RESPONSE_CACHE.settings.single_flight:
+        pytest.skip("Single-flight is off")
+
+    calls = {"get_receipt_text": 0, "get_receipts": 0}
+    operations = {"get_receipt_text": "text", "get_receipts": "receipts"}
+    burst = {"size": 1}
+
+    def joined(name):
+        return REGISTRY.get_sample_value("easycheck_coalesced_requests_total", {"operation": operations[name]}) or 0
+
+    for name in calls:
+        def counted(function, name=name):
+            async def wrapper(**kwargs):
+                calls[name] += 1
+                start = joined(name)
+
+                # Waits until the other requests of the burst joined (or gave up waiting)
+                for _ in range(200):
+                    if joined(name) - start >= burst["size"] - 1:
+                        break
+
+                    await asyncio.sleep(0.01)
+
+                return await function(**kwargs)
+
+            return wrapper
+
+        monkeypatch.setattr(funcs, name, counted(getattr(funcs, name)))
+
+    auth_headers = await register_and_login(client)
+    response = await client.post(
+        "/receipts/",
+        json={"products": [{"title": "Coffee", "price": 2.50, "quantity": 2}], "payment": {"type": "cash", "amount": 10}},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200, f"Receipt creation failed: {response.json()}"
+    receipt_id = response.json()["id"]
+
+    async def get_own_session():
+        # Concurrent requests can't share the session of the test
+        async with TestingSessionLocal() as session:
+            yield session
+
+    monkeypatch.setitem(app.dependency_overrides, get_session, get_own_session)
+    monkeypatch.setitem(app.dependency_overrides, get_read_session, get_own_session)
+
+    burst["size"] = 20
+    responses = await asyncio.gather(*(client.get(f"/receipts/{receipt_id}/text") for _ in range(20)))
+    assert all(response.status_code == 200 for response in responses)
+    assert len({response.text for response in responses}) == 1
+    assert calls["get_receipt_text"] == 1, "Identical texts must be rendered once!"
+
+    # Other widths are other reads
+    burst["size"] = 5
+    responses = await asyncio.gather(*(client.get(f"/receipts/{receipt_id}/text", params={"width": 40}) for _ in range(5)))
+    assert calls["get_receipt_text"] == 2
+
+    burst["size"] = 20
+    responses = await asyncio.gather(*(client.get("/receipts/", params={"on_page": 5}, headers=auth_headers) for _ in range(20)))
+    assert all(response.json()["total"] == 1 for response in responses)
+    assert calls["get_receipts"] == 1, "Identical pages must be read once!"
+
+    # Missing receipts fail all callers
+    burst["size"] = 5
+    responses = await asyncio.gather(*(client.get(f"/receipts/{receipt_id + 1000}/text") for _ in range(5)))
+    assert [response.status_code for response in responses] == [404] * 5
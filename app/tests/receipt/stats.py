@@ -0,0 +1,112 @@
+# coding=utf-8
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete
+
+from app.models import ProductDailyStats, ReceiptDailyStats
+from app.rollups import rebuild_stats
+
+from ..base import *
+from .get_receipts import register_and_login
+
+
+@pytest.mark.asyncio
+async def test_receipt_stats(client: AsyncClient, db_session: AsyncSession):
+    """
+    Tests sales by day & month maintained on receipt creation, and that a rebuild gives the same sales.
+    """
+
+    auth_headers = await register_and_login(client)
+    products = [
+        {"title": "Coffee", "price": 2.50, "quantity": 2},
+        {"title": "Croissant", "price": 1.85, "quantity": 3},
+    ]
+
+    for payment in ({"type": "cash", "amount": 20}, {"type": "cash", "amount": 15}, {"type": "card", "amount": 10.55}):
+        response = await client.post("/receipts/", json={"products": products, "payment": payment}, headers=auth_headers)
+        assert response.status_code == 200, f"Receipt creation failed: {response.json()}"
+
+    today = datetime.utcnow().date()
+    expected = [
+        {"date": today.isoformat(), "payment_type": "card", "receipts": 1,
+         "total": "10.55", "payment_amount": "10.55", "rest": "0.00"},
+        {"date": today.isoformat(), "payment_type": "cash", "receipts": 2,
+         "total": "21.10", "payment_amount": "35.00", "rest": "13.90"},
+    ]
+
+    response = await client.get("/receipts/stats", params={"start_date": today.isoformat()}, headers=auth_headers)
+    assert response.status_code == 200, f"Failed to retrieve stats: {response.json()}"
+    assert response.json() == {"period": "day", "results": expected}
+
+    response = await client.get("/receipts/stats", params={"period": "month", "payment_type": "cash"}, headers=auth_headers)
+    assert response.status_code == 200, f"Failed to retrieve stats: {response.json()}"
+    assert response.json()["results"] == [{**expected[1], "date": today.replace(day=1).isoformat()}]
+
+    # Other days & users
+    response = await client.get("/receipts/stats", params={"end_date": (today - timedelta(days=1)).isoformat()}, headers=auth_headers)
+    assert response.json()["results"] == []
+    response = await client.get("/receipts/stats", headers=await register_and_login(client))
+    assert response.json()["results"] == []
+
+    # Rebuilt from receipts
+    await db_session.execute(delete(ReceiptDailyStats))
+    await db_session.execute(delete(ProductDailyStats))
+    await db_session.commit()
+
+    async with TEST_ENGINE.connect() as connection:
+        assert await connection.run_sync(rebuild_stats, today, today + timedelta(days=1)) == 2 + 2
+
+    response = await client.get("/receipts/stats", headers=auth_headers)
+    assert response.json() == {"period": "day", "results": expected}
+
+
+@pytest.mark.asyncio
+async def test_top_products(client: AsyncClient, db_session: AsyncSession):
+    """
+    Tests best selling products by revenue & units maintained on receipt creation, and their rebuild.
+    """
+
+    auth_headers = await register_and_login(client)
+    receipts = [
+        [{"title": "Coffee", "price": 2.50, "quantity": 2}, {"title": "Cake", "price": 6.00, "quantity": 1}],
+        [{"title": "Coffee", "price": 2.50, "quantity": 1}, {"title": "Coffee", "price": 2.50, "quantity": 1}],
+        [{"title": "Tea", "price": 1.50, "quantity": 1}],
+    ]
+
+    for products in receipts:
+        response = await client.post(
+            "/receipts/",
+            json={"products": products, "payment": {"type": "cash", "amount": 20}},
+            headers=auth_headers,
+        )
+        assert response.status_code == 200, f"Receipt creation failed: {response.json()}"
+
+    coffee = {"title": "Coffee", "lines": 3, "quantity": 4, "revenue": "10.00"}
+    cake = {"title": "Cake", "lines": 1, "quantity": 1, "revenue": "6.00"}
+    tea = {"title": "Tea", "lines": 1, "quantity": 1, "revenue": "1.50"}
+
+    response = await client.get("/receipts/stats/products", headers=auth_headers)
+    assert response.status_code == 200, f"Failed to retrieve top products: {response.json()}"
+    assert response.json() == {"order_by": "revenue", "results": [coffee, cake, tea]}
+
+    response = await client.get("/receipts/stats/products", params={"order_by": "quantity", "limit": 2}, headers=auth_headers)
+    assert response.json()["results"] == [coffee, cake], "Ties must be ranked by revenue!"
+
+    today = datetime.utcnow().date()
+    response = await client.get(
+        "/receipts/stats/products",
+        params={"end_date": (today - timedelta(days=1)).isoformat()},
+        headers=auth_headers,
+    )
+    assert response.json()["results"] == []
+
+    # Rebuilt from receipt lines
+    await db_session.execute(delete(ProductDailyStats))
+    await db_session.commit()
+
+    async with TEST_ENGINE.connect() as connection:
+        await connection.run_sync(rebuild_stats, today, today + timedelta(days=1))
+
+    response = await client.get("/receipts/stats/products", headers=auth_headers)
+    assert response.json()["results"] == [coffee, cake, tea]
@@ -0,0 +1,110 @@
+# coding=utf-8
+
+from decimal import Decimal
+
+from sqlalchemy import text
+from sqlalchemy.future import select
+
+from app.funcs.receipt.sync import format_token, parse_token
+from app.models import Receipt
+
+from ..base import *
+from .get_receipts import register_and_login
+
+
+@pytest.mark.asyncio
+async def test_receipt_changes(client: AsyncClient, db_session: AsyncSession):
+    """
+    Tests syncing receipts after a token: pages of new receipts, the next token,
+    and receipts held back while an older transaction is running.
+    """
+
+    auth_headers = await register_and_login(client)
+    receipt_ids = []
+
+    for quantity in range(1, 6):
+        response = await client.post(
+            "/receipts/",
+            json={"products": [{"title": "Coffee", "price": 2.50, "quantity": quantity}], "payment": {"type": "card", "amount": 50}},
+            headers=auth_headers,
+        )
+        assert response.status_code == 200, f"Receipt creation failed: {response.json()}"
+        receipt_ids.append(response.json()["id"])
+
+    # Receipts of other users are not synced
+    other_headers = await register_and_login(client)
+    response = await client.post(
+        "/receipts/",
+        json={"products": [{"title": "Tea", "price": 1.50, "quantity": 1}], "payment": {"type": "cash", "amount": 5}},
+        headers=other_headers,
+    )
+    assert response.status_code == 200
+
+    response = await client.get("/receipts/changes", params={"limit": 3}, headers=auth_headers)
+    assert response.status_code == 200, f"Failed to sync: {response.json()}"
+    data = response.json()
+    assert [receipt["id"] for receipt in data["results"]] == receipt_ids[:3]
+    assert parse_token(data["token"])[1] == receipt_ids[2] and data["has_more"] is True
+    assert data["results"][1]["products"] == [{"title": "Coffee", "price": "2.50", "quantity": 2, "total": "5.00"}]
+
+    response = await client.get("/receipts/changes", params={"since": data["token"], "limit": 3}, headers=auth_headers)
+    data = response.json()
+    assert [receipt["id"] for receipt in data["results"]] == receipt_ids[3:]
+    assert parse_token(data["token"])[1] == receipt_ids[-1] and data["has_more"] is False
+    token = data["token"]
+
+    # Nothing new, the token stays
+    response = await client.get("/receipts/changes", params={"since": token}, headers=auth_headers)
+    assert response.json() == {"token": token, "has_more": False, "results": []}
+
+    # A receipt whose transaction commits late (e.g. waiting for a lock) holds back receipts committed meanwhile
+    user_id = await db_session.scalar(select(Receipt.user_id).where(Receipt.id == receipt_ids[0]))
+
+    async with TestingSessionLocal() as slow_session:
+        await slow_session.execute(text("SELECT pg_current_xact_id()"))
+        slow_receipt = Receipt(
+            user_id=user_id,
+            total=Decimal("1.00"),
+            payment_type="cash",
+            payment_amount=Decimal("1.00"),
+            rest=Decimal("0.00"),
+        )
+        slow_session.add(slow_receipt)
+        await slow_session.flush()
+
+        response = await client.post(
+            "/receipts/",
+            json={"products": [{"title": "Coffee", "price": 2.50, "quantity": 1}], "payment": {"type": "card", "amount": 50}},
+            headers=auth_headers,
+        )
+        assert response.status_code == 200
+        fast_id = response.json()["id"]
+        assert fast_id > slow_receipt.id
+
+        response = await client.get("/receipts/changes", params={"since": token}, headers=auth_headers)
+        assert response.json() == {"token": token, "has_more": False, "results": []}, (
+            "Receipts committed after an older running transaction must be held back!"
+        )
+
+        await slow_session.commit()
+
+    response = await client.get("/receipts/changes", params={"since": token}, headers=auth_headers)
+    assert [receipt["id"] for receipt in response.json()["results"]] == [slow_receipt.id, fast_id]
+
+    # Validation
+    response = await client.get("/receipts/changes", params={"limit": 0}, headers=auth_headers)
+    assert response.status_code == 422
+    response = await client.get("/receipts/changes", params={"since": "12-x"}, headers=auth_headers)
+    assert response.status_code == 422
+    response = await client.get("/receipts/changes")
+    assert response.status_code == 401
+
+
+def test_sync_token():
+    """
+    Tests sync tokens, and that bare receipt IDs (tokens of syncs in order of IDs) are still accepted.
+    """
+
+    assert parse_token(format_token(8841395, 1142)) == (8841395, 1142)
+    assert parse_token("1142") == (0, 1142)
+    assert parse_token("0") == (0, 0)
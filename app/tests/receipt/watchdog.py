@@ -0,0 +1,88 @@
+# coding=utf-8
+
+import asyncio
+import logging
+import time
+
+from fastapi.routing import APIRoute
+from prometheus_client import REGISTRY
+from starlette.middleware import Middleware
+
+from app.metrics import MetricsMiddleware
+from app.settings import WatchdogSettings
+from app.watchdog import LoopWatchdog, WatchdogMiddleware
+
+from ..base import *
+
+
+# Defined settings of the tests (blocking for 0.3 s is well above the threshold)
+SETTINGS = WatchdogSettings(enabled=True, interval=0.02, threshold=0.1)
+
+# Defined path of the blocking route
+BLOCKING_PATH = "/tests/watchdog/{seconds}"
+
+
+async def block_loop(seconds: float) -> dict:
+    """
+    Blocks the event loop, like a synchronous call in an async handler.
+    """
+
+    time.sleep(seconds)
+
+    return {"slept": seconds}
+
+
+def use_watchdog(monkeypatch) -> None:
+    """
+    Adds the watchdog middleware where `app.main` puts it when enabled (right inside the metrics middleware),
+    and the blocking route.
+    """
+
+    assert app.user_middleware[0].cls is MetricsMiddleware
+
+    monkeypatch.setattr(app, "user_middleware", [
+        app.user_middleware[0],
+        Middleware(WatchdogMiddleware),
+        *app.user_middleware[1:],
+    ])
+    monkeypatch.setattr(app, "middleware_stack", None)
+    monkeypatch.setattr(app.router, "routes", [*app.router.routes, APIRoute(BLOCKING_PATH, block_loop)])
+
+
+@pytest.mark.asyncio
+async def test_loop_watchdog(client: AsyncClient, monkeypatch, caplog):
+    """
+    Tests that a request blocking the event loop longer than the threshold is observed under its route
+    & logged with the stack of the blocking code.
+    """
+
+    use_watchdog(monkeypatch)
+    caplog.set_level(logging.WARNING, logger="easycheck.watchdog")
+
+    labels = {"route": BLOCKING_PATH}
+    blocked = REGISTRY.get_sample_value("easycheck_event_loop_blocked_seconds_count", labels) or 0
+
+    watchdog = LoopWatchdog(SETTINGS)
+    await watchdog.start()
+
+    try:
+        response = await client.get("/tests/watchdog/0.3")
+        assert response.status_code == 200
+
+        # Reported by the watching thread once the loop is free again
+        for _ in range(100):
+            if REGISTRY.get_sample_value("easycheck_event_loop_blocked_seconds_count", labels):
+                break
+
+            await asyncio.sleep(SETTINGS.interval)
+
+    finally:
+        await watchdog.stop()
+
+    assert REGISTRY.get_sample_value("easycheck_event_loop_blocked_seconds_count", labels) == blocked + 1
+    assert REGISTRY.get_sample_value("easycheck_event_loop_blocked_seconds_sum", labels) >= SETTINGS.threshold
+
+    (record,) = [record for record in caplog.records if record.name == "easycheck.watchdog"]
+    assert record.levelno == logging.WARNING
+    assert f"by route {BLOCKING_PATH}" in record.getMessage()
+    assert "in block_loop" in record.getMessage() and "time.sleep(seconds)" in record.getMessage()
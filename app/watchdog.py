@@ -0,0 +1,185 @@
+# coding=utf-8
+
+import asyncio
+import logging
+import sys
+import threading
+import traceback
+from collections import Counter
+from time import perf_counter
+
+from .metrics import LOOP_LAG_SECONDS, LOOP_BLOCKED_SECONDS, get_route_path
+from .settings import WATCHDOG_SETTINGS, WatchdogSettings
+
+
+# Defined logger
+logger = logging.getLogger("easycheck.watchdog")
+
+# Defined HTTP scopes of requests being served, by their task
+REQUEST_SCOPES: dict[asyncio.Task, dict] = {}
+
+
+class WatchdogMiddleware:
+    """
+    ASGI middleware remembering which request each task serves,
+    so a blocked event loop can be attributed to a route.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            # Lifespan & websockets
+            await self.app(scope, receive, send)
+            return
+
+        task = asyncio.current_task()
+        REQUEST_SCOPES[task] = scope
+
+        try:
+            await self.app(scope, receive, send)
+
+        finally:
+            REQUEST_SCOPES.pop(task, None)
+
+
+class LoopWatchdog:
+    """
+    Detects callbacks that block the event loop.
+
+    A heartbeat coroutine wakes up every `interval` seconds and records the loop lag.
+    A separate thread checks the heartbeat; when it is late by more than `threshold`,
+    the thread samples the stack of the loop thread (showing the blocking code) and,
+    once the loop is free again, logs the blocked period with its route and stack samples.
+
+    Attributes:
+        settings (WatchdogSettings): Interval, threshold and number of stack samples.
+    """
+
+    def __init__(self, settings: WatchdogSettings = WATCHDOG_SETTINGS):
+        self.settings = settings
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.loop_thread_id: int | None = None
+        self.last_beat = perf_counter()
+        self.heartbeat_task: asyncio.Task | None = None
+        self.thread: threading.Thread | None = None
+        self.stopped = threading.Event()
+
+    async def start(self) -> None:
+        """
+        Starts the heartbeat on the running loop and the watching thread.
+        """
+
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread_id = threading.get_ident()
+        self.last_beat = perf_counter()
+        self.stopped.clear()
+
+        self.heartbeat_task = asyncio.create_task(self.heartbeat())
+        self.thread = threading.Thread(target=self.watch, name="loop-watchdog", daemon=True)
+        self.thread.start()
+
+    async def stop(self) -> None:
+        """
+        Stops the heartbeat and the watching thread.
+        """
+
+        self.stopped.set()
+
+        if self.heartbeat_task is not None:
+            self.heartbeat_task.cancel()
+
+        if self.thread is not None:
+            await asyncio.to_thread(self.thread.join)
+
+    async def heartbeat(self) -> None:
+        """
+        Wakes up regularly, records how late each wake-up was.
+        """
+
+        interval = self.settings.interval
+
+        while True:
+            expected = perf_counter() + interval
+            await asyncio.sleep(interval)
+
+            now = perf_counter()
+            self.last_beat = now
+            LOOP_LAG_SECONDS.observe(max(now - expected, 0.0))
+
+    def get_blocking_route(self) -> str:
+        """
+        Returns the route of the request whose task is currently running on the loop.
+        """
+
+        task = asyncio.current_task(self.loop)
+        scope = REQUEST_SCOPES.get(task) if task is not None else None
+
+        return get_route_path(scope) if scope is not None else "background"
+
+    def sample_stack(self) -> str | None:
+        """
+        Returns the current stack of the loop thread.
+        """
+
+        frame = sys._current_frames().get(self.loop_thread_id)  # noqa
+
+        return "".join(traceback.format_stack(frame)) if frame is not None else None
+
+    def watch(self) -> None:
+        """
+        Runs in a separate thread, samples & reports periods when the heartbeat is late.
+        """
+
+        # Heartbeat is late when it is older than this
+        late_after = self.settings.interval + self.settings.threshold
+        check_every = min(self.settings.interval, self.settings.threshold) / 2
+
+        blocked_since: float | None = None
+        route = "background"
+        samples: Counter[str] = Counter()
+
+        while not self.stopped.wait(check_every):
+            beat = self.last_beat
+            age = perf_counter() - beat
+
+            if age > late_after:
+                # Loop is blocked
+                if blocked_since is None:
+                    blocked_since = beat
+                    route = self.get_blocking_route()
+
+                if sum(samples.values()) < self.settings.max_samples:
+                    stack = self.sample_stack()
+
+                    if stack is not None:
+                        samples[stack] += 1
+
+            elif blocked_since is not None:
+                # Loop is free again => report
+                duration = max(beat - blocked_since - self.settings.interval, 0.0)
+                self.report(route, duration, samples)
+
+                blocked_since = None
+                samples = Counter()
+
+    def report(self, route: str, duration: float, samples: Counter) -> None:
+        """
+        Exports the blocked period to metrics & logs it with its stack samples.
+        """
+
+        LOOP_BLOCKED_SECONDS.labels(route).observe(duration)
+
+        stacks = "\n".join(
+            f"--- {count} sample(s):\n{stack}"
+            for stack, count in samples.most_common()
+        )
+
+        logger.warning(
+            "Event loop blocked for %.3f s (threshold %.3f s) by route %s\n%s",
+            duration,
+            self.settings.threshold,
+            route,
+            stacks,
+        )
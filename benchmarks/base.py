@@ -0,0 +1,88 @@
+# coding=utf-8
+
+import time
+import statistics
+from typing import Awaitable, Callable
+
+
+def percentile(values: list[float], percent: float) -> float:
+    """
+    Returns the given percentile (0-100) of the values, or 0 for an empty list.
+    """
+
+    if not values:
+        # Nothing measured
+        return 0.0
+
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+
+    return ordered[index]
+
+
+def summarize(name: str, durations: list[float], elapsed: float, errors: int = 0) -> dict:
+    """
+    Builds one result row (throughput and latency in milliseconds) from measured durations.
+    """
+
+    return {
+        "name": name,
+        "ops": len(durations),
+        "errors": errors,
+        "ops/s": round(len(durations) / elapsed, 1) if elapsed else 0.0,
+        "mean ms": round(statistics.fmean(durations) * 1000, 2) if durations else 0.0,
+        "p50 ms": round(percentile(durations, 50) * 1000, 2),
+        "p99 ms": round(percentile(durations, 99) * 1000, 2),
+    }
+
+
+def print_table(rows: list[dict]) -> None:
+    """
+    Prints result rows as an aligned plain-text table.
+    """
+
+    if not rows:
+        # Nothing to print
+        return
+
+    columns = list(rows[0].keys())
+    widths = {
+        column: max(len(str(column)), *(len(str(row.get(column, ""))) for row in rows))
+        for column in columns
+    }
+
+    print("  ".join(f"{column: <{widths[column]}}" for column in columns))
+    print("  ".join("-" * widths[column] for column in columns))
+
+    for row in rows:
+        print("  ".join(f"{str(row.get(column, '')): <{widths[column]}}" for column in columns))
+
+
+def measure(func: Callable[[], object], repeat: int) -> list[float]:
+    """
+    Calls a synchronous function `repeat` times and returns the duration of each call in seconds.
+    """
+
+    durations: list[float] = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+
+    return durations
+
+
+async def measure_async(func: Callable[[], Awaitable[object]], repeat: int) -> list[float]:
+    """
+    Awaits a coroutine function `repeat` times and returns the duration of each call in seconds.
+    """
+
+    durations: list[float] = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await func()
+        durations.append(time.perf_counter() - start)
+
+    return durations
@@ -0,0 +1,75 @@
+# coding=utf-8
+
+"""
+JSON vs MessagePack vs CBOR benchmark of a page of receipts.
+
+Serializes the same page (built as by `build_receipts`) the way the receipt endpoints do
+for each negotiated media type, and prints the body size and the encode & decode time
+of each format (binary formats with money in cents and as strings). No database is needed.
+
+Usage:
+    python -m benchmarks.binary_formats --receipts 100 --products 5 --repeat 500
+"""
+
+import argparse
+import json
+
+from app.routes.negotiation import JSON, MSGPACK, CBOR, DECODERS, render
+from app.routes.receipt.schema import ReceiptsResponseSchema
+from app.routes.receipt.serialize import RECEIPTS_ADAPTER
+
+from .base import measure, print_table
+from .serialization import make_rows, make_orm_page
+
+
+# Defined variants: name => (media type, money)
+VARIANTS = {
+    "json": (JSON, "string"),
+    "msgpack (cents)": (MSGPACK, "cents"),
+    "msgpack (strings)": (MSGPACK, "string"),
+    "cbor (cents)": (CBOR, "cents"),
+    "cbor (strings)": (CBOR, "string"),
+}
+
+
+def main() -> None:
+    """
+    Prints size, encode & decode time of each format.
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--receipts", type=int, default=100, help="Receipts on the page.")
+    parser.add_argument("--products", type=int, default=5, help="Products per receipt.")
+    parser.add_argument("--repeat", type=int, default=500, help="Encodings & decodings per format.")
+    args = parser.parse_args()
+
+    page = RECEIPTS_ADAPTER.validate_python(
+        make_orm_page(*make_rows(args.receipts, args.products)),
+        from_attributes=True,
+    )
+    assert isinstance(page, ReceiptsResponseSchema)
+
+    rows = []
+    json_size = 0
+
+    for name, (media_type, money) in VARIANTS.items():
+        body = render(RECEIPTS_ADAPTER, page, media_type, money).body
+        decode = json.loads if media_type == JSON else DECODERS[media_type]
+        json_size = json_size or len(body)
+
+        encode_durations = measure(lambda: render(RECEIPTS_ADAPTER, page, media_type, money), args.repeat)
+        decode_durations = measure(lambda: decode(body), args.repeat)
+
+        rows.append({
+            "format": name,
+            "bytes": len(body),
+            "vs json": f"{len(body) / json_size:.0%}",
+            "encode ms": round(sum(encode_durations) / len(encode_durations) * 1000, 3),
+            "decode ms": round(sum(decode_durations) / len(decode_durations) * 1000, 3),
+        })
+
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# coding=utf-8
+
+"""
+Compression benchmark of receipt responses.
+
+Compresses a page of receipts (JSON, as sent by `GET /receipts/`) and a text receipt
+with every codec & level supported by the compression middleware, and prints
+the compression ratio and throughput (MB/s of the uncompressed body) of each.
+No database is needed.
+
+Usage:
+    python -m benchmarks.compression --receipts 100 --products 5 --repeat 50
+"""
+
+import argparse
+from datetime import datetime
+from decimal import Decimal
+
+from app.compression import CODECS
+from app.funcs.receipt.funcs import get_total_text
+from app.models import Receipt, ReceiptProduct, Product, User
+
+from .base import measure, print_table
+from .serialization import make_rows, fast_path
+
+
+# Defined levels to compare, by codec
+LEVELS = {
+    "gzip": (1, 6, 9),
+    "br": (1, 4, 11),
+    "zstd": (1, 3, 9),
+}
+
+
+def make_text_receipt(products: int) -> str:
+    """
+    Renders a text receipt with the given number of products.
+    """
+
+    receipt = Receipt(
+        id=1,
+        total=Decimal("0.00"),
+        rest=Decimal("10.00"),
+        created_at=datetime(2025, 2, 16, 16, 30, 47),
+        payment_type="cash",
+        payment_amount=Decimal("0.00"),
+        products=[],
+        user=User(first_name="Test", last_name="User"),
+    )
+
+    for index in range(products):
+        product = ReceiptProduct(
+            product=Product(title=f"Product {index} Phone Case"),
+            price=Decimal(f"{index + 1}.99"),
+            quantity=2,
+        )
+        receipt.products.append(product)
+        receipt.total += product.price * product.quantity
+
+    receipt.payment_amount = receipt.total + receipt.rest
+
+    return get_total_text(receipt, 40)
+
+
+def compress(codec: str, level: int, body: bytes) -> bytes:
+    """
+    Compresses the body the way the middleware compresses a whole response.
+    """
+
+    compressor = CODECS[codec][0](level)
+
+    return compressor.compress(body) + compressor.finish()
+
+
+def main() -> None:
+    """
+    Prints ratio & throughput of each codec and level.
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--receipts", type=int, default=100, help="Receipts on the page.")
+    parser.add_argument("--products", type=int, default=5, help="Products per receipt (and lines of the text receipt x10).")
+    parser.add_argument("--repeat", type=int, default=50, help="Compressions per codec & level.")
+    args = parser.parse_args()
+
+    bodies = {
+        "receipts page": fast_path(*make_rows(args.receipts, args.products)),
+        "text receipt": make_text_receipt(args.products * 10).encode("utf-8"),
+    }
+
+    rows = []
+
+    for body_name, body in bodies.items():
+        for codec, levels in LEVELS.items():
+            for level in levels:
+                size = len(compress(codec, level, body))
+                durations = measure(lambda: compress(codec, level, body), args.repeat)
+
+                rows.append({
+                    "body": body_name,
+                    "codec": f"{codec}:{level}",
+                    "bytes": len(body),
+                    "compressed": size,
+                    "ratio": round(len(body) / size, 2),
+                    "MB/s": round(len(body) * len(durations) / sum(durations) / 1e6, 1),
+                    "mean ms": round(sum(durations) / len(durations) * 1000, 3),
+                })
+
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# coding=utf-8
+
+"""
+Money mode benchmark: `Decimal`/`Numeric` vs integer cents.
+
+Creates receipts and reads pages of them through `create_receipt` and `get_receipts`
+in both money modes ("numeric" and "cents") and prints the throughput of each,
+plus the pure arithmetic & text formatting cost. Runs against the database from .env
+(migrated to the latest revision); a throwaway user is created for the run.
+
+Usage:
+    python -m benchmarks.money --receipts 500 --products 5 --pages 200
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from dataclasses import replace
+from decimal import Decimal
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+import app.funcs.receipt.funcs as receipt_funcs
+import app.funcs.receipt.pg_json as pg_json
+from app.db import build_engine
+from app.models import User
+from app.money import to_cents, format_cents
+from app.routes.receipt.schema import ReceiptRequestSchema
+from app.settings import DB_SETTINGS, RECEIPT_SETTINGS
+
+from .base import measure, measure_async, summarize, print_table
+
+
+def make_receipt_data(products: int) -> ReceiptRequestSchema:
+    """
+    Builds a receipt request with the given number of products.
+    """
+
+    return ReceiptRequestSchema(
+        products=[
+            {"title": f"Product {index}", "price": Decimal(f"{index * 7 + 1}.99"), "quantity": index + 1}
+            for index in range(products)
+        ],
+        payment={"type": "cash", "amount": Decimal("100000.00")},
+    )
+
+
+def set_money_mode(mode: str) -> None:
+    """
+    Switches the money mode of the receipt functions.
+    """
+
+    settings = replace(RECEIPT_SETTINGS, money_mode=mode)
+    receipt_funcs.RECEIPT_SETTINGS = settings
+    pg_json.RECEIPT_SETTINGS = settings
+
+
+def arithmetic_rows(receipt_data: ReceiptRequestSchema, repeat: int) -> list[dict]:
+    """
+    Measures computing & formatting the receipt total with Decimals and with cents.
+    """
+
+    prices = [product.price for product in receipt_data.products]
+    quantities = [product.quantity for product in receipt_data.products]
+    prices_cents = [to_cents(price) for price in prices]
+
+    def decimals() -> str:
+        return receipt_funcs.format_number(sum(price * quantity for price, quantity in zip(prices, quantities)))
+
+    def cents() -> str:
+        return format_cents(sum(price * quantity for price, quantity in zip(prices_cents, quantities)))
+
+    assert decimals() == cents(), "Money modes disagree!"
+
+    rows = []
+
+    for name, func in (("total + format (Decimal)", decimals), ("total + format (cents)", cents)):
+        durations = measure(func, repeat)
+        rows.append(summarize(name, durations, sum(durations)))
+
+    return rows
+
+
+async def main() -> None:
+    """
+    Runs create & list in both money modes and prints a result table.
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--receipts", type=int, default=500, help="Receipts created per mode.")
+    parser.add_argument("--products", type=int, default=5, help="Products per receipt.")
+    parser.add_argument("--pages", type=int, default=200, help="Pages of 10 receipts read per mode.")
+    args = parser.parse_args()
+
+    engine = build_engine(DB_SETTINGS)
+    session_factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    receipt_data = make_receipt_data(args.products)
+
+    async with session_factory() as session:
+        user = User(first_name="Bench", last_name="User", login=f"bench_{uuid.uuid4().hex[:12]}", hashed_password="-")
+        session.add(user)
+        await session.commit()
+        user_id = user.id
+
+    rows = arithmetic_rows(receipt_data, 10000)
+
+    for mode in ("numeric", "cents"):
+        set_money_mode(mode)
+
+        async def create() -> None:
+            async with session_factory() as db_session:
+                await receipt_funcs.create_receipt(user_id=user_id, db_session=db_session, receipt_data=receipt_data)
+
+        async def list_page() -> None:
+            async with session_factory() as db_session:
+                await receipt_funcs.get_receipts(db_session=db_session, user_id=user_id, page=0, on_page=10)
+
+        started = time.perf_counter()
+        durations = await measure_async(create, args.receipts)
+        rows.append(summarize(f"create_receipt ({mode})", durations, time.perf_counter() - started))
+
+        started = time.perf_counter()
+        durations = await measure_async(list_page, args.pages)
+        rows.append(summarize(f"get_receipts ({mode})", durations, time.perf_counter() - started))
+
+    await engine.dispose()
+
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
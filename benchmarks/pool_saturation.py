@@ -0,0 +1,132 @@
+# coding=utf-8
+
+"""
+Pool-saturation load test.
+
+Runs many more concurrent "requests" than the pool has connections, each one holding
+a connection for a short server-side sleep, and reports throughput, latency and the
+number of failed checkouts for every engine/pool knob in `DatabaseSettings`.
+
+Usage:
+    python -m benchmarks.pool_saturation --concurrency 100 --requests 1000 --hold 0.01
+"""
+
+import argparse
+import asyncio
+import time
+from dataclasses import replace
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.db import build_engine, set_statement_timeout
+from app.settings import DB_SETTINGS, DatabaseSettings
+
+from .base import summarize, print_table
+
+
+# Defined variants: each one changes a single knob of the production defaults
+VARIANTS: list[tuple[str, dict]] = [
+    ("defaults", {}),
+    ("pool_size=2", {"pool_size": 2, "max_overflow": 0}),
+    ("pool_size=30", {"pool_size": 30}),
+    ("max_overflow=0", {"max_overflow": 0}),
+    ("max_overflow=20", {"max_overflow": 20}),
+    ("pool_timeout=0.05", {"pool_size": 2, "max_overflow": 0, "pool_timeout": 0.05}),
+    ("pool_pre_ping=off", {"pool_pre_ping": False}),
+    ("pool_recycle=1", {"pool_recycle": 1}),
+    ("prepared_cache=0", {"prepared_statement_cache_size": 0}),
+    ("statement_timeout=5ms", {"statement_timeout": 5}),
+    ("echo=on", {"echo": True}),
+]
+
+
+async def run_variant(
+        name: str,
+        settings: DatabaseSettings,
+        concurrency: int,
+        requests: int,
+        hold: float,
+        endpoint_timeout: int | None = None,
+) -> dict:
+    """
+    Runs the load against an engine built from the given settings and returns one result row.
+    """
+
+    engine = build_engine(settings)
+    session_factory = async_sessionmaker(bind=engine, class_=AsyncSession)
+    semaphore = asyncio.Semaphore(concurrency)
+    durations: list[float] = []
+    errors = 0
+
+    async def one_request() -> None:
+        nonlocal errors
+
+        async with semaphore:
+            start = time.perf_counter()
+
+            try:
+                async with session_factory() as session:
+                    if endpoint_timeout is not None:
+                        # Same path as endpoints with their own timeout
+                        set_statement_timeout(session, endpoint_timeout)
+
+                    # Typical query + time spent holding the connection
+                    await session.execute(text("SELECT pg_sleep(:hold)"), {"hold": hold})
+                    await session.execute(text("SELECT 1"))
+
+                durations.append(time.perf_counter() - start)
+
+            except Exception:  # noqa
+                # Pool timeout, statement timeout or connection error
+                errors += 1
+
+    # Warm up the pool so connection setup is not measured
+    async with engine.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one_request() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+
+    # Pool state at the end of the run
+    row = summarize(name, durations, elapsed, errors)
+    row["pool"] = engine.sync_engine.pool.status().split("Current ")[-1]
+
+    await engine.dispose()
+
+    return row
+
+
+async def main() -> None:
+    """
+    Runs all variants one by one and prints a result table.
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=100, help="Concurrent requests in flight.")
+    parser.add_argument("--requests", type=int, default=1000, help="Total requests per variant.")
+    parser.add_argument("--hold", type=float, default=0.01, help="Seconds each request holds a connection.")
+    args = parser.parse_args()
+
+    rows = []
+
+    for name, overrides in VARIANTS:
+        settings = replace(DB_SETTINGS, **overrides)
+        rows.append(await run_variant(name, settings, args.concurrency, args.requests, args.hold))
+
+    # Per-endpoint timeout applied with SET LOCAL on every transaction
+    rows.append(await run_variant(
+        "endpoint_timeout=5000",
+        DB_SETTINGS,
+        args.concurrency,
+        args.requests,
+        args.hold,
+        endpoint_timeout=5000,
+    ))
+
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
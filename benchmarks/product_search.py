@@ -0,0 +1,111 @@
+# coding=utf-8
+
+"""
+Benchmark of the receipt search by product title (`product_query`).
+
+Fills scratch copies of `product`, `receipt` & `receipt_product` with the history of one merchant
+(among other merchants), then times the search query of the list (titles matched by ILIKE, receipts
+found by an EXISTS semi-join on lines of the matched products): first scanning titles of the merchant,
+then through the trigram index of titles (skipped when the server has no `pg_trgm`).
+Runs against the database from .env; scratch tables are dropped at the end.
+
+Usage:
+    python -m benchmarks.product_search --receipts 1000000 --products 20000 --repeat 20
+"""
+
+import argparse
+import asyncio
+
+from sqlalchemy import text
+
+from app.db import build_engine
+from app.settings import DB_SETTINGS
+
+from .base import measure_async, summarize, print_table
+
+
+# Defined scratch tables (10 merchants, the searched one is merchant 1)
+SETUP = [
+    "CREATE TABLE bench_search_products (id serial PRIMARY KEY, user_id int, title varchar, UNIQUE (user_id, title))",
+    "INSERT INTO bench_search_products (user_id, title)"
+    " SELECT 1 + n % 10, (ARRAY['Phone', 'Laptop', 'Tablet', 'Watch', 'Camera'])[1 + n % 5]"
+    " || (ARRAY[' Case', ' Charger', ' Cable', ' Stand', ' Screen Guard'])[1 + n / 5 % 5] || ' model ' || n"
+    " FROM generate_series(1, :products) AS n",
+    "CREATE TABLE bench_search_receipts (id serial PRIMARY KEY, user_id int, created_at timestamp)",
+    "INSERT INTO bench_search_receipts (user_id, created_at)"
+    " SELECT 1 + n % 10, timestamp '2025-01-01' + n * interval '1 minute' FROM generate_series(1, :receipts) AS n",
+    "CREATE INDEX ON bench_search_receipts (user_id, created_at)",
+    "CREATE TABLE bench_search_lines (id serial PRIMARY KEY, receipt_id int, product_id int, receipt_created_at timestamp)",
+    "INSERT INTO bench_search_lines (receipt_id, product_id, receipt_created_at)"
+    # Products of the receipt's merchant (product N belongs to merchant 1 + N % 10, like receipt N)
+    " SELECT r.id, 10 * (1 + (r.id * 7 + line * 13) % (:products / 10 - 1)) + r.id % 10, r.created_at"
+    " FROM bench_search_receipts r CROSS JOIN generate_series(1, 3) AS line",
+    "CREATE INDEX ON bench_search_lines (receipt_id)",
+    "CREATE INDEX ON bench_search_lines (product_id)",
+    "ANALYZE bench_search_products",
+    "ANALYZE bench_search_receipts",
+    "ANALYZE bench_search_lines",
+]
+
+# Defined search query of the list (first page & count, like `get_receipts`)
+QUERY = (
+    "SELECT count(*) OVER (), id FROM bench_search_receipts r WHERE r.user_id = 1 AND EXISTS ("
+    " SELECT FROM bench_search_lines l WHERE l.receipt_id = r.id AND l.receipt_created_at = r.created_at"
+    " AND l.product_id IN (SELECT id FROM bench_search_products WHERE user_id = 1 AND title ILIKE :pattern)"
+    ") ORDER BY id LIMIT 10"
+)
+
+
+async def main() -> None:
+    """
+    Builds the scratch tables and prints search times without & with the trigram index.
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--receipts", type=int, default=1000000, help="Receipts of all merchants (3 lines each).")
+    parser.add_argument("--products", type=int, default=20000, help="Products of all merchants.")
+    parser.add_argument("--query", default="Phone Cable model 1", help="The searched text.")
+    parser.add_argument("--repeat", type=int, default=20, help="Searches per setup.")
+    args = parser.parse_args()
+
+    engine = build_engine(DB_SETTINGS)
+    params = {"receipts": args.receipts, "products": args.products}
+    scratch_tables = "bench_search_lines, bench_search_receipts, bench_search_products"
+    rows = []
+
+    try:
+        async with engine.begin() as connection:
+            await connection.execute(text(f"DROP TABLE IF EXISTS {scratch_tables}"))
+
+            for statement in SETUP:
+                await connection.execute(text(statement), params)
+
+        async with engine.connect() as connection:
+            async def search() -> None:
+                await connection.execute(text(QUERY), {"pattern": f"%{args.query}%"})
+
+            rows.append(summarize("title scan", durations := await measure_async(search, args.repeat), sum(durations)))
+
+            if await connection.scalar(text("SELECT EXISTS (SELECT FROM pg_available_extensions WHERE name = 'pg_trgm')")):
+                await connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                await connection.execute(text("CREATE INDEX ON bench_search_products USING gin (title gin_trgm_ops)"))
+                await connection.execute(text("ANALYZE bench_search_products"))
+                await connection.commit()
+
+                durations = await measure_async(search, args.repeat)
+                rows.append(summarize("trigram index", durations, sum(durations)))
+
+            else:
+                print("pg_trgm is not available, the trigram index is skipped")
+
+    finally:
+        async with engine.begin() as connection:
+            await connection.execute(text(f"DROP TABLE IF EXISTS {scratch_tables}"))
+
+        await engine.dispose()
+
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,109 @@
+# coding=utf-8
+
+"""
+Storage & scan benchmark of the product title dictionary.
+
+Fills two scratch tables with the same receipt lines: one storing the title in every line
+(the old `receipt_product` layout), one referencing titles of a product dictionary by ID.
+Prints the size of each layout and the time of a full scan summing units by title
+(grouped by product ID, titles joined to the groups, in the dictionary layout).
+Runs against the database from .env; scratch tables are dropped at the end.
+
+Usage:
+    python -m benchmarks.product_titles --lines 1000000 --titles 500 --repeat 5
+"""
+
+import argparse
+import asyncio
+
+from sqlalchemy import text
+
+from app.db import build_engine
+from app.settings import DB_SETTINGS
+
+from .base import measure_async, summarize, print_table
+
+
+# Defined scratch tables: layout => (setup statements, scan query, tables counted in size)
+LAYOUTS = {
+    "title in every line": (
+        [
+            "CREATE TABLE bench_line_titles (id serial PRIMARY KEY, receipt_id int, title varchar,"
+            " price numeric(10, 2), quantity int)",
+            "INSERT INTO bench_line_titles (receipt_id, title, price, quantity)"
+            " SELECT n / 5, 'Product title number ' || (n % :titles) || ' of the merchant catalog', 9.99, 1 + n % 3"
+            " FROM generate_series(1, :lines) AS n",
+        ],
+        "SELECT title, sum(quantity) FROM bench_line_titles GROUP BY title",
+        ["bench_line_titles"],
+    ),
+    "product dictionary": (
+        [
+            "CREATE TABLE bench_products (id serial PRIMARY KEY, title varchar)",
+            "INSERT INTO bench_products (title)"
+            " SELECT 'Product title number ' || n || ' of the merchant catalog' FROM generate_series(0, :titles - 1) AS n",
+            "CREATE TABLE bench_line_products (id serial PRIMARY KEY, receipt_id int, product_id int,"
+            " price numeric(10, 2), quantity int)",
+            "INSERT INTO bench_line_products (receipt_id, product_id, price, quantity)"
+            " SELECT n / 5, 1 + n % :titles, 9.99, 1 + n % 3 FROM generate_series(1, :lines) AS n",
+        ],
+        "SELECT bench_products.title, units FROM ("
+        " SELECT product_id, sum(quantity) AS units FROM bench_line_products GROUP BY product_id"
+        ") AS lines JOIN bench_products ON bench_products.id = lines.product_id",
+        ["bench_line_products", "bench_products"],
+    ),
+}
+
+
+async def main() -> None:
+    """
+    Builds both layouts and prints their size & scan time.
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=1000000, help="Receipt lines.")
+    parser.add_argument("--titles", type=int, default=500, help="Distinct product titles.")
+    parser.add_argument("--repeat", type=int, default=5, help="Scans per layout.")
+    args = parser.parse_args()
+
+    engine = build_engine(DB_SETTINGS)
+    params = {"lines": args.lines, "titles": args.titles}
+    scratch_tables = [table for _, _, tables in LAYOUTS.values() for table in tables]
+    rows = []
+
+    try:
+        async with engine.begin() as connection:
+            for table in scratch_tables:
+                await connection.execute(text(f"DROP TABLE IF EXISTS {table}"))
+
+            for statements, _, tables in LAYOUTS.values():
+                for statement in statements:
+                    await connection.execute(text(statement), params)
+
+        async with engine.connect() as connection:
+            for name, (_, query, tables) in LAYOUTS.items():
+                size = sum([
+                    await connection.scalar(text("SELECT pg_total_relation_size(:table)"), {"table": table})
+                    for table in tables
+                ])
+
+                async def scan() -> None:
+                    await connection.execute(text(query))
+
+                durations = await measure_async(scan, args.repeat)
+                row = summarize(name, durations, sum(durations))
+                row["size MB"] = round(size / 1024 / 1024, 1)
+                rows.append(row)
+
+    finally:
+        async with engine.begin() as connection:
+            for table in scratch_tables:
+                await connection.execute(text(f"DROP TABLE IF EXISTS {table}"))
+
+        await engine.dispose()
+
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,174 @@
+# coding=utf-8
+
+"""
+Serialization benchmark of a page of receipts.
+
+Compares the default FastAPI path (ORM objects validated against `ReceiptsResponseSchema`
+with `from_attributes=True`, dumped to Python objects, then encoded with `json`) with the
+fast path (response models built from row tuples, encoded once with a precompiled `TypeAdapter`).
+Both paths must produce the same JSON. No database is needed.
+
+Usage:
+    python -m benchmarks.serialization --receipts 100 --products 5 --repeat 500
+"""
+
+import argparse
+import json
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from app.models import Receipt, ReceiptProduct, Product
+from app.routes.receipt.schema import (
+    ReceiptResponseSchema,
+    ReceiptProductResponseSchema,
+    ReceiptPaymentSchema,
+    ReceiptsResponseSchema,
+)
+from app.routes.receipt.serialize import RECEIPTS_ADAPTER
+
+from .base import measure, summarize, print_table
+
+
+def make_rows(receipts: int, products: int) -> tuple[list[tuple], list[tuple]]:
+    """
+    Generates receipt rows (`RECEIPT_COLUMNS`) and product rows (`PRODUCT_COLUMNS`).
+    """
+
+    created_at = datetime(2025, 2, 16, 16, 30, 47, 406595)
+    receipt_rows = []
+    product_rows = []
+
+    for receipt_id in range(1, receipts + 1):
+        total = Decimal("0.00")
+
+        for index in range(products):
+            price = Decimal(f"{index * 7 + 1}.99")
+            quantity = index + 1
+            total += price * quantity
+            product_rows.append((receipt_id, f"Product {index} Phone Case", price, quantity, price * quantity))
+
+        receipt_rows.append((
+            receipt_id,
+            total,
+            Decimal("10.00"),
+            created_at + timedelta(minutes=receipt_id),
+            "cash",
+            total + Decimal("10.00"),
+        ))
+
+    return receipt_rows, product_rows
+
+
+def make_orm_page(receipt_rows: list[tuple], product_rows: list[tuple]) -> dict:
+    """
+    Builds the page the way the ORM path returned it (with `Receipt` objects).
+    """
+
+    receipts = {
+        receipt_id: Receipt(
+            id=receipt_id,
+            total=total,
+            rest=rest,
+            created_at=created_at,
+            payment_type=payment_type,
+            payment_amount=payment_amount,
+            products=[],
+        )
+        for receipt_id, total, rest, created_at, payment_type, payment_amount in receipt_rows
+    }
+
+    for receipt_id, title, price, quantity, line_total in product_rows:
+        receipts[receipt_id].products.append(
+            ReceiptProduct(product=Product(title=title), price=price, quantity=quantity, line_total=line_total)
+        )
+
+    return {"total": len(receipts), "page": 0, "on_page": len(receipts), "next_page": None,
+            "results": list(receipts.values())}
+
+
+def fastapi_path(page: dict) -> bytes:
+    """
+    Emulates FastAPI: validate against `response_model`, dump to Python objects, encode with `json`.
+    """
+
+    value = RECEIPTS_ADAPTER.validate_python(page, from_attributes=True)
+    content = RECEIPTS_ADAPTER.dump_python(value, mode="json")
+
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def fast_path(receipt_rows: list[tuple], product_rows: list[tuple]) -> bytes:
+    """
+    Same steps as `build_receipts` + `render_receipts`: models from row tuples, one JSON encoding.
+    """
+
+    products: dict[int, list] = {row[0]: [] for row in receipt_rows}
+
+    for receipt_id, title, price, quantity, line_total in product_rows:
+        products[receipt_id].append(
+            ReceiptProductResponseSchema.model_construct(
+                title=title,
+                price=price,
+                quantity=quantity,
+                total=line_total,
+            )
+        )
+
+    results = [
+        ReceiptResponseSchema.model_construct(
+            id=receipt_id,
+            total=total,
+            rest=rest,
+            created_at=created_at,
+            products=products[receipt_id],
+            payment=ReceiptPaymentSchema.model_construct(type=payment_type, amount=payment_amount),
+        )
+        for receipt_id, total, rest, created_at, payment_type, payment_amount in receipt_rows
+    ]
+
+    return RECEIPTS_ADAPTER.dump_json(ReceiptsResponseSchema.model_construct(
+        total=len(results),
+        page=0,
+        on_page=len(results),
+        next_page=None,
+        results=results,
+    ))
+
+
+def main() -> None:
+    """
+    Checks both paths produce the same JSON and prints their throughput.
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--receipts", type=int, default=100, help="Receipts on the page.")
+    parser.add_argument("--products", type=int, default=5, help="Products per receipt.")
+    parser.add_argument("--repeat", type=int, default=500, help="Serializations per path.")
+    args = parser.parse_args()
+
+    receipt_rows, product_rows = make_rows(args.receipts, args.products)
+    page = make_orm_page(receipt_rows, product_rows)
+
+    # Same output
+    assert fastapi_path(page) == fast_path(receipt_rows, product_rows), "Fast path JSON differs!"
+
+    rows = []
+
+    for name, func in (
+        ("fastapi (validate + json)", lambda: fastapi_path(page)),
+        ("rows + TypeAdapter.dump_json", lambda: fast_path(receipt_rows, product_rows)),
+    ):
+        durations = measure(func, args.repeat)
+        rows.append(summarize(name, durations, sum(durations)))
+
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+# coding=utf-8
+
+"""
+Load test of request coalescing (single-flight) of identical concurrent reads.
+
+Creates a user with a receipt through the API, then sends bursts of identical concurrent requests
+(the text of the receipt, and the first page of the user's list) at growing concurrency, with
+single-flight on & off, and counts SQL statements actually executed per burst (all of them, and
+those reading receipts). The response cache is off, so every burst reaches the database: with
+single-flight the count of receipt statements stays flat.
+Runs the app in-process against the database from .env.
+
+Usage:
+    python -m benchmarks.single_flight --concurrency 1,10,50,200 --bursts 5
+"""
+
+import argparse
+import asyncio
+import secrets
+import time
+from dataclasses import replace
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event
+
+from app.cache import RESPONSE_CACHE, build_backend
+from app.db import engine, replica_engines
+from app.main import app
+from app.settings import CACHE_SETTINGS
+
+from .base import summarize, print_table
+
+
+class StatementCounter:
+    """
+    Counts SQL statements executed by the engines of the app, and those of them reading receipts
+    (authenticated requests also look up their user, which is not coalesced).
+    """
+
+    def __init__(self):
+        self.statements = 0
+        self.receipt_statements = 0
+
+        for counted in [engine, *replica_engines]:
+            event.listen(counted.sync_engine, "after_cursor_execute", self.count)
+
+    def count(self, conn, cursor, statement, *args) -> None:
+        self.statements += 1
+        self.receipt_statements += "receipt" in statement
+
+
+async def create_receipt(client: AsyncClient) -> tuple[dict, int]:
+    """
+    Registers a user, creates a receipt and returns authorization headers & the receipt ID.
+    """
+
+    user = {"first_name": "Bench", "last_name": "User", "login": f"bench_{secrets.token_hex(6)}", "password": "BenchPassword123!"}
+    response = await client.post("/users/register", json=user)
+    response.raise_for_status()
+
+    response = await client.post("/users/login", json={"login": user["login"], "password": user["password"]})
+    response.raise_for_status()
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    response = await client.post(
+        "/receipts/",
+        json={"products": [{"title": "Coffee", "price": 2.50, "quantity": 2}], "payment": {"type": "cash", "amount": 10}},
+        headers=headers,
+    )
+    response.raise_for_status()
+
+    return headers, response.json()["id"]
+
+
+async def run_bursts(
+        client: AsyncClient,
+        counter: StatementCounter,
+        name: str,
+        url: str,
+        headers: dict,
+        concurrency: int,
+        bursts: int,
+) -> dict:
+    """
+    Sends `bursts` bursts of `concurrency` identical requests and returns one result row.
+    """
+
+    durations: list[float] = []
+    errors = 0
+
+    async def one_request() -> None:
+        nonlocal errors
+        start = time.perf_counter()
+        response = await client.get(url, headers=headers)
+
+        if response.status_code != 200:
+            errors += 1
+
+        durations.append(time.perf_counter() - start)
+
+    statements, receipt_statements = counter.statements, counter.receipt_statements
+    started = time.perf_counter()
+
+    for _ in range(bursts):
+        await asyncio.gather(*(one_request() for _ in range(concurrency)))
+
+    elapsed = time.perf_counter() - started
+
+    row = summarize(f"{name} x{concurrency}", durations, elapsed, errors)
+    row["statements/burst"] = round((counter.statements - statements) / bursts, 1)
+    row["receipt statements/burst"] = round((counter.receipt_statements - receipt_statements) / bursts, 1)
+
+    return row
+
+
+async def main() -> None:
+    """
+    Runs the bursts at every concurrency, with single-flight on & off, and prints a result table.
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", default="1,10,50,200", help="Comma-separated sizes of bursts.")
+    parser.add_argument("--bursts", type=int, default=5, help="Bursts per size.")
+    args = parser.parse_args()
+
+    counter = StatementCounter()
+    rows = []
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        headers, receipt_id = await create_receipt(client)
+
+        for single_flight in (True, False):
+            # Only coalescing is measured (cached responses would not reach the database)
+            RESPONSE_CACHE.settings = replace(CACHE_SETTINGS, backend="off", single_flight=single_flight)
+            RESPONSE_CACHE.backend = build_backend(RESPONSE_CACHE.settings)
+            mode = "single-flight" if single_flight else "no coalescing"
+
+            for concurrency in map(int, args.concurrency.split(",")):
+                rows.append(await run_bursts(
+                    client, counter, f"{mode}: text", f"/receipts/{receipt_id}/text", {}, concurrency, args.bursts,
+                ))
+                rows.append(await run_bursts(
+                    client, counter, f"{mode}: list", "/receipts/?on_page=10", headers, concurrency, args.bursts,
+                ))
+
+    await engine.dispose()
+
+    for replica_engine in replica_engines:
+        await replica_engine.dispose()
+
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
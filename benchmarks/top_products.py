@@ -0,0 +1,107 @@
+# coding=utf-8
+
+"""
+Benchmark of top products over a date range: an ad-hoc aggregation of receipt lines
+against the daily product rollup (`product_daily_stats`).
+
+Fills scratch tables with the receipt lines of one merchant spread over `--days` days,
+and with the same lines summed per day & product. Prints the size of each table and the time
+of the top 10 products by revenue over the whole range (the worst case of the endpoint).
+Runs against the database from .env; scratch tables are dropped at the end.
+
+Usage:
+    python -m benchmarks.top_products --lines 5000000 --products 2000 --days 365 --repeat 5
+"""
+
+import argparse
+import asyncio
+
+from sqlalchemy import text
+
+from app.db import build_engine
+from app.settings import DB_SETTINGS
+
+from .base import measure_async, summarize, print_table
+
+
+# Defined scratch tables (lines first, the rollup is summed from them)
+SETUP = [
+    "CREATE TABLE bench_top_lines (id serial PRIMARY KEY, user_id int, created_at timestamp, product_id int,"
+    " quantity int, line_total numeric(10, 2))",
+    "INSERT INTO bench_top_lines (user_id, created_at, product_id, quantity, line_total)"
+    " SELECT 1, timestamp '2025-01-01' + (n % :days) * interval '1 day' + (n % 86400) * interval '1 second',"
+    " 1 + (n * 7919) % :products, 1 + n % 3, (1 + n % 3) * (1 + (n * 7919) % :products % 50)"
+    " FROM generate_series(1::bigint, :lines) AS n",
+    "CREATE INDEX ON bench_top_lines (user_id, created_at)",
+    "CREATE TABLE bench_top_daily (user_id int, day date, product_id int, line_count int, quantity bigint,"
+    " revenue numeric(14, 2), PRIMARY KEY (user_id, day, product_id))",
+    "INSERT INTO bench_top_daily"
+    " SELECT user_id, date(created_at), product_id, count(*), sum(quantity), sum(line_total)"
+    " FROM bench_top_lines GROUP BY 1, 2, 3",
+    "ANALYZE bench_top_lines",
+    "ANALYZE bench_top_daily",
+]
+
+# Defined queries: name => (query, table counted in size)
+QUERIES = {
+    "ad-hoc over lines": (
+        "SELECT product_id, sum(quantity), sum(line_total) AS revenue FROM bench_top_lines"
+        " WHERE user_id = 1 AND created_at >= '2025-01-01' AND created_at < '2026-01-01'"
+        " GROUP BY product_id ORDER BY revenue DESC LIMIT 10",
+        "bench_top_lines",
+    ),
+    "daily rollup": (
+        "SELECT product_id, sum(quantity), sum(revenue) AS revenue FROM bench_top_daily"
+        " WHERE user_id = 1 AND day >= '2025-01-01' AND day <= '2025-12-31'"
+        " GROUP BY product_id ORDER BY revenue DESC LIMIT 10",
+        "bench_top_daily",
+    ),
+}
+
+
+async def main() -> None:
+    """
+    Builds the scratch tables and prints their size & query time.
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=1000000, help="Receipt lines.")
+    parser.add_argument("--products", type=int, default=2000, help="Distinct products.")
+    parser.add_argument("--days", type=int, default=365, help="Days the lines are spread over.")
+    parser.add_argument("--repeat", type=int, default=5, help="Queries per table.")
+    args = parser.parse_args()
+
+    engine = build_engine(DB_SETTINGS)
+    params = {"lines": args.lines, "products": args.products, "days": args.days}
+    rows = []
+
+    try:
+        async with engine.begin() as connection:
+            await connection.execute(text("DROP TABLE IF EXISTS bench_top_lines, bench_top_daily"))
+
+            for statement in SETUP:
+                await connection.execute(text(statement), params)
+
+        async with engine.connect() as connection:
+            for name, (query, table) in QUERIES.items():
+                size = await connection.scalar(text("SELECT pg_total_relation_size(:table)"), {"table": table})
+
+                async def run() -> None:
+                    await connection.execute(text(query))
+
+                durations = await measure_async(run, args.repeat)
+                row = summarize(name, durations, sum(durations))
+                row["size MB"] = round(size / 1024 / 1024, 1)
+                rows.append(row)
+
+    finally:
+        async with engine.begin() as connection:
+            await connection.execute(text("DROP TABLE IF EXISTS bench_top_lines, bench_top_daily"))
+
+        await engine.dispose()
+
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,3 +1,3 @@
 #!/bin/bash
-alembic upgrade head
-uvicorn app.main:app --host 0.0.0.0 --port 80
+# Migrations run separately: python -m app.migrate
+exec python -m app.server
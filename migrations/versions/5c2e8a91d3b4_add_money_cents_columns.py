@@ -0,0 +1,77 @@
+"""
+Add money cents columns
+
+Revision ID: 5c2e8a91d3b4
+Revises: 1154f2a77eed
+Create Date: 2026-10-19 09:00:00.000000
+"""
+
+from typing import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# Revision identifiers, used by Alembic.
+revision: str = "5c2e8a91d3b4"
+down_revision: str | None = "1154f2a77eed"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+# Defined rows updated per transaction of the backfill
+BATCH_SIZE = 10000
+
+
+def backfill(table: str, assignments: str, pending: str) -> None:
+    """
+    Fills new columns of existing rows in batches by ID ranges, each batch in its own
+    transaction, so locks are short and the app keeps working during the migration.
+    Rows already filled (by the app or a previous run) are skipped.
+    """
+
+    connection = op.get_bind()
+
+    with op.get_context().autocommit_block():
+        max_id = connection.scalar(sa.text(f"SELECT max(id) FROM {table}")) or 0
+
+        for start in range(0, max_id + 1, BATCH_SIZE):
+            connection.execute(
+                sa.text(f"UPDATE {table} SET {assignments} WHERE id >= :start AND id < :end AND {pending}"),
+                {"start": start, "end": start + BATCH_SIZE},
+            )
+
+
+def upgrade() -> None:
+    """
+    Upgrade database
+    """
+
+    op.add_column("receipt", sa.Column("total_cents", sa.BigInteger(), nullable=True))
+    op.add_column("receipt", sa.Column("payment_amount_cents", sa.BigInteger(), nullable=True))
+    op.add_column("receipt", sa.Column("rest_cents", sa.BigInteger(), nullable=True))
+    op.add_column("receipt_product", sa.Column("price_cents", sa.BigInteger(), nullable=True))
+
+    backfill(
+        "receipt",
+        "total_cents = (total * 100)::bigint,"
+        " payment_amount_cents = (payment_amount * 100)::bigint,"
+        " rest_cents = (rest * 100)::bigint",
+        "total_cents IS NULL",
+    )
+    backfill(
+        "receipt_product",
+        "price_cents = (price * 100)::bigint",
+        "price_cents IS NULL",
+    )
+
+
+def downgrade() -> None:
+    """
+    Downgrade database
+    """
+
+    op.drop_column("receipt_product", "price_cents")
+    op.drop_column("receipt", "rest_cents")
+    op.drop_column("receipt", "payment_amount_cents")
+    op.drop_column("receipt", "total_cents")
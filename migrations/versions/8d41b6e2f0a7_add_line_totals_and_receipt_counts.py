@@ -0,0 +1,78 @@
+"""
+Add line totals and receipt counts
+
+Revision ID: 8d41b6e2f0a7
+Revises: 5c2e8a91d3b4
+Create Date: 2026-10-19 10:00:00.000000
+"""
+
+from typing import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.migrate import run_in_batches
+
+
+# Revision identifiers, used by Alembic.
+revision: str = "8d41b6e2f0a7"
+down_revision: str | None = "5c2e8a91d3b4"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """
+    Upgrade database
+    """
+
+    # Nullable columns without defaults => no table rewrite
+    op.add_column("receipt_product", sa.Column("line_total", sa.Numeric(precision=10, scale=2), nullable=True))
+    op.add_column("receipt_product", sa.Column("line_total_cents", sa.BigInteger(), nullable=True))
+    op.add_column("receipt", sa.Column("item_count", sa.Integer(), nullable=True))
+    op.add_column("receipt", sa.Column("unit_count", sa.Integer(), nullable=True))
+
+    # Fill line totals of existing rows
+    run_in_batches(
+        "receipt_product",
+        "UPDATE receipt_product SET"
+        " line_total = price * quantity,"
+        " line_total_cents = (price * 100)::bigint * quantity"
+        " WHERE id >= :start AND id < :end AND line_total IS NULL",
+    )
+
+    # Fill counts of existing receipts
+    run_in_batches(
+        "receipt",
+        "UPDATE receipt SET item_count = counts.item_count, unit_count = counts.unit_count"
+        " FROM ("
+        "  SELECT receipt_id, count(*) AS item_count, sum(quantity) AS unit_count"
+        "  FROM receipt_product"
+        "  WHERE receipt_id >= :start AND receipt_id < :end"
+        "  GROUP BY receipt_id"
+        " ) AS counts"
+        " WHERE receipt.id = counts.receipt_id AND receipt.item_count IS NULL",
+    )
+
+    # Built without blocking writes
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_receipt_product_receipt_id",
+            "receipt_product",
+            ["receipt_id"],
+            postgresql_include=["line_total"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """
+    Downgrade database
+    """
+
+    op.drop_index("ix_receipt_product_receipt_id", table_name="receipt_product")
+    op.drop_column("receipt", "unit_count")
+    op.drop_column("receipt", "item_count")
+    op.drop_column("receipt_product", "line_total_cents")
+    op.drop_column("receipt_product", "line_total")
@@ -0,0 +1,44 @@
+"""
+Add receipt idempotency key
+
+Revision ID: a3f9c6e2d1b7
+Revises: e1c7a9d4b2f8
+Create Date: 2026-10-19 20:00:00.000000
+"""
+
+from typing import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# Revision identifiers, used by Alembic.
+revision: str = "a3f9c6e2d1b7"
+down_revision: str | None = "e1c7a9d4b2f8"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """
+    Upgrade database
+    """
+
+    op.create_table(
+        "receipt_idempotency_key",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("key", sa.String(length=255), nullable=False),
+        sa.Column("request_hash", sa.String(length=64), nullable=False),
+        sa.Column("receipt_id", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"]),
+        sa.PrimaryKeyConstraint("user_id", "key"),
+    )
+
+
+def downgrade() -> None:
+    """
+    Downgrade database
+    """
+
+    op.drop_table("receipt_idempotency_key")
@@ -0,0 +1,48 @@
+"""
+Add receipt daily stats
+
+Revision ID: a9d3e6f1c4b8
+Revises: f2c8b5a1d7e3
+Create Date: 2026-10-19 14:00:00.000000
+"""
+
+from typing import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# Revision identifiers, used by Alembic.
+revision: str = "a9d3e6f1c4b8"
+down_revision: str | None = "f2c8b5a1d7e3"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """
+    Upgrade database
+
+    Days before the deploy are filled by `python -m app.rollups rebuild --start <first day>`.
+    """
+
+    op.create_table(
+        "receipt_daily_stats",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("payment_type", sa.String(), nullable=False),
+        sa.Column("receipt_count", sa.Integer(), nullable=False),
+        sa.Column("total", sa.Numeric(14, 2), nullable=False),
+        sa.Column("payment_amount", sa.Numeric(14, 2), nullable=False),
+        sa.Column("rest", sa.Numeric(14, 2), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"], ),
+        sa.PrimaryKeyConstraint("user_id", "day", "payment_type"),
+    )
+
+
+def downgrade() -> None:
+    """
+    Downgrade database
+    """
+
+    op.drop_table("receipt_daily_stats")
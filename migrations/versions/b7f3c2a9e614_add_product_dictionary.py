@@ -0,0 +1,95 @@
+"""
+Add product dictionary
+
+Revision ID: b7f3c2a9e614
+Revises: 8d41b6e2f0a7
+Create Date: 2026-10-19 11:00:00.000000
+"""
+
+from typing import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.migrate import run_in_batches
+
+
+# Revision identifiers, used by Alembic.
+revision: str = "b7f3c2a9e614"
+down_revision: str | None = "8d41b6e2f0a7"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """
+    Upgrade database
+    """
+
+    op.create_table(
+        "product",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"], ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("user_id", "title", name="uq_product_user_id_title"),
+    )
+
+    op.add_column("receipt_product", sa.Column("product_id", sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        "receipt_product_product_id_fkey", "receipt_product", "product", ["product_id"], ["id"]
+    )
+
+    # New lines store no title
+    op.alter_column("receipt_product", "title", existing_type=sa.String(), nullable=True)
+
+    # Titles of existing lines => products
+    run_in_batches(
+        "receipt_product",
+        "INSERT INTO product (user_id, title)"
+        " SELECT DISTINCT receipt.user_id, receipt_product.title"
+        " FROM receipt_product JOIN receipt ON receipt.id = receipt_product.receipt_id"
+        " WHERE receipt_product.id >= :start AND receipt_product.id < :end"
+        " AND receipt_product.product_id IS NULL"
+        " ON CONFLICT (user_id, title) DO NOTHING",
+    )
+
+    # Existing lines reference their products, titles are freed
+    run_in_batches(
+        "receipt_product",
+        "UPDATE receipt_product SET product_id = product.id, title = NULL"
+        " FROM receipt, product"
+        " WHERE receipt.id = receipt_product.receipt_id"
+        " AND product.user_id = receipt.user_id AND product.title = receipt_product.title"
+        " AND receipt_product.id >= :start AND receipt_product.id < :end"
+        " AND receipt_product.product_id IS NULL",
+    )
+
+    # Built without blocking writes
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_receipt_product_product_id",
+            "receipt_product",
+            ["product_id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """
+    Downgrade database
+    """
+
+    # Titles back to lines
+    op.execute(
+        "UPDATE receipt_product SET title = product.title"
+        " FROM product WHERE product.id = receipt_product.product_id AND receipt_product.title IS NULL"
+    )
+    op.alter_column("receipt_product", "title", existing_type=sa.String(), nullable=False)
+
+    op.drop_index("ix_receipt_product_product_id", table_name="receipt_product")
+    op.drop_constraint("receipt_product_product_id_fkey", "receipt_product", type_="foreignkey")
+    op.drop_column("receipt_product", "product_id")
+    op.drop_table("product")
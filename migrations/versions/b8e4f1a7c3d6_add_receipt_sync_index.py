@@ -0,0 +1,64 @@
+"""
+Add receipt sync index
+
+Revision ID: b8e4f1a7c3d6
+Revises: d7b3a6e9c2f5
+Create Date: 2026-10-19 18:00:00.000000
+"""
+
+from typing import Sequence
+
+from alembic import op
+
+from app.partitions import SHADOW_SUFFIX, is_partitioned, table_exists
+
+
+# Revision identifiers, used by Alembic.
+revision: str = "b8e4f1a7c3d6"
+down_revision: str | None = "d7b3a6e9c2f5"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """
+    Upgrade database
+
+    Also indexes the partitioned shadow table while receipts are being migrated to it.
+    """
+
+    connection = op.get_bind()
+
+    if is_partitioned(connection, "receipt"):
+        # Replaced by the partitioned table already (indexes of partitioned tables can't be built concurrently)
+        op.create_index("ix_receipt_user_id_id", "receipt", ["user_id", "id"], unique=False, if_not_exists=True)
+
+    else:
+        # Built without blocking writes
+        with op.get_context().autocommit_block():
+            op.create_index(
+                "ix_receipt_user_id_id",
+                "receipt",
+                ["user_id", "id"],
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+    if table_exists(connection, "receipt" + SHADOW_SUFFIX):
+        op.create_index(
+            "ix_receipt_user_id_id" + SHADOW_SUFFIX,
+            "receipt" + SHADOW_SUFFIX,
+            ["user_id", "id"],
+            unique=False,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """
+    Downgrade database
+    """
+
+    op.execute(f"DROP INDEX IF EXISTS ix_receipt_user_id_id{SHADOW_SUFFIX}")
+    op.drop_index("ix_receipt_user_id_id", table_name="receipt")
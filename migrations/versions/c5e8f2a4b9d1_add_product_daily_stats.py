@@ -0,0 +1,48 @@
+"""
+Add product daily stats
+
+Revision ID: c5e8f2a4b9d1
+Revises: a9d3e6f1c4b8
+Create Date: 2026-10-19 15:00:00.000000
+"""
+
+from typing import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# Revision identifiers, used by Alembic.
+revision: str = "c5e8f2a4b9d1"
+down_revision: str | None = "a9d3e6f1c4b8"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """
+    Upgrade database
+
+    Days before the deploy are filled by `python -m app.rollups rebuild --start <first day>`.
+    """
+
+    op.create_table(
+        "product_daily_stats",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("product_id", sa.Integer(), nullable=False),
+        sa.Column("line_count", sa.Integer(), nullable=False),
+        sa.Column("quantity", sa.BigInteger(), nullable=False),
+        sa.Column("revenue", sa.Numeric(14, 2), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"], ),
+        sa.ForeignKeyConstraint(["product_id"], ["product.id"], ),
+        sa.PrimaryKeyConstraint("user_id", "day", "product_id"),
+    )
+
+
+def downgrade() -> None:
+    """
+    Downgrade database
+    """
+
+    op.drop_table("product_daily_stats")
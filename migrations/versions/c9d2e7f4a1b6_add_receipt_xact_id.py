@@ -0,0 +1,89 @@
+"""
+Add receipt transaction ID
+
+Revision ID: c9d2e7f4a1b6
+Revises: a3f9c6e2d1b7
+Create Date: 2026-10-20 10:00:00.000000
+"""
+
+from typing import Sequence
+
+from alembic import op
+from sqlalchemy import text
+
+from app.partitions import PARTITION_KEYS, SHADOW_SUFFIX, get_columns, is_partitioned, sync_function_sql, table_exists
+
+
+# Revision identifiers, used by Alembic.
+revision: str = "c9d2e7f4a1b6"
+down_revision: str | None = "a3f9c6e2d1b7"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+# Defined ID of the transaction inserting a receipt (the sync position of receipts)
+XACT_ID_DEFAULT = "(pg_current_xact_id()::text::bigint)"
+
+
+def upgrade() -> None:
+    """
+    Upgrade database
+
+    Existing receipts get 0 (synced first, in order of IDs) without rewriting the table,
+    new ones the ID of their transaction. Also adds the column & its index to the partitioned
+    shadow table while receipts are being migrated to it.
+    """
+
+    connection = op.get_bind()
+    shadow = "receipt" + SHADOW_SUFFIX
+    tables = ["receipt"] + ([shadow] if table_exists(connection, shadow) else [])
+
+    for table in tables:
+        op.execute(f"ALTER TABLE {table} ADD COLUMN xact_id bigint NOT NULL DEFAULT 0")
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN xact_id SET DEFAULT {XACT_ID_DEFAULT}")
+
+    if shadow in tables:
+        # Mirror the new column too
+        connection.execute(text(sync_function_sql("receipt", PARTITION_KEYS["receipt"], get_columns(connection, "receipt"))))
+        op.create_index(
+            "ix_receipt_user_id_xact_id_id" + SHADOW_SUFFIX,
+            shadow,
+            ["user_id", "xact_id", "id"],
+            unique=False,
+            if_not_exists=True,
+        )
+
+    if is_partitioned(connection, "receipt"):
+        # Indexes of partitioned tables can't be built concurrently
+        op.create_index("ix_receipt_user_id_xact_id_id", "receipt", ["user_id", "xact_id", "id"], unique=False, if_not_exists=True)
+
+    else:
+        # Built without blocking writes
+        with op.get_context().autocommit_block():
+            op.create_index(
+                "ix_receipt_user_id_xact_id_id",
+                "receipt",
+                ["user_id", "xact_id", "id"],
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """
+    Downgrade database
+    """
+
+    connection = op.get_bind()
+    shadow = "receipt" + SHADOW_SUFFIX
+
+    op.execute("DROP INDEX IF EXISTS ix_receipt_user_id_xact_id_id")
+
+    if table_exists(connection, shadow):
+        op.execute(f"DROP INDEX IF EXISTS ix_receipt_user_id_xact_id_id{SHADOW_SUFFIX}")
+        op.execute(f"ALTER TABLE {shadow} DROP COLUMN xact_id")
+
+    op.execute("ALTER TABLE receipt DROP COLUMN xact_id")
+
+    if table_exists(connection, shadow):
+        connection.execute(text(sync_function_sql("receipt", PARTITION_KEYS["receipt"], get_columns(connection, "receipt"))))
@@ -0,0 +1,40 @@
+"""
+Add product title trigram index
+
+Revision ID: d7b3a6e9c2f5
+Revises: c5e8f2a4b9d1
+Create Date: 2026-10-19 16:00:00.000000
+"""
+
+from typing import Sequence
+
+from alembic import op
+
+from app.funcs.receipt.search import TITLE_INDEX, create_title_index
+
+
+# Revision identifiers, used by Alembic.
+revision: str = "d7b3a6e9c2f5"
+down_revision: str | None = "c5e8f2a4b9d1"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """
+    Upgrade database
+
+    Skipped (with a warning) on servers without `pg_trgm`: searches then scan titles of each merchant.
+    """
+
+    # Products keep being created while the index is built
+    with op.get_context().autocommit_block():
+        create_title_index(op.get_bind(), concurrently=True)
+
+
+def downgrade() -> None:
+    """
+    Downgrade database
+    """
+
+    op.execute(f"DROP INDEX IF EXISTS {TITLE_INDEX}")
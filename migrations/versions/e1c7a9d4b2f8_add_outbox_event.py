@@ -0,0 +1,49 @@
+"""
+Add outbox event
+
+Revision ID: e1c7a9d4b2f8
+Revises: b8e4f1a7c3d6
+Create Date: 2026-10-19 19:00:00.000000
+"""
+
+from typing import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# Revision identifiers, used by Alembic.
+revision: str = "e1c7a9d4b2f8"
+down_revision: str | None = "b8e4f1a7c3d6"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """
+    Upgrade database
+    """
+
+    op.create_table(
+        "outbox_event",
+        sa.Column("id", sa.BigInteger(), nullable=False),
+        sa.Column("event_type", sa.String(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("payload", postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("available_at", sa.DateTime(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("last_error", sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_outbox_event_available_at_id", "outbox_event", ["available_at", "id"], unique=False)
+
+
+def downgrade() -> None:
+    """
+    Downgrade database
+    """
+
+    op.drop_index("ix_outbox_event_available_at_id", table_name="outbox_event")
+    op.drop_table("outbox_event")
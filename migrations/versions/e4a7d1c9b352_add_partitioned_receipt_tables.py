@@ -0,0 +1,71 @@
+"""
+Add partitioned receipt tables
+
+Revision ID: e4a7d1c9b352
+Revises: b7f3c2a9e614
+Create Date: 2026-10-19 12:00:00.000000
+"""
+
+from typing import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.migrate import run_in_batches
+from app.partitions import create_shadow_tables, drop_shadow_tables, is_partitioned
+from app.settings import PARTITION_SETTINGS
+
+
+# Revision identifiers, used by Alembic.
+revision: str = "e4a7d1c9b352"
+down_revision: str | None = "b7f3c2a9e614"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+# Defined indexes of the partitioned tables at this revision (`PARTITIONED_INDEXES` grows with later migrations)
+INDEXES = {
+    "receipt": [
+        ("ix_receipt_id", "(id)"),
+        ("ix_receipt_user_id_created_at", "(user_id, created_at)"),
+    ],
+    "receipt_product": [
+        ("ix_receipt_product_id", "(id)"),
+        ("ix_receipt_product_receipt_id", "(receipt_id) INCLUDE (line_total)"),
+        ("ix_receipt_product_product_id", "(product_id)"),
+    ],
+}
+
+
+def upgrade() -> None:
+    """
+    Upgrade database
+
+    Creates partitioned copies of `receipt` & `receipt_product` (monthly by creation time),
+    kept in sync with the tables by triggers. Existing rows are copied & the tables are replaced
+    by `python -m app.partitions copy` and `python -m app.partitions swap`, while the app is running.
+    """
+
+    # Lines are partitioned by the creation time of their receipts
+    op.add_column("receipt_product", sa.Column("receipt_created_at", sa.DateTime(), nullable=True))
+
+    run_in_batches(
+        "receipt_product",
+        "UPDATE receipt_product SET receipt_created_at = receipt.created_at"
+        " FROM receipt WHERE receipt.id = receipt_product.receipt_id"
+        " AND receipt_product.id >= :start AND receipt_product.id < :end"
+        " AND receipt_product.receipt_created_at IS NULL",
+    )
+
+    create_shadow_tables(op.get_bind(), PARTITION_SETTINGS.months_ahead, indexes=INDEXES)
+
+
+def downgrade() -> None:
+    """
+    Downgrade database
+    """
+
+    if is_partitioned(op.get_bind(), "receipt"):
+        raise RuntimeError("Tables are replaced by partitioned tables already, copy rows back manually")
+
+    drop_shadow_tables(op.get_bind())
+    op.drop_column("receipt_product", "receipt_created_at")
@@ -0,0 +1,47 @@
+"""
+Add archived receipt index
+
+Revision ID: f2c8b5a1d7e3
+Revises: e4a7d1c9b352
+Create Date: 2026-10-19 13:00:00.000000
+"""
+
+from typing import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# Revision identifiers, used by Alembic.
+revision: str = "f2c8b5a1d7e3"
+down_revision: str | None = "e4a7d1c9b352"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """
+    Upgrade database
+    """
+
+    op.create_table(
+        "archived_receipt",
+        sa.Column("id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("segment", sa.String(), nullable=False),
+        sa.Column("frame_offset", sa.BigInteger(), nullable=False),
+        sa.Column("frame_length", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"], ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_archived_receipt_user_id_id", "archived_receipt", ["user_id", "id"], unique=False)
+
+
+def downgrade() -> None:
+    """
+    Downgrade database
+    """
+
+    op.drop_index("ix_archived_receipt_user_id_id", table_name="archived_receipt")
+    op.drop_table("archived_receipt")